@@ -0,0 +1,387 @@
+import itertools
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+
+Alert = namedtuple('Alert', 'rule_id symbol kind price level timestamp message')
+
+THRESHOLD_KINDS = ('above', 'below', 'cross')
+MOVE_DIRECTIONS = ('up', 'down')
+
+
+class _SortedIndex:
+    """Parallel sorted key/id arrays supporting range pops via bisect."""
+
+    __slots__ = ('keys', 'ids')
+
+    def __init__(self):
+        self.keys = []
+        self.ids = []
+
+    def add(self, key, rule_id):
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.ids.insert(pos, rule_id)
+
+    def remove(self, key, rule_id):
+        pos = bisect_left(self.keys, key)
+        while pos < len(self.keys) and self.keys[pos] == key:
+            if self.ids[pos] == rule_id:
+                del self.keys[pos]
+                del self.ids[pos]
+                return True
+            pos += 1
+        return False
+
+    def pop_range(self, lo, hi):
+        if lo >= hi:
+            return []
+        ids = self.ids[lo:hi]
+        del self.keys[lo:hi]
+        del self.ids[lo:hi]
+        return ids
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class _ThresholdRule:
+    __slots__ = ('rule_id', 'symbol', 'kind', 'level', 'hysteresis', 'message')
+
+    def __init__(self, rule_id, symbol, kind, level, hysteresis, message):
+        self.rule_id = rule_id
+        self.symbol = symbol
+        self.kind = kind
+        self.level = level
+        self.hysteresis = hysteresis
+        self.message = message
+
+
+class _PercentRule:
+    __slots__ = ('rule_id', 'symbol', 'pct', 'window', 'direction', 'message')
+
+    def __init__(self, rule_id, symbol, pct, window, direction, message):
+        self.rule_id = rule_id
+        self.symbol = symbol
+        self.pct = pct
+        self.window = window
+        self.direction = direction
+        self.message = message
+
+
+class _SymbolBook:
+    """
+    Threshold rules of one symbol, split by side and arming state.
+
+    up:          armed rules firing when price rises through the key (level)
+    down:        armed rules firing when price falls through the key (level)
+    rearm_below: fired up-side rules, re-armed once price <= level - hysteresis
+    rearm_above: fired down-side rules, re-armed once price >= level + hysteresis
+    """
+
+    __slots__ = ('up', 'down', 'rearm_below', 'rearm_above', 'last_price')
+
+    def __init__(self):
+        self.up = _SortedIndex()
+        self.down = _SortedIndex()
+        self.rearm_below = _SortedIndex()
+        self.rearm_above = _SortedIndex()
+        self.last_price = None
+
+
+class _PercentGroup:
+    """
+    Percent-move rules sharing a symbol, window and direction.
+
+    Rules are sorted by threshold, so the rules whose condition holds always
+    form a prefix. `latched` is the length of the prefix that has already
+    fired; it grows as the move grows (firing the new rules) and shrinks once
+    the move falls `hysteresis` points below a rule's threshold (re-arming it).
+    """
+
+    __slots__ = ('window', 'direction', 'hysteresis', 'pcts', 'ids', 'latched',
+                 'mins', 'maxs')
+
+    def __init__(self, window, direction, hysteresis):
+        self.window = window
+        self.direction = direction
+        self.hysteresis = hysteresis
+        self.pcts = []
+        self.ids = []
+        self.latched = 0
+        self.mins = deque()  # (ts, price), prices increasing: window low first
+        self.maxs = deque()  # (ts, price), prices decreasing: window high first
+
+    def add(self, pct, rule_id):
+        pos = bisect_right(self.pcts, pct)
+        self.pcts.insert(pos, pct)
+        self.ids.insert(pos, rule_id)
+        if pos < self.latched:
+            self.latched += 1
+
+    def remove(self, pct, rule_id):
+        pos = bisect_left(self.pcts, pct)
+        while pos < len(self.pcts) and self.pcts[pos] == pct:
+            if self.ids[pos] == rule_id:
+                del self.pcts[pos]
+                del self.ids[pos]
+                if pos < self.latched:
+                    self.latched -= 1
+                return True
+            pos += 1
+        return False
+
+    def push(self, ts, price):
+        """Adds a tick and returns the current move in percent."""
+        while self.mins and self.mins[-1][1] >= price:
+            self.mins.pop()
+        self.mins.append((ts, price))
+        while self.maxs and self.maxs[-1][1] <= price:
+            self.maxs.pop()
+        self.maxs.append((ts, price))
+        cutoff = ts - self.window
+        while self.mins[0][0] < cutoff:
+            self.mins.popleft()
+        while self.maxs[0][0] < cutoff:
+            self.maxs.popleft()
+        if self.direction == 'up':
+            low = self.mins[0][1]
+            return (price - low) / low * 100 if low > 0 else 0.0
+        high = self.maxs[0][1]
+        return (high - price) / high * 100 if high > 0 else 0.0
+
+    def evaluate(self, move):
+        """Returns ids of rules that newly fired for this move."""
+        reached = bisect_right(self.pcts, move)
+        fired = []
+        if reached > self.latched:
+            fired = self.ids[self.latched:reached]
+            self.latched = reached
+        else:
+            still_latched = bisect_right(self.pcts, move + self.hysteresis)
+            if still_latched < self.latched:
+                self.latched = still_latched
+        return fired
+
+
+class PrintSink:
+    """Notification sink that prints each alert."""
+
+    def send(self, alert):
+        print(f"ALERT [{alert.symbol}] {alert.message}")
+
+
+class CollectingSink:
+    """Notification sink that keeps alerts in memory (e.g. for a UI or tests)."""
+
+    def __init__(self, maxlen=1000):
+        self.alerts = deque(maxlen=maxlen)
+
+    def send(self, alert):
+        self.alerts.append(alert)
+
+
+class CallbackSink:
+    """Notification sink forwarding each alert to a callable."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def send(self, alert):
+        self.callback(alert)
+
+
+class AlertEngine:
+    """
+    Streaming price-alert engine.
+
+    Threshold rules are indexed per symbol in sorted arrays, so a tick from
+    p0 to p1 bisects straight to the rules whose level lies between the two
+    prices instead of scanning every rule. Alerts are edge-triggered: a rule
+    fires when its boundary is crossed and stays silent until price moves back
+    past its hysteresis band. Percent-move rules over a time window work the
+    same way against the window's low/high.
+
+    Args:
+        sinks (list, optional): Notification sinks with a send(alert) method.
+        move_hysteresis (float): Percentage points a move must fall back below
+            a percent-move rule's threshold before it can fire again.
+    """
+
+    def __init__(self, sinks=None, move_hysteresis=0.5):
+        self.sinks = list(sinks or [])
+        self.move_hysteresis = move_hysteresis
+        self._books = {}
+        self._groups = {}  # symbol -> {(window, direction): _PercentGroup}
+        self._rules = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.alerts_fired = 0
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def _book(self, symbol):
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = _SymbolBook()
+        return book
+
+    def add_threshold_rule(self, symbol, level, kind='above', hysteresis=0.0, message=None):
+        """
+        Adds a price-level rule.
+
+        Args:
+            symbol (str): Cryptocurrency symbol (e.g., 'BTC').
+            level (float): Price level.
+            kind (str): 'above' (fires when price rises through level),
+                'below' (falls through level) or 'cross' (either direction).
+            hysteresis (float): Absolute distance price must retreat from the
+                level before the rule can fire again.
+            message (str, optional): Text for the alert.
+
+        Returns:
+            int: Rule id.
+        """
+        if kind not in THRESHOLD_KINDS:
+            raise ValueError(f"kind must be one of {THRESHOLD_KINDS}")
+        symbol = symbol.upper()
+        with self._lock:
+            rule_id = next(self._ids)
+            rule = _ThresholdRule(rule_id, symbol, kind, float(level), float(hysteresis), message)
+            self._rules[rule_id] = rule
+            book = self._book(symbol)
+            price = book.last_price
+            if kind in ('above', 'cross'):
+                if price is None or price < rule.level:
+                    book.up.add(rule.level, rule_id)
+                else:
+                    book.rearm_below.add(rule.level - rule.hysteresis, rule_id)
+            if kind in ('below', 'cross'):
+                if price is None or price > rule.level:
+                    book.down.add(rule.level, rule_id)
+                else:
+                    book.rearm_above.add(rule.level + rule.hysteresis, rule_id)
+            return rule_id
+
+    def add_percent_move_rule(self, symbol, pct, window_seconds, direction='up', message=None):
+        """
+        Adds a rule firing when price moves `pct` percent within a window,
+        measured from the window's low (direction='up') or high ('down').
+
+        Returns:
+            int: Rule id.
+        """
+        if direction not in MOVE_DIRECTIONS:
+            raise ValueError(f"direction must be one of {MOVE_DIRECTIONS}")
+        symbol = symbol.upper()
+        with self._lock:
+            rule_id = next(self._ids)
+            rule = _PercentRule(rule_id, symbol, float(pct), float(window_seconds), direction, message)
+            self._rules[rule_id] = rule
+            groups = self._groups.setdefault(symbol, {})
+            group = groups.get((rule.window, direction))
+            if group is None:
+                group = groups[(rule.window, direction)] = _PercentGroup(
+                    rule.window, direction, self.move_hysteresis)
+            group.add(rule.pct, rule_id)
+            return rule_id
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            if isinstance(rule, _PercentRule):
+                self._groups[rule.symbol][(rule.window, rule.direction)].remove(rule.pct, rule_id)
+                return True
+            book = self._books[rule.symbol]
+            book.up.remove(rule.level, rule_id) or \
+                book.rearm_below.remove(rule.level - rule.hysteresis, rule_id)
+            book.down.remove(rule.level, rule_id) or \
+                book.rearm_above.remove(rule.level + rule.hysteresis, rule_id)
+            return True
+
+    @property
+    def rule_count(self):
+        return len(self._rules)
+
+    def _threshold_alert(self, rule_id, price, ts, direction):
+        rule = self._rules[rule_id]
+        verb = 'rose above' if direction == 'up' else 'fell below'
+        message = rule.message or f"{rule.symbol} {verb} ${rule.level:,.2f} (now ${price:,.2f})"
+        return Alert(rule_id, rule.symbol, rule.kind, price, rule.level, ts, message)
+
+    def _move_alert(self, rule_id, price, ts, move):
+        rule = self._rules[rule_id]
+        verb = 'up' if rule.direction == 'up' else 'down'
+        message = rule.message or (
+            f"{rule.symbol} moved {verb} {move:.2f}% within {rule.window:g}s "
+            f"(threshold {rule.pct:g}%, now ${price:,.2f})")
+        return Alert(rule_id, rule.symbol, 'move_' + rule.direction, price, rule.pct, ts, message)
+
+    def on_tick(self, symbol, price, timestamp=None):
+        """
+        Evaluates one price tick and notifies sinks of triggered alerts.
+
+        Returns:
+            list: Alerts triggered by this tick.
+        """
+        symbol = symbol.upper()
+        price = float(price)
+        ts = time.time() if timestamp is None else timestamp
+        alerts = []
+        with self._lock:
+            self.ticks += 1
+            book = self._books.get(symbol)
+            if book is not None:
+                previous = book.last_price
+                book.last_price = price
+                if previous is not None and price > previous:
+                    # Armed up-side rules with previous < level <= price.
+                    up = book.up
+                    fired = up.pop_range(bisect_right(up.keys, previous), bisect_right(up.keys, price))
+                    for rule_id in fired:
+                        rule = self._rules[rule_id]
+                        book.rearm_below.add(rule.level - rule.hysteresis, rule_id)
+                        alerts.append(self._threshold_alert(rule_id, price, ts, 'up'))
+                    # Down-side rules whose re-arm point (level + h) was reached.
+                    rearm = book.rearm_above
+                    for rule_id in rearm.pop_range(0, bisect_right(rearm.keys, price)):
+                        book.down.add(self._rules[rule_id].level, rule_id)
+                elif previous is not None and price < previous:
+                    # Armed down-side rules with price <= level < previous.
+                    down = book.down
+                    fired = down.pop_range(bisect_left(down.keys, price), bisect_left(down.keys, previous))
+                    for rule_id in fired:
+                        rule = self._rules[rule_id]
+                        book.rearm_above.add(rule.level + rule.hysteresis, rule_id)
+                        alerts.append(self._threshold_alert(rule_id, price, ts, 'down'))
+                    rearm = book.rearm_below
+                    for rule_id in rearm.pop_range(bisect_left(rearm.keys, price), len(rearm)):
+                        book.up.add(self._rules[rule_id].level, rule_id)
+
+            for group in self._groups.get(symbol, {}).values():
+                move = group.push(ts, price)
+                for rule_id in group.evaluate(move):
+                    alerts.append(self._move_alert(rule_id, price, ts, move))
+
+            self.alerts_fired += len(alerts)
+
+        for alert in alerts:
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    print(f"Alert sink error: {e}")
+        return alerts
+
+    def on_prices(self, prices, timestamp=None):
+        """Feeds a {symbol: price} mapping as one tick per symbol."""
+        alerts = []
+        for symbol, price in prices.items():
+            if price is not None:
+                alerts.extend(self.on_tick(symbol, price, timestamp))
+        return alerts
@@ -1,29 +1,83 @@
-def check_price_alerts(prices):
+import json
+import os
+
+from alert_engine import AlertEngine, PrintSink
+
+ALERT_RULES_FILE = os.getenv("ALERT_RULES_FILE")
+
+# Process-wide engine fed by check_price_alerts.
+engine = AlertEngine(sinks=[PrintSink()] if os.getenv("ALERT_PRINT_SINK") else [])
+
+
+def load_rules(rules, alert_engine=engine):
+    """
+    Registers alert rules from a list of dicts.
+
+    Args:
+        rules (list): Each rule is either
+            {"symbol": "BTC", "level": 31000, "kind": "above"|"below"|"cross",
+             "hysteresis": 100} or
+            {"symbol": "BTC", "pct": 5, "window_seconds": 3600,
+             "direction": "up"|"down"}. "message" is optional for both.
+        alert_engine (AlertEngine, optional): Engine to add rules to.
+
+    Returns:
+        list: Rule ids, in the order given.
+    """
+    rule_ids = []
+    for rule in rules:
+        if 'pct' in rule:
+            rule_ids.append(alert_engine.add_percent_move_rule(
+                rule['symbol'], rule['pct'], rule['window_seconds'],
+                direction=rule.get('direction', 'up'), message=rule.get('message')))
+        else:
+            rule_ids.append(alert_engine.add_threshold_rule(
+                rule['symbol'], rule['level'], kind=rule.get('kind', 'above'),
+                hysteresis=rule.get('hysteresis', 0.0), message=rule.get('message')))
+    return rule_ids
+
+
+def load_rules_file(path, alert_engine=engine):
+    """Loads rules from a JSON file containing a list of rule dicts."""
+    with open(path) as f:
+        return load_rules(json.load(f), alert_engine)
+
+
+if ALERT_RULES_FILE:
+    load_rules_file(ALERT_RULES_FILE)
+
+
+def check_price_alerts(prices, currency='USD'):
     """
-    (Placeholder) -  This will eventually check for price alerts based on
-    predefined thresholds and real-time prices.
+    Checks price alerts against real-time prices.
 
     Args:
-        prices (dict):  Dictionary of crypto prices (from cryptocompare_api).
+        prices (dict):  Dictionary of crypto prices (from cryptocompare_api),
+            e.g. {'BTC': {'USD': 30800}}.
+        currency (str, optional): Quote currency to evaluate. Defaults to 'USD'.
 
     Returns:
-        list: List of alerts triggered (empty for now).
+        list: Messages of the alerts triggered by these prices. Entries that
+              are not {currency: price} dicts (e.g. fields of an error body)
+              are ignored.
     """
-    alerts = []
-    # Add alert logic here based on price thresholds, etc.
-    # Example (very basic):
-    # if prices.get('BTC', {}).get('USD', 0) > 31000:
-    #     alerts.append("BTC price above $31000!")
-    return alerts
+    ticks = {symbol: quotes.get(currency) for symbol, quotes in (prices or {}).items()
+             if isinstance(quotes, dict)}
+    return [alert.message for alert in engine.on_prices(ticks)]
 
 if __name__ == '__main__':
     # Example usage (placeholder prices):
-    example_prices = {'BTC': {'USD': 30800}, 'ETH': {'USD': 2050}}
-    triggered_alerts = check_price_alerts(example_prices)
+    load_rules([
+        {'symbol': 'BTC', 'level': 31000, 'kind': 'above', 'hysteresis': 200},
+        {'symbol': 'ETH', 'level': 2000, 'kind': 'below'},
+        {'symbol': 'BTC', 'pct': 1, 'window_seconds': 3600, 'direction': 'up'},
+    ])
+    check_price_alerts({'BTC': {'USD': 30800}, 'ETH': {'USD': 2050}})
+    triggered_alerts = check_price_alerts({'BTC': {'USD': 31200}, 'ETH': {'USD': 1990}})
 
     if triggered_alerts:
         print("Alerts Triggered:")
         for alert in triggered_alerts:
             print(f"- {alert}")
     else:
-        print("No alerts triggered.")
\ No newline at end of file
+        print("No alerts triggered.")
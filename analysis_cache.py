@@ -0,0 +1,205 @@
+import threading
+
+from cache_backends import CACHE_LOCK_TTL, default_backend, wait_for
+
+
+def _round_significant(value, digits=4):
+    """Rounds a price to a fixed number of significant digits.
+
+    Prices that only differ in the noise (e.g. 64231.17 vs 64229.80) map to
+    the same key, so a tiny tick does not trigger a fresh LLM analysis.
+    """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if value == 0:
+        return 0.0
+    return float(f"{value:.{digits}g}")
+
+
+def analysis_key(symbol, price_data, digits=4):
+    """Builds the cache key for an analysis from the symbol and price inputs."""
+    return (
+        symbol.upper(),
+        _round_significant(price_data.get('PRICE', 0), digits),
+        _round_significant(price_data.get('HIGH24HOUR', 0), digits),
+        _round_significant(price_data.get('LOW24HOUR', 0), digits),
+    )
+
+
+class _InFlight:
+    """A pending analysis that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AnalysisCache:
+    """
+    TTL cache for LLM analyses with single-flight generation.
+
+    Analyses live in a cache backend (see cache_backends); on a shared
+    backend only one process generates a given analysis while the others
+    wait for it, so N workers cost one Gemini call instead of N.
+
+    Args:
+        ttl (float): Seconds an analysis stays valid. Defaults to 300.
+        max_entries (int): Maximum number of cached analyses before the least
+            recently used one is evicted (memory backend). Defaults to 256.
+        digits (int): Significant digits used to round the price inputs that
+            make up the key. Defaults to 4.
+        backend (optional): Cache backend; defaults to
+            cache_backends.default_backend(max_entries).
+        namespace (str): Key prefix in a shared backend. Defaults to 'analysis'.
+    """
+
+    def __init__(self, ttl=300, max_entries=256, digits=4, backend=None, namespace='analysis'):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.digits = digits
+        self.backend = backend if backend is not None else default_backend(max_entries)
+        self.namespace = namespace
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_fills = 0
+
+    def _key(self, key):
+        return f"{self.namespace}:{key!r}"
+
+    def _get(self, skey):
+        try:
+            return self.backend.get(skey)
+        except Exception as e:
+            print(f"Analysis cache backend get failed: {e}")
+            return None
+
+    def _store(self, skey, analysis):
+        try:
+            self.backend.set(skey, analysis, self.ttl)
+        except Exception as e:
+            print(f"Analysis cache backend set failed: {e}")
+
+    def get(self, key):
+        return self._get(self._key(key))
+
+    def peek(self, symbol, price_data):
+        """Returns the cached analysis for these inputs without computing one."""
+        return self.get(analysis_key(symbol, price_data, self.digits))
+
+    def set(self, key, analysis):
+        self._store(self._key(key), analysis)
+
+    def get_or_compute(self, symbol, price_data, compute, should_cache=None):
+        """
+        Returns the cached analysis for the symbol and price inputs, computing
+        it at most once across concurrent callers (and, on a shared backend,
+        across processes).
+
+        Args:
+            symbol (str): Cryptocurrency symbol (e.g., 'BTC').
+            price_data (dict): RAW price data from CryptoCompare.
+            compute (callable): Called as compute(symbol, price_data) on a miss.
+            should_cache (callable, optional): Predicate deciding whether a
+                computed analysis may be stored (e.g. to skip fallbacks).
+
+        Returns:
+            dict: The analysis.
+        """
+        skey = self._key(analysis_key(symbol, price_data, self.digits))
+        while True:
+            analysis = self._get(skey)
+            with self._lock:
+                if analysis is not None:
+                    self.hits += 1
+                    return analysis
+                pending = self._inflight.get(skey)
+                if pending is None:
+                    pending = _InFlight()
+                    self._inflight[skey] = pending
+                    self.misses += 1
+                    leader = True
+                else:
+                    self.coalesced += 1
+                    leader = False
+
+            if not leader:
+                pending.event.wait()
+                if pending.error is not None:
+                    # The leader failed; retry so one waiter becomes the new leader.
+                    continue
+                return pending.result
+
+            try:
+                result = self._compute_shared(skey, symbol, price_data, compute, should_cache)
+            except Exception as e:
+                pending.error = e
+                with self._lock:
+                    self._inflight.pop(skey, None)
+                pending.event.set()
+                raise
+
+            with self._lock:
+                self._inflight.pop(skey, None)
+            pending.result = result
+            pending.event.set()
+            return result
+
+    def _compute_shared(self, skey, symbol, price_data, compute, should_cache):
+        while True:
+            try:
+                token = self.backend.acquire(skey, CACHE_LOCK_TTL)
+            except Exception as e:
+                print(f"Analysis cache backend lock failed: {e}")
+                token = ''
+            if token is not None:
+                break
+            # Another process is generating this analysis; wait for it.
+            analysis = wait_for(self.backend, skey, ready=lambda a: a is not None)
+            if analysis is not None:
+                with self._lock:
+                    self.shared_fills += 1
+                return analysis
+        try:
+            analysis = self._get(skey)
+            if analysis is not None:
+                with self._lock:
+                    self.shared_fills += 1
+                return analysis
+            result = compute(symbol, price_data)
+            if should_cache is None or should_cache(result):
+                self._store(skey, result)
+            return result
+        finally:
+            if token:
+                try:
+                    self.backend.release(skey, token)
+                except Exception as e:
+                    print(f"Analysis cache backend unlock failed: {e}")
+
+    def stats(self):
+        """Returns hit/miss counts; 'coalesced' callers waited on an in-flight
+        analysis in this process, 'shared_fills' on one from another process."""
+        try:
+            size = self.backend.count(f"{self.namespace}:")
+        except Exception:
+            size = 0
+        with self._lock:
+            return {
+                'size': size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'shared_fills': self.shared_fills,
+            }
+
+    def clear(self):
+        self.backend.clear(f"{self.namespace}:")
+
+    def __len__(self):
+        return self.backend.count(f"{self.namespace}:")
@@ -1,15 +1,29 @@
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
-from langchain.agents import initialize_agent
-from langchain_community.tools import load_tools
-from langchain.agents import initialize_agent, load_tools
-from langchain.llms import Gemini
+import llm_provider
+from llm_gateway import estimate_tokens, gateway
 
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
+
+def build_agent():
+    """Builds the zero-shot agent once; it is shared through llm_provider."""
+    # The agent stack is only imported when an agent is first needed.
+    llm_provider.configure_genai()
+    from langchain.agents import initialize_agent, load_tools
+    from langchain.llms import Gemini
+
+    llm = Gemini(model_name="gemini-pro", google_api_key=GEMINI_API_KEY) # Specify gemini-pro
+
+    tools = load_tools([], llm=llm) # No tools needed for this basic example, just LLM
+
+    return initialize_agent(
+        tools,
+        llm,
+        agent="zero-shot-react-description", # A simple agent type
+        verbose=True # Set to True for more detailed output during agent execution
+    )
 
 def analyze_price_with_gemini(crypto_symbol, price):
     """
@@ -23,22 +37,17 @@ def analyze_price_with_gemini(crypto_symbol, price):
         str: Analysis generated by Gemini.
     """
 
-    llm = Gemini(model_name="gemini-pro", google_api_key=GEMINI_API_KEY) # Specify gemini-pro
-
-    tools = load_tools([], llm=llm) # No tools needed for this basic example, just LLM
-
-    agent = initialize_agent(
-        tools,
-        llm,
-        agent="zero-shot-react-description", # A simple agent type
-        verbose=True # Set to True for more detailed output during agent execution
-    )
+    agent = llm_provider.get_or_build(('agent', 'gemini-pro'), build_agent, 'engine_analysis')
 
     prompt = f"Analyze the current price of {crypto_symbol} which is ${price}. Provide a brief, insightful analysis. Focus on potential short-term trends or observations based on just this price point. Be concise."
 
     try:
-        analysis = agent.run(prompt)
-        return analysis
+        def run():
+            with llm_provider.timed('engine_analysis'):
+                return agent.run(prompt)
+
+        # The agent makes several model calls; reserve quota for a few.
+        return gateway.call(run, tokens=3 * estimate_tokens(prompt), label='engine_analysis')
     except Exception as e:
         return f"Error during analysis with Gemini: {e}"
 
@@ -1,130 +1,380 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request, stream_with_context
 import time
 import json
+import gzip
+import hashlib
+import math
 from datetime import datetime
-import requests
 import os
+import threading
 from dotenv import load_dotenv
-import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import LLMChain
-from langchain.prompts import ChatPromptTemplate
-from langchain_community.utilities import GoogleSerperAPIWrapper
-from functools import lru_cache
-from time import sleep
+import cryptocompare_client
+import fx_rates
+import llm_provider
+from analysis_cache import AnalysisCache
+from materiality import MaterialityGate, analysis_inputs
+from price_poller import PricePoller, SnapshotStore
+from price_stream import PriceStream
+from screener import Screener, ScreenerError, SORT_FIELDS as SCREENER_FIELDS
+from ttl_cache import TTLCache, ttl_cached
+from portfolio_manager import load_portfolio
+from ohlcv_store import get_store
+from news_index import format_age, get_news_index
+from chart_data import (DEFAULT_POINTS as CHART_DEFAULT_POINTS, MAX_POINTS as CHART_MAX_POINTS,
+                        ChartRequestError, build_series, encode_binary, encode_json,
+                        resolve_request as resolve_chart_request)
+from indicators import compute_indicators, format_indicator_facts
+import backtest
+from orchestrator import Stage, run_stages, submit
+from events import bus
+import metrics
+from metrics import span, timed_stage
+from llm_gateway import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, LLMOverloaded, gateway
+from sentiment import classify_batch, classify_lexicon, classify_single
 
 app = Flask(__name__)
 
 # Load environment variables
 load_dotenv()
 CRYPTOCARE_API_KEY = os.getenv("CRYPTOCARE_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+# 'batch' (one LLM call per query), 'per_item' or 'lexicon' (local only)
+SENTIMENT_MODE = os.getenv("SENTIMENT_MODE", "batch").lower()
+# News categories the search and the headline index know about
+NEWS_CATEGORIES = ('market', 'development', 'regulatory')
 
-# Initialize APIs
-genai.configure(api_key=GEMINI_API_KEY)
-serper = GoogleSerperAPIWrapper(serper_api_key=SERPER_API_KEY)
+# Serialized /api/chart payloads are cached per interval for these seconds
+CHART_TTLS = {'minute': 30, 'hour': 120, 'day': 300}
+# Payloads smaller than this are not worth gzipping
+CHART_GZIP_MIN_BYTES = 1024
+# Daily candles fed to the indicator engine (enough for SMA(200))
+INDICATOR_LOOKBACK_DAYS = 250
+# Per-stage deadlines (seconds from the start of a dashboard request)
+PRICE_DEADLINE = float(os.getenv("PRICE_DEADLINE", 3))
+HISTORY_DEADLINE = float(os.getenv("HISTORY_DEADLINE", 5))
+NEWS_DEADLINE = float(os.getenv("NEWS_DEADLINE", 8))
+ANALYSIS_DEADLINE = float(os.getenv("ANALYSIS_DEADLINE", 12))
+# Adds a Server-Timing header with the stage timings of each response
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() in ('1', 'true', 'yes')
 
-@lru_cache(maxsize=128)
-def get_cached_price(symbol, timestamp):
+# Built on first search (see llm_provider), not at import
+serper = llm_provider.LazyClient(llm_provider.get_serper)
+
+# Watched symbols are refreshed in the background with one batched
+# pricemultifull call, so page loads read prices without upstream latency.
+WATCHED_SYMBOLS = [s.strip().upper() for s in os.getenv("WATCHED_SYMBOLS", "BTC,ETH").split(',') if s.strip()]
+# Symbols a request may add to the background refresh besides the screener
+# universe and portfolio holdings
+WATCH_ALLOWLIST = {s.strip().upper() for s in os.getenv("WATCH_ALLOWLIST", "").split(',') if s.strip()}
+
+def is_watchable(symbol):
+    """Whether a requested symbol may be refreshed in the background."""
+    if symbol in WATCH_ALLOWLIST or screener.lists(symbol):
+        return True
+    return _portfolio is not None and symbol in _portfolio.ledger.symbols
+
+price_store = SnapshotStore()
+price_poller = PricePoller(price_store, WATCHED_SYMBOLS,
+                           interval=int(os.getenv("PRICE_POLL_INTERVAL", 30)),
+                           on_update=lambda prices: bus.publish('prices', {
+                               'prices': prices, 'updated_at': time.time()}),
+                           allow=is_watchable)
+
+# 'stream' adds one upstream WebSocket subscription for all watched symbols;
+# ticks are merged into the snapshot store and fanned out to every SSE client
+# over the event bus. The REST poller keeps running as the full-data backstop.
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "poll").lower()
+
+def publish_tickers(tickers):
+    updated_at = time.time()
+    price_store.merge(tickers, updated_at)
+    for symbol, ticker in tickers.items():
+        bus.publish('ticker', {'symbol': symbol, 'ticker': ticker, 'updated_at': updated_at})
+
+price_stream = PriceStream(WATCHED_SYMBOLS, on_update=publish_tickers, allow=is_watchable,
+                           idle_ttl=price_poller.watching.idle_ttl) \
+    if PRICE_SOURCE == 'stream' else None
+
+def watch_symbol(symbol):
+    """Keeps a requested symbol refreshed by the poller (and stream, when on)."""
+    watched = price_poller.watch(symbol)
+    if price_stream is not None:
+        price_stream.watch(symbol)
+    return watched
+
+# Top coins by market cap; shares its batched quotes with the price store so
+# any screener coin opens with a price.
+screener = Screener(default_symbols=WATCHED_SYMBOLS, on_quotes=price_store.update)
+# Coin buttons shown in the header
+COIN_BUTTONS = int(os.getenv("COIN_BUTTONS", 8))
+
+# Transactions CSV or .npz snapshot valued by /api/portfolio (same settings as main.py)
+PORTFOLIO_FILE = os.getenv("PORTFOLIO_FILE")
+PORTFOLIO_COST_METHOD = os.getenv("PORTFOLIO_COST_METHOD", "fifo")
+PORTFOLIO_CURRENCY = os.getenv("PORTFOLIO_CURRENCY", fx_rates.BASE_CURRENCY).upper()
+_portfolio = None
+_portfolio_lock = threading.Lock()
+
+def get_portfolio():
+    """Loads the portfolio once; returns it with the lock guarding its prices."""
+    global _portfolio
+    with _portfolio_lock:
+        if _portfolio is None:
+            _portfolio = load_portfolio(PORTFOLIO_FILE, method=PORTFOLIO_COST_METHOD,
+                                        currency=PORTFOLIO_CURRENCY)
+    return _portfolio
+
+@app.template_filter('money')
+def format_money(value, currency=fx_rates.BASE_CURRENCY, decimals=2):
+    """Amount with the currency's sign; sub-unit amounts (e.g. in BTC) keep 6 significant digits."""
+    sign = fx_rates.CURRENCY_SIGNS.get(currency, currency + ' ')
+    value = float(value or 0)
+    if value and abs(value) < 1:
+        return f"{sign}{value:.6g}"
+    return f"{sign}{value:,.{decimals}f}"
+
+# Analyses are keyed by symbol + rounded price inputs, so page refreshes
+# within the TTL reuse one Gemini call instead of issuing a new one.
+analysis_cache = AnalysisCache(
+    ttl=int(os.getenv("ANALYSIS_CACHE_TTL", 300)),
+    max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", 256))
+)
+
+# Unless the price, 24h range or volatility moved materially (or the analysis
+# is too old), the previous analysis is served with an 'as_of' marker.
+materiality_gate = MaterialityGate()
+
+# Chart responses are cached already serialized (body, gzip body and ETag),
+# so a hit costs no candle formatting or JSON encoding.
+chart_caches = {
+    interval: TTLCache(ttl, stale_ttl=ttl, negative_ttl=30, is_negative=lambda payload: payload is None,
+                       namespace=f"chart:{interval}")
+    for interval, ttl in CHART_TTLS.items()
+}
+
+# Failed fetches return {}/[]; those are cached briefly as negative results
+# instead of for the full window.
+@ttl_cached(ttl=300, stale_ttl=300, negative_ttl=30, is_negative=lambda data: not data)
+def get_cached_price(symbol):
     return get_crypto_price(symbol)
 
-@lru_cache(maxsize=128)
-def get_cached_historical(symbol, timestamp):
-    return get_historical_data(symbol)
+@ttl_cached(ttl=300, stale_ttl=900, negative_ttl=30, is_negative=lambda data: not data)
+def get_cached_historical(symbol, limit=30):
+    return get_historical_data(symbol, limit)
+
+@ttl_cached(ttl=300, stale_ttl=900, negative_ttl=60, is_negative=lambda data: not data)
+def get_cached_news(symbol, category):
+    news = get_crypto_news(symbol, category)
+    bus.publish('news', {'symbol': symbol, 'category': category, 'news': news})
+    return news
+
+def collect_app_metrics():
+    """Scrape-time metrics that live in other components."""
+    gate = materiality_gate.stats()
+    queue = gateway.stats()
+    news = get_news_index().stats()
+    coins = screener.stats()
+    llm_calls, llm_seconds = [], []
+    for label, phases in llm_provider.get_timing_stats().items():
+        for phase, stats in phases.items():
+            llm_calls.append(({'label': label, 'phase': phase}, stats['count']))
+            llm_seconds.append(({'label': label, 'phase': phase}, stats['total_seconds']))
+    return [
+        ('crypto_llm_calls_total', 'counter', 'LLM calls by label and phase.', llm_calls),
+        ('crypto_llm_seconds_total', 'counter', 'Seconds spent in LLM calls.', llm_seconds),
+        ('crypto_analysis_gate_total', 'counter', 'Analyses reused or refreshed by the materiality gate.',
+         [({'result': 'reused'}, gate['reused']), ({'result': 'refreshed'}, gate['refreshed'])]),
+        ('crypto_analysis_refresh_reasons_total', 'counter', 'Why analyses were refreshed.',
+         [({'reason': reason}, count) for reason, count in gate['refresh_reasons'].items()]),
+        ('crypto_llm_gateway_calls_total', 'counter', 'LLM gateway outcomes.',
+         [({'outcome': outcome}, queue[outcome])
+          for outcome in ('admitted', 'shed', 'expired', 'rate_limited', 'retried')]),
+        ('crypto_llm_gateway_queued', 'gauge', 'LLM calls waiting for quota.', [({}, queue['queued'])]),
+        ('crypto_news_headlines_total', 'counter', 'Headlines ingested into the news index by outcome.',
+         [({'outcome': outcome}, news[outcome])
+          for outcome in ('new', 'known', 'duplicates', 'other_category', 'untitled',
+                          'sentiment_reused')]),
+        ('crypto_news_classified_total', 'counter', 'Headlines sent for sentiment classification.',
+         [({}, news['classified'])]),
+        ('crypto_news_index_headlines', 'gauge', 'Headlines stored in the news index.',
+         [({}, news['headlines'])]),
+        ('crypto_screener_coins', 'gauge', 'Screener coins, and those with enough history for statistics.',
+         [({'state': 'tracked'}, coins['universe']), ({'state': 'with_history'}, coins['with_history'])]),
+        ('crypto_sse_subscribers', 'gauge', 'Connected Server-Sent Events clients.',
+         [({}, bus.subscriber_count)]),
+    ]
+
+metrics.registry.register_collector(metrics.cache_stats_collector({
+    'price': get_cached_price.cache,
+    'historical': get_cached_historical.cache,
+    'news': get_cached_news.cache,
+    'analysis': analysis_cache,
+    **{f"chart_{interval}": cache for interval, cache in chart_caches.items()},
+}))
+metrics.registry.register_collector(collect_app_metrics)
+
+def with_as_of(analysis, as_of, reused):
+    """Returns a copy of the analysis marked with when it was generated."""
+    return dict(analysis, as_of=as_of, reused=reused)
+
+def peek_analysis(symbol, price_data):
+    """Returns an analysis that can be served without calling Gemini, or None."""
+    reused = materiality_gate.reuse(symbol, analysis_inputs(price_data), count=False)
+    if reused is not None:
+        return with_as_of(reused[0], reused[1], True)
+    return analysis_cache.peek(symbol, price_data)
+
+def get_cached_analysis(symbol, price_data):
+    def compute(symbol, price_data):
+        indicators = get_indicators(symbol, price_data.get('PRICE'))
+        analysis = with_as_of(analyze_with_gemini(symbol, price_data, indicators=indicators),
+                              time.time(), False)
+        bus.publish('analysis', {'symbol': symbol, 'analysis': analysis})
+        return analysis
+
+    inputs = analysis_inputs(price_data)
+    reused = materiality_gate.reuse(symbol, inputs)
+    if reused is not None:
+        return with_as_of(reused[0], reused[1], True)
+    analysis = analysis_cache.get_or_compute(
+        symbol, price_data, compute,
+        should_cache=lambda analysis: not analysis.get('is_fallback')
+    )
+    if not analysis.get('is_fallback'):
+        materiality_gate.record(symbol, inputs, analysis, as_of=analysis['as_of'])
+    return analysis
+
+def analyze_price(symbol, price_data):
+    if not price_data:
+        return unavailable_analysis()
+    return get_cached_analysis(symbol, price_data)
+
+def unavailable_analysis():
+    return {
+        "market_points": ["Price data unavailable"],
+        "outlook_points": ["Analysis unavailable"],
+        "support": 0,
+        "resistance": 0
+    }
+
+def get_indicators(symbol, price=None):
+    """Computes technical indicators locally from the stored daily candles."""
+    candles = get_cached_historical(symbol, INDICATOR_LOOKBACK_DAYS)
+    if not candles:
+        return {}
+    return compute_indicators(candles, price)
 
-@lru_cache(maxsize=128)
-def get_cached_news(symbol, category, timestamp):
-    return get_crypto_news(symbol, category)
+def get_snapshot_price(symbol):
+    """
+    Returns (price_data, age_seconds) from the snapshot store, falling back to
+    a synchronous fetch the first time a newly watched symbol is requested.
+    Symbols the poller refuses to watch are served from the TTL-cached fetch
+    (age None) and never stored, since nothing would refresh them.
+    """
+    symbol = symbol.upper()
+    if not watch_symbol(symbol):
+        return get_cached_price(symbol) or {}, None
+    price_data, updated_at = price_store.get(symbol)
+    if price_data is None:
+        price_data = get_cached_price(symbol)
+        if price_data:
+            price_store.put(symbol, price_data)
+            updated_at = time.time()
+    age = None if updated_at is None else round(time.time() - updated_at, 1)
+    return price_data or {}, age
 
+@timed_stage('price')
 def get_crypto_price(symbol):
-    url = f"https://min-api.cryptocompare.com/data/pricemultifull?fsyms={symbol}&tsyms=USD&api_key={CRYPTOCARE_API_KEY}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = cryptocompare_client.get('/data/pricemultifull', fsyms=symbol, tsyms='USD')
         return data.get('RAW', {}).get(symbol, {}).get('USD', {})
     except Exception as e:
         print(f"Error fetching price: {e}")
         return {}
 
+@timed_stage('history')
 def get_historical_data(symbol, limit=30):
-    url = f"https://min-api.cryptocompare.com/data/v2/histoday?fsym={symbol}&tsym=USD&limit={limit}&api_key={CRYPTOCARE_API_KEY}"
+    # Served from the local candle store; only candles newer than the last
+    # stored one are downloaded.
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('Data', {}).get('Data', [])
+        return get_store().get_candles(symbol, 'USD', 'day', lookback=limit)
     except Exception as e:
         print(f"Error fetching historical data: {e}")
         return []
 
 
-def analyze_with_gemini(symbol, price_data, max_retries=3):
-    for attempt in range(max_retries):
-        try:
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-pro",
-                google_api_key=GEMINI_API_KEY,
-                temperature=0.7
-            )
-
-            template = """You are an expert cryptocurrency analyst. Analyze the following data for {symbol}:
+ANALYSIS_TEMPLATE = """You are an expert cryptocurrency analyst. Analyze the following data for {symbol}:
             Current Price: ${price}
             24h High: ${high}
             24h Low: ${low}
 
+            Technical indicators computed from daily candles (use these exact values, do not invent others):
+            {indicator_facts}
+
             Return a detailed analysis in this exact JSON format:
             {{
                 "market_points": [
                     "Detailed price trend: {symbol} has moved [up/down] by X% in the last 24h, currently at ${price}. This movement indicates...",
                     "Volume analysis: Trading volume shows [increasing/decreasing] momentum, suggesting...",
-                    "Technical indicators: RSI/MACD/Moving Averages are showing [bullish/bearish] signals because..."
+                    "Technical indicators: RSI/MACD/Moving Averages (quote the values above) are showing [bullish/bearish] signals because..."
                 ],
                 "outlook_points": [
                     "Price target: Expect movement towards $X in the short term based on...",
                     "Key levels: Major resistance at [price levels] and support at [price levels] based on recent trading patterns",
                     "Trading strategy: Consider [specific action] at current levels because..."
                 ],
-                "support": {low},
-                "resistance": {high}
+                "support": {support},
+                "resistance": {resistance}
             }}
 
             Make each point specific, data-driven, and actionable. Include actual price levels and percentages."""
 
-            prompt = ChatPromptTemplate.from_template(template)
-            chain = LLMChain(llm=llm, prompt=prompt)
+@timed_stage('analysis')
+def analyze_with_gemini(symbol, price_data, indicators=None):
+    # Rate limits are handled by the LLM gateway: the call queues ahead of
+    # background work, and is shed to the fallback when quota is not
+    # expected within LLM_INTERACTIVE_MAX_WAIT.
+    indicators = indicators or {}
+    support = indicators.get('support') or price_data.get('LOW24HOUR', 0)
+    resistance = indicators.get('resistance') or price_data.get('HIGH24HOUR', 0)
+    try:
+        chain = llm_provider.get_chain(ANALYSIS_TEMPLATE, temperature=0.7, label='analysis')
 
-            analysis = chain.invoke({
-                "symbol": symbol,
-                "price": "{:,.2f}".format(price_data.get('PRICE', 0)),
-                "high": price_data.get('HIGH24HOUR', 0),
-                "low": price_data.get('LOW24HOUR', 0)
-            })
+        analysis = llm_provider.invoke(chain, {
+            "symbol": symbol,
+            "price": "{:,.2f}".format(price_data.get('PRICE', 0)),
+            "high": price_data.get('HIGH24HOUR', 0),
+            "low": price_data.get('LOW24HOUR', 0),
+            "indicator_facts": format_indicator_facts(indicators),
+            "support": support,
+            "resistance": resistance
+        }, label='analysis', priority=PRIORITY_INTERACTIVE)
+    except LLMOverloaded as e:
+        print(f"Analysis shed ({e}), serving fallback")
+        return generate_fallback_analysis(symbol, price_data, indicators)
+    except Exception as e:
+        print(f"Analysis error: {e}")
+        return generate_fallback_analysis(symbol, price_data, indicators)
 
-            try:
-                response_text = analysis.get('text', '').strip()
-                if not response_text.startswith('{'): 
-                    response_text = response_text[response_text.find('{'):]
-                if not response_text.endswith('}'): 
-                    response_text = response_text[:response_text.rfind('}')+1]
-                    
-                return json.loads(response_text)
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                return generate_fallback_analysis(symbol, price_data)
-
-        except Exception as e:
-            if "429" in str(e) and attempt < max_retries - 1:
-                sleep_time = (attempt + 1) * 2
-                print(f"Rate limit hit, retrying in {sleep_time} seconds...")
-                sleep(sleep_time)
-                continue
-            print(f"Analysis error: {e}")
-            return generate_fallback_analysis(symbol, price_data)
+    try:
+        response_text = analysis.get('text', '').strip()
+        if not response_text.startswith('{'): 
+            response_text = response_text[response_text.find('{'):]
+        if not response_text.endswith('}'): 
+            response_text = response_text[:response_text.rfind('}')+1]
+            
+        result = json.loads(response_text)
+        # Levels come from local pivots, not from the model.
+        result['support'] = support
+        result['resistance'] = resistance
+        result['indicators'] = indicators
+        return result
+    except json.JSONDecodeError as e:
+        print(f"JSON parsing error: {e}")
+        return generate_fallback_analysis(symbol, price_data, indicators)
 
-def generate_fallback_analysis(symbol, price_data):
+def generate_fallback_analysis(symbol, price_data, indicators=None):
     """Generate fallback analysis when main analysis fails"""
+    indicators = indicators or {}
     return {
         "market_points": [
             f"{symbol} is currently trading at ${price_data.get('PRICE', 0):,.2f}",
@@ -136,105 +386,521 @@ def generate_fallback_analysis(symbol, price_data):
             "Support and resistance levels being calculated",
             "Try again in a few moments"
         ],
-        "support": price_data.get('LOW24HOUR', 0),
-        "resistance": price_data.get('HIGH24HOUR', 0)
+        "support": indicators.get('support') or price_data.get('LOW24HOUR', 0),
+        "resistance": indicators.get('resistance') or price_data.get('HIGH24HOUR', 0),
+        "indicators": indicators,
+        "is_fallback": True
     }
 
 
 
-def get_crypto_news(symbol, category='market', max_retries=3):
-    for attempt in range(max_retries):
-        try:
-            queries = {
-                'market': f"{symbol} cryptocurrency price market analysis news last 24 hours",
-                'development': f"{symbol} blockchain development updates technical news",
-                'regulatory': f"{symbol} cryptocurrency regulation compliance news"
-            }
-            
+def classify_headlines(titles):
+    """
+    Classifies headline sentiment according to SENTIMENT_MODE.
+
+    Returns:
+        tuple: (sentiments, methods), one 'llm' or 'lexicon' per headline
+               naming what produced its sentiment.
+    """
+    if SENTIMENT_MODE == 'lexicon' or not titles:
+        return [classify_lexicon(title) for title in titles], ['lexicon'] * len(titles)
+
+    # Sentiment queues behind interactive analyses and is shed to the
+    # lexicon when the gateway is backed up.
+    llm = llm_provider.GatedLLM(llm_provider.get_llm(temperature=0.3, label='sentiment'), 'sentiment',
+                                priority=PRIORITY_BACKGROUND)
+    if SENTIMENT_MODE == 'per_item':
+        sentiments, methods = [], []
+        with span('sentiment'):
+            for title in titles:
+                try:
+                    sentiments.append(classify_single(llm, title))
+                    methods.append('llm')
+                except Exception as e:
+                    print(f"Sentiment error, using lexicon fallback: {e}")
+                    sentiments.append(classify_lexicon(title))
+                    methods.append('lexicon')
+        return sentiments, methods
+
+    try:
+        with span('sentiment'):
+            return classify_batch(llm, titles), ['llm'] * len(titles)
+    except Exception as e:
+        # Rate-limited, shed or unavailable: classify locally rather than retrying.
+        print(f"Batch sentiment error, using lexicon fallback: {e}")
+        return [classify_lexicon(title) for title in titles], ['lexicon'] * len(titles)
+
+def needs_reclassification(method):
+    """Lexicon fallbacks are upgraded once the LLM answers again."""
+    return method == 'lexicon' and SENTIMENT_MODE != 'lexicon'
+
+@timed_stage('news')
+def get_crypto_news(symbol, category='market'):
+    # No sleep-and-retry here: failures are negative-cached briefly by
+    # get_cached_news, and sentiment falls back to the lexicon on its own.
+    try:
+        queries = {
+            'market': f"{symbol} cryptocurrency price market analysis news last 24 hours",
+            'development': f"{symbol} blockchain development updates technical news",
+            'regulatory': f"{symbol} cryptocurrency regulation compliance news"
+        }
+        
+        with span('news_search'), llm_provider.timed('search'):
             search_results = serper.run(queries.get(category, queries['market']))
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-pro",
-                google_api_key=GEMINI_API_KEY,
-                temperature=0.3
-            )
-
-            news_items = []
-            for result in search_results.split('\n')[:6]:
-                if not result.strip():
-                    continue
-                    
-                parts = result.split(' - ', 1)
-                title = parts[0].strip()
-                snippet = parts[1] if len(parts) > 1 else ''
-                
-                source_parts = snippet.split(' | ')
-                source = source_parts[0] if len(source_parts) > 1 else 'News Source'
+
+        news_items = []
+        for result in search_results.split('\n')[:6]:
+            if not result.strip():
+                continue
                 
-                try:
-                    sentiment_prompt = f"Analyze the sentiment of this crypto news headline: '{title}'. Respond with ONLY one word: positive, negative, or neutral"
-                    sentiment = llm.predict(sentiment_prompt).lower().strip()
-                except Exception:
-                    sentiment = "neutral"
-                    
-                news_items.append({
-                    'title': title,
-                    'snippet': snippet,
-                    'source': source,
-                    'time': 'Recent',
-                    'sentiment': sentiment
-                })
+            parts = result.split(' - ', 1)
+            title = parts[0].strip()
+            snippet = parts[1] if len(parts) > 1 else ''
             
-            return news_items
-        except Exception as e:
-            if "429" in str(e) and attempt < max_retries - 1:
-                sleep_time = (attempt + 1) * 2
-                print(f"Rate limit hit, retrying in {sleep_time} seconds...")
-                sleep(sleep_time)
-                continue
-            print(f"News fetching error: {e}")
-            return []
+            source_parts = snippet.split(' | ')
+            source = source_parts[0] if len(source_parts) > 1 else 'News Source'
+                
+            news_items.append({
+                'title': title,
+                'snippet': snippet,
+                'source': source,
+            })
+
+        # Only headlines the index has no sentiment for go to the model;
+        # stories already listed under another category are dropped.
+        index = get_news_index()
+        news_items = index.ingest(symbol, category, news_items,
+                                  needs_sentiment=needs_reclassification)
+        pending = [item for item in news_items if item['sentiment'] is None]
+        if pending:
+            sentiments, methods = classify_headlines([item['title'] for item in pending])
+            by_method = {}
+            for item, sentiment, method in zip(pending, sentiments, methods):
+                item['sentiment'] = sentiment
+                by_method.setdefault(method, {})[item['hash']] = sentiment
+            # Lexicon answers are stored as such so a later search upgrades them.
+            for method, recorded in by_method.items():
+                index.record_sentiments(recorded, method)
+
+        now = time.time()
+        for item in news_items:
+            item['time'] = format_age(item['first_seen'], now)
+        return news_items
+    except Exception as e:
+        print(f"News fetching error: {e}")
+        return []
+
+@app.before_request
+def start_price_poller():
+    price_poller.start()
+    screener.start()
+    if price_stream is not None:
+        price_stream.start()
+
+if llm_provider.LLM_PREWARM:
+    llm_provider.prewarm(lambda: llm_provider.get_chain(ANALYSIS_TEMPLATE, temperature=0.7,
+                                                        label='analysis'),
+                         lambda: llm_provider.get_llm(temperature=0.3, label='sentiment'),
+                         llm_provider.get_serper)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start_request()
+
+@app.after_request
+def record_request_timing(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    metrics.HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unmatched',
+                                         method=request.method, status=response.status_code)
+    if METRICS_SERVER_TIMING:
+        response.headers['Server-Timing'] = metrics.server_timing_header(
+            metrics.request_timings(), total=elapsed)
+    return response
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of stage timings, retries and cache counters."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/prices')
+def get_prices():
+    symbols = request.args.get('symbols')
+    if symbols:
+        symbols = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+        for symbol in symbols:
+            price_poller.watch(symbol)
+    else:
+        # Screener quotes share the store but are not polled; list only watched symbols.
+        symbols = price_poller.symbols
+    try:
+        currency = fx_rates.normalize_currency(request.args.get('currency'))
+        snapshot = price_store.snapshot(symbols)
+        if currency != fx_rates.BASE_CURRENCY:
+            # Derived from the cached rate table; no upstream call per currency.
+            rate = fx_rates.get_rate(currency)
+            snapshot['prices'] = {symbol: fx_rates.convert_quote(data, currency, rate)
+                                  for symbol, data in snapshot['prices'].items()}
+    except fx_rates.FXError as e:
+        return jsonify({'error': str(e)}), 400
+    snapshot['currency'] = currency
+    snapshot['poll_interval'] = price_poller.interval
+    snapshot['stale'] = [s for s in symbols if price_poller.is_stale(s)]
+    return jsonify(snapshot)
+
+@app.route('/api/fx')
+def get_fx_rates():
+    """Cached cross rates: rates per 1 base currency and the full conversion matrix."""
+    table = fx_rates.get_rate_table()
+    if not table:
+        return jsonify({'error': 'FX rates unavailable'}), 503
+    currencies, matrix = fx_rates.rate_matrix(table['rates'], fx_rates.FX_CURRENCIES)
+    return jsonify(dict(table, currencies=currencies, matrix=matrix.tolist()))
+
+@app.route('/api/portfolio')
+def get_portfolio_summary():
+    """Holdings valued at snapshot prices, in ?currency= (default: the portfolio's)."""
+    portfolio = get_portfolio()
+    symbols = list(portfolio.ledger.symbols)
+    for symbol in symbols:
+        price_poller.watch(symbol)
+    prices = {symbol: data['PRICE'] for symbol, data in price_store.snapshot(symbols)['prices'].items()
+              if data.get('PRICE')}
+    try:
+        currency = fx_rates.normalize_currency(request.args.get('currency') or portfolio.currency)
+        if portfolio.currency != fx_rates.BASE_CURRENCY:
+            prices = fx_rates.convert_prices(prices, portfolio.currency)
+        rate = fx_rates.get_rate(currency, portfolio.currency)
+    except fx_rates.FXError as e:
+        return jsonify({'error': str(e)}), 400
+    with _portfolio_lock:
+        portfolio.update_prices(prices)
+        return jsonify(portfolio.summary(currency, rate))
+
+@app.route('/api/backtest')
+def get_backtest():
+    """
+    Backtests a strategy on daily candles, sweeping any parameter given as a
+    comma-separated list.
+
+    Query: symbols (default BTC), strategy (ma_crossover, rsi_bands or
+    breakout), days, fee_bps, top (results returned), sweep=1 for the
+    strategy's default grid, and strategy parameters such as fast=5,10,20.
+    """
+    symbols = list(dict.fromkeys(
+        s.strip().upper() for s in request.args.get('symbols', 'BTC').split(',') if s.strip()))
+    strategy = request.args.get('strategy', 'ma_crossover')
+    days = min(max(request.args.get('days', backtest.DEFAULT_DAYS, type=int), 30), 3650)
+    fee_bps = request.args.get('fee_bps', backtest.DEFAULT_FEE_BPS, type=float)
+    top = min(max(request.args.get('top', 20, type=int), 1), 500)
+    try:
+        # Each symbol is a store sync against CryptoCompare, so the count is
+        # capped on its own, not only through the combination limit.
+        if not symbols or len(symbols) > backtest.BACKTEST_MAX_SYMBOLS:
+            raise backtest.BacktestError(
+                f"Give 1 to {backtest.BACKTEST_MAX_SYMBOLS} symbols, got {len(symbols)}")
+        if not math.isfinite(fee_bps) or fee_bps < 0:
+            raise backtest.BacktestError(f"fee_bps must be a non-negative number, got {fee_bps}")
+        if strategy not in backtest.STRATEGIES:
+            raise backtest.BacktestError(f"Unknown strategy '{strategy}'")
+        defaults = backtest.STRATEGIES[strategy][1]
+        pairs = [f"{name}={request.args[name]}" for name in defaults if name in request.args]
+        if pairs:
+            grid = backtest.parse_grid(pairs)
+        else:
+            grid = None if request.args.get('sweep') == '1' else {}
+        combinations = len(backtest.expand_grid(strategy, grid)) * len(symbols)
+        if not combinations:
+            raise backtest.BacktestError("No valid parameter combinations")
+        if combinations > backtest.BACKTEST_MAX_COMBINATIONS:
+            raise backtest.BacktestError(
+                f"{combinations} backtests requested; the limit is {backtest.BACKTEST_MAX_COMBINATIONS}")
+    except backtest.BacktestError as e:
+        return jsonify({'error': str(e)}), 400
+
+    with span('backtest_data'):
+        loads = {symbol: submit(backtest.load_arrays, symbol, days) for symbol in symbols}
+        data = {symbol: future.result() for symbol, future in loads.items()}
+    started = time.perf_counter()
+    with span('backtest'):
+        results = backtest.sweep(data, strategy, grid, fee_bps)
+    return jsonify({
+        'strategy': strategy,
+        'days': days,
+        'fee_bps': fee_bps,
+        'combinations': len(results),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'results': results[:top],
+        'buy_and_hold': {symbol: backtest.buy_and_hold(arrays)
+                         for symbol, arrays in data.items() if len(arrays['close'])},
+        'missing': [symbol for symbol, arrays in data.items() if not len(arrays['close'])],
+    })
+
+@app.route('/api/screener')
+def get_screener():
+    """
+    Top coins with returns, volatility, momentum rank and correlations.
+
+    Query: sort (one of screener.SORT_FIELDS), order (asc/desc), limit,
+    offset, min_<field>/max_<field> filters (e.g. min_market_cap=1e9),
+    correlate (symbol to correlate every row with) and correlation=1 for
+    the correlation matrix of the returned rows.
+    """
+    filters = {}
+    for name in request.args:
+        if name.startswith(('min_', 'max_')):
+            value = request.args.get(name, type=float)
+            if value is None:
+                return jsonify({'error': f"Invalid value for '{name}'"}), 400
+            filters[name] = value
+    correlate = request.args.get('correlate')
+    try:
+        result = screener.query(
+            sort=request.args.get('sort', 'rank'),
+            order=request.args.get('order'),
+            limit=min(max(request.args.get('limit', 50, type=int), 1), 500),
+            offset=max(request.args.get('offset', 0, type=int), 0),
+            filters=filters,
+            correlate=correlate.upper() if correlate else None,
+            correlation=request.args.get('correlation') == '1')
+    except ScreenerError as e:
+        return jsonify({'error': str(e), 'fields': list(SCREENER_FIELDS)}), 400
+    return jsonify(result)
+
+@app.route('/api/indicators/<symbol>')
+def get_indicator_data(symbol):
+    symbol = symbol.upper()
+    price_data, _ = get_snapshot_price(symbol)
+    indicators = get_indicators(symbol, price_data.get('PRICE'))
+    if not indicators:
+        return jsonify({'error': 'No data available'})
+    return jsonify({'symbol': symbol, 'indicators': indicators})
+
+@app.route('/api/llm/timings')
+def get_llm_timings():
+    return jsonify(llm_provider.get_timing_stats())
+
+@app.route('/api/llm/gateway')
+def get_gateway_stats():
+    return jsonify(gateway.stats())
+
+@app.route('/api/llm/gate')
+def get_materiality_stats():
+    return jsonify(materiality_gate.stats())
+
+def build_chart_payload(symbol, interval, count, points, fmt, currency=fx_rates.BASE_CURRENCY):
+    series = build_series(symbol, interval, count, points, currency)
+    if not len(series['t']):
+        return None
+    body = encode_binary(series) if fmt == 'f32' else encode_json(symbol, interval, series, currency)
+    return {
+        'body': body,
+        'gzip': gzip.compress(body, 6) if len(body) >= CHART_GZIP_MIN_BYTES else None,
+        'etag': hashlib.sha1(body).hexdigest()[:20],
+    }
+
+def serve_cached_payload(payload, mimetype, max_age):
+    """Serves a pre-serialized payload with a weak ETag (304 on match) and pre-built gzip."""
+    if request.if_none_match.contains_weak(payload['etag']):
+        response = Response(status=304)
+    elif payload['gzip'] is not None and request.accept_encodings['gzip']:
+        response = Response(payload['gzip'], mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(payload['body'], mimetype=mimetype)
+    response.set_etag(payload['etag'], weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response
 
 @app.route('/api/chart/<symbol>')
 def get_chart_data(symbol):
-    current_timestamp = int(time.time()) // 300 * 300
-    historical_data = get_cached_historical(symbol, current_timestamp)
-    
-    if historical_data:
-        chart_data = {
-            'labels': [datetime.fromtimestamp(item['time']).strftime('%Y-%m-%d') 
-                      for item in historical_data],
-            'prices': [item['close'] for item in historical_data]
-        }
-        return jsonify(chart_data)
-    return jsonify({'error': 'No data available'})
+    """
+    Price history as compact parallel arrays ({'t': epochs, 'c': closes,
+    'v': volumes}), or packed float32 with ?format=f32 (see chart_data).
+
+    Query: range (e.g. 24h, 7d, 3m, 5y, max), interval (minute/hour/day,
+    chosen from the range by default), points (LTTB target, 0 = all),
+    currency (converted from stored USD candles) and the legacy days (a
+    daily range).
+    """
+    symbol = symbol.upper()
+    fmt = 'f32' if request.args.get('format') == 'f32' else 'json'
+    try:
+        interval, count = resolve_chart_request(request.args.get('range'),
+                                                request.args.get('interval'),
+                                                request.args.get('days', type=int))
+        currency = fx_rates.normalize_currency(request.args.get('currency'))
+    except (ChartRequestError, fx_rates.FXError) as e:
+        return jsonify({'error': str(e)}), 400
+    points = min(max(request.args.get('points', CHART_DEFAULT_POINTS, type=int), 0),
+                 CHART_MAX_POINTS)
+    try:
+        payload = chart_caches[interval].get_or_load(
+            (symbol, count, points, fmt, currency),
+            lambda: build_chart_payload(symbol, interval, count, points, fmt, currency))
+    except fx_rates.FXError as e:
+        return jsonify({'error': str(e)}), 503
+    if payload is None:
+        return jsonify({'error': 'No data available'})
+    mimetype = 'application/octet-stream' if fmt == 'f32' else 'application/json'
+    return serve_cached_payload(payload, mimetype, CHART_TTLS[interval])
+
+@app.route('/api/analysis/<symbol>')
+def get_analysis_data(symbol):
+    symbol = symbol.upper()
+    results, _ = run_stages([
+        Stage('price', lambda: get_snapshot_price(symbol),
+              deadline=PRICE_DEADLINE, fallback=({}, None)),
+        Stage('history', lambda: get_cached_historical(symbol, INDICATOR_LOOKBACK_DAYS),
+              deadline=HISTORY_DEADLINE, fallback=list),
+        Stage('analysis', lambda price: analyze_price(symbol, price[0]),
+              deadline=ANALYSIS_DEADLINE, depends_on='price'),
+    ])
+    price_data, _ = results['price']
+    analysis = results['analysis']
+    pending = analysis is None
+    if pending:
+        analysis = generate_fallback_analysis(symbol, price_data) if price_data \
+            else unavailable_analysis()
+    return jsonify({'symbol': symbol, 'analysis': analysis, 'pending': pending})
+
+@app.route('/api/news/<symbol>')
+def get_news_data(symbol):
+    symbol = symbol.upper()
+    category = request.args.get('category', 'market')
+    # Headlines are owned by the first category they are indexed under, so
+    # an unknown category must never reach the cache or the index.
+    if category not in NEWS_CATEGORIES:
+        return jsonify({'error': f"Unknown category '{category}'",
+                        'categories': list(NEWS_CATEGORIES)}), 400
+    results, _ = run_stages([
+        Stage('news', lambda: get_cached_news(symbol, category),
+              deadline=NEWS_DEADLINE, fallback=None),
+    ])
+    news = results['news']
+    return jsonify({'symbol': symbol, 'category': category,
+                    'news': news or [], 'pending': news is None})
+
+def sse_unavailable():
+    """503 for an SSE request over the per-process subscriber limit (SSE_MAX_SUBSCRIBERS)."""
+    response = jsonify({'error': 'Too many open event streams'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '30'
+    return response
+
+@app.route('/api/stream/prices')
+def stream_prices():
+    """
+    Server-Sent Events of live tickers for ?symbols=BTC,ETH (default: all
+    watched). Starts with a 'snapshot' event, then one 'ticker' event per
+    update; all clients share the single upstream subscription.
+    """
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    for symbol in symbols:
+        watch_symbol(symbol)
+    wanted = set(symbols)
+
+    def accept(event, data):
+        return event == 'ticker' and (not wanted or data['symbol'] in wanted)
+
+    subscription = bus.subscribe()
+    if subscription is None:
+        return sse_unavailable()
+
+    def generate():
+        snapshot = price_store.snapshot(symbols or price_poller.symbols)
+        yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+        for message in bus.stream(accept, subscription):
+            # An open stream counts as a request, so its symbols do not go idle
+            # (heartbeats arrive at least every HEARTBEAT_SECONDS).
+            for symbol in symbols:
+                watch_symbol(symbol)
+            yield message
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Frees the slot even if the client leaves before the stream starts.
+    response.call_on_close(lambda: bus.unsubscribe(subscription))
+    return response
+
+@app.route('/api/stream/stats')
+def get_stream_stats():
+    if price_stream is None:
+        return jsonify({'source': PRICE_SOURCE, 'subscribers': bus.subscriber_count})
+    return jsonify(dict(price_stream.stats(), source=PRICE_SOURCE,
+                        subscribers=bus.subscriber_count))
+
+@app.route('/api/events')
+def stream_events():
+    """
+    Server-Sent Events: prices, analysis and news as background refreshes
+    finish. Each open stream holds a worker thread; the dashboard only opens
+    one while its analysis or news is pending, or with ?live=1.
+    """
+    symbol = request.args.get('symbol', '').upper()
+
+    def accept(event, data):
+        return not symbol or event == 'prices' or data.get('symbol') == symbol
+
+    subscription = bus.subscribe()
+    if subscription is None:
+        return sse_unavailable()
+    response = Response(stream_with_context(bus.stream(accept, subscription)),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(lambda: bus.unsubscribe(subscription))
+    return response
 
 @app.route('/')
 def index():
-    selected_coin = request.args.get('coin', 'BTC')
+    selected_coin = request.args.get('coin', 'BTC').upper()
     current_category = request.args.get('category', 'market')
-    
-    current_timestamp = int(time.time()) // 300 * 300
-    price_data = get_cached_price(selected_coin, current_timestamp)
-    
-    if price_data:
-        analysis = analyze_with_gemini(selected_coin, price_data)
-    else:
-        analysis = {
-            "market_points": ["Price data unavailable"],
-            "outlook_points": ["Analysis unavailable"],
-            "support": 0,
-            "resistance": 0
-        }
-    
-    crypto_news = get_cached_news(selected_coin, current_category, current_timestamp)
-
-    return render_template('index.html',
-                         selected_coin=selected_coin,
-                         current_category=current_category,
-                         prices={selected_coin: price_data},
-                         analysis_results={selected_coin: analysis},
-                         crypto_news=crypto_news,
-                         current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC"))
+    if current_category not in NEWS_CATEGORIES:
+        current_category = 'market'
+
+    # Only the price is needed for first paint. Analysis and news are rendered
+    # when already cached; otherwise they are started here in the background
+    # and the page fills them in from /api/analysis and /api/news.
+    price_data, price_age = get_snapshot_price(selected_coin)
+
+    analysis = peek_analysis(selected_coin, price_data) if price_data \
+        else unavailable_analysis()
+    if analysis is None:
+        submit(analyze_price, selected_coin, price_data)
+    crypto_news = get_cached_news.cache.get((selected_coin, current_category))
+    if crypto_news is None:
+        submit(get_cached_news, selected_coin, current_category)
+
+    try:
+        currency = fx_rates.normalize_currency(request.args.get('currency'))
+        fx_rate = fx_rates.get_rate(currency)
+    except fx_rates.FXError as e:
+        print(f"Showing {fx_rates.BASE_CURRENCY} prices: {e}")
+        currency, fx_rate = fx_rates.BASE_CURRENCY, 1.0
+
+    coins = screener.top(COIN_BUTTONS) or [(symbol, symbol) for symbol in WATCHED_SYMBOLS]
+    if selected_coin not in (symbol for symbol, _ in coins):
+        coins.append((selected_coin, selected_coin))
+
+    with span('render'):
+        return render_template('index.html',
+                             selected_coin=selected_coin,
+                             coins=coins,
+                             currency=currency,
+                             currencies=fx_rates.FX_CURRENCIES,
+                             currency_sign=fx_rates.CURRENCY_SIGNS.get(currency, currency + ' '),
+                             fx_rate=fx_rate,
+                             current_category=current_category,
+                             prices={selected_coin: fx_rates.convert_quote(price_data, currency, fx_rate)},
+                             price_age=price_age,
+                             analysis_results={selected_coin: analysis},
+                             crypto_news=crypto_news,
+                             current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC"))
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
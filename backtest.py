@@ -0,0 +1,375 @@
+"""
+Vectorized backtests of rule-based strategies over stored daily candles.
+
+    python backtest.py BTC ETH SOL --strategy ma_crossover --days 1095
+    python backtest.py BTC --strategy rsi_bands --grid period=7,14,21 --grid lower=20,25,30 \\
+        --grid upper=65,70,75,80 --top 5
+
+Every strategy turns candle arrays into a (combinations x bars) position
+matrix with array operations only; parameter sweeps are split into chunks
+and spread across a process pool.
+"""
+import argparse
+import atexit
+import itertools
+import multiprocessing
+import numbers
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators import candles_to_arrays, rsi, sma
+from ohlcv_store import get_store
+
+# Worker processes for parameter sweeps (1 runs everything in-process)
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", os.cpu_count() or 1))
+# Parameter combinations evaluated per task; bounds the position matrix size
+BACKTEST_CHUNK = int(os.getenv("BACKTEST_CHUNK", 256))
+# Most distinct symbols one /api/backtest request may load
+BACKTEST_MAX_SYMBOLS = int(os.getenv("BACKTEST_MAX_SYMBOLS", 10))
+# Largest sweep (symbols x combinations) accepted from /api/backtest
+BACKTEST_MAX_COMBINATIONS = int(os.getenv("BACKTEST_MAX_COMBINATIONS", 20000))
+# Workers are never forked from the server process: its poller, screener, SSE
+# and SQLite threads may hold locks a forked child would inherit.
+BACKTEST_START_METHOD = os.getenv(
+    "BACKTEST_START_METHOD",
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+DEFAULT_FEE_BPS = float(os.getenv("BACKTEST_FEE_BPS", 10))
+DEFAULT_DAYS = 730
+PERIODS_PER_YEAR = 365
+
+
+class BacktestError(ValueError):
+    """Raised for an unknown strategy or invalid parameters."""
+
+
+def hold_between(entries, exits):
+    """
+    Long/flat positions that open on an entry signal and close on an exit
+    signal, computed without a per-bar loop: each bar takes the most recent
+    event (entry = 1, exit = 0) by forward-filling event indices with a
+    running maximum. An entry and exit on the same bar count as an exit.
+
+    Args:
+        entries (np.ndarray): Boolean (..., bars) entry signals.
+        exits (np.ndarray): Boolean (..., bars) exit signals.
+
+    Returns:
+        np.ndarray: Float positions (0.0 or 1.0) of the same shape.
+    """
+    events = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    bars = np.arange(events.shape[-1])
+    last_event = np.where(np.isnan(events), 0, bars)
+    np.maximum.accumulate(last_event, axis=-1, out=last_event)
+    positions = np.take_along_axis(events, last_event, axis=-1)
+    return np.nan_to_num(positions, nan=0.0)
+
+
+def rolling_extreme(values, period, func):
+    """max/min over the `period` bars before each bar (NaN until available)."""
+    out = np.full(values.shape, np.nan)
+    if len(values) > period:
+        out[period:] = func(sliding_window_view(values[:-1], period), axis=1)
+    return out
+
+
+def ma_crossover(arrays, params):
+    """Long while the fast SMA is above the slow SMA."""
+    close = arrays['close']
+    averages = {period: sma(close, period)
+                for period in {p['fast'] for p in params} | {p['slow'] for p in params}}
+    fast = np.stack([averages[p['fast']] for p in params])
+    slow = np.stack([averages[p['slow']] for p in params])
+    return (fast > slow).astype(np.float64)
+
+
+def rsi_bands(arrays, params):
+    """Buys when RSI drops below `lower`, sells when it rises above `upper`."""
+    close = arrays['close']
+    values = {period: rsi(close, period) for period in {p['period'] for p in params}}
+    series = np.stack([values[p['period']] for p in params])
+    lower = np.array([[p['lower']] for p in params], dtype=np.float64)
+    upper = np.array([[p['upper']] for p in params], dtype=np.float64)
+    return hold_between(series < lower, series > upper)
+
+
+def breakout(arrays, params):
+    """
+    Buys a close above resistance (the highest high of the previous `entry`
+    bars) and sells a close below support (the lowest low of the previous
+    `exit` bars).
+    """
+    close = arrays['close']
+    highs = {n: rolling_extreme(arrays['high'], n, np.max) for n in {p['entry'] for p in params}}
+    lows = {n: rolling_extreme(arrays['low'], n, np.min) for n in {p['exit'] for p in params}}
+    resistance = np.stack([highs[p['entry']] for p in params])
+    support = np.stack([lows[p['exit']] for p in params])
+    return hold_between(close > resistance, close < support)
+
+
+# Parameters counted in bars, which must be integers
+WINDOW_PARAMS = {'fast', 'slow', 'period', 'entry', 'exit'}
+# Parameters on the 0-100 RSI scale
+RSI_LEVEL_PARAMS = {'lower', 'upper'}
+
+# name -> (position function, default parameters, default sweep grid, validity check)
+STRATEGIES = {
+    'ma_crossover': (
+        ma_crossover,
+        {'fast': 20, 'slow': 50},
+        {'fast': [5, 10, 15, 20, 30, 40, 50], 'slow': [30, 50, 75, 100, 150, 200]},
+        lambda p: 1 < p['fast'] < p['slow'],
+    ),
+    'rsi_bands': (
+        rsi_bands,
+        {'period': 14, 'lower': 30, 'upper': 70},
+        {'period': [7, 10, 14, 21], 'lower': [20, 25, 30, 35], 'upper': [60, 65, 70, 75, 80]},
+        lambda p: p['period'] > 1 and 0 <= p['lower'] < p['upper'] <= 100,
+    ),
+    'breakout': (
+        breakout,
+        {'entry': 20, 'exit': 10},
+        {'entry': [10, 20, 30, 55, 90], 'exit': [5, 10, 20, 30]},
+        lambda p: p['entry'] > 0 and p['exit'] > 0,
+    ),
+}
+
+
+def evaluate(close, positions, fee_bps=DEFAULT_FEE_BPS, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Performance of each row of a position matrix.
+
+    A position decided on a bar's close earns the next bar's return; every
+    change of position pays fee_bps of the traded amount.
+
+    Args:
+        close (np.ndarray): Closes, shape (bars,).
+        positions (np.ndarray): Positions, shape (combinations, bars).
+        fee_bps (float): Cost per unit of turnover, in basis points.
+        periods_per_year (int): Bars per year for annualization.
+
+    Returns:
+        dict: Arrays of shape (combinations,): total_return, annual_return,
+              max_drawdown, sharpe, trades and exposure.
+    """
+    bars = len(close)
+    returns = np.zeros(bars)
+    if bars > 1:
+        returns[1:] = np.diff(close) / np.where(close[:-1] > 0, close[:-1], np.nan)
+    returns = np.nan_to_num(returns)
+    held = np.zeros_like(positions)
+    held[:, 1:] = positions[:, :-1]
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    strategy_returns = held * returns - turnover * (fee_bps / 10000.0)
+
+    equity = np.cumprod(1.0 + strategy_returns, axis=1)
+    total = equity[:, -1] - 1.0 if bars else np.zeros(len(positions))
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1.0
+    mean = strategy_returns.mean(axis=1)
+    std = strategy_returns.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0.0)
+        annual = np.where(total > -1.0, (1.0 + total) ** (periods_per_year / max(bars, 1)) - 1.0, -1.0)
+    return {
+        'total_return': total,
+        'annual_return': annual,
+        'max_drawdown': drawdown.min(axis=1) if bars else np.zeros(len(positions)),
+        'sharpe': sharpe,
+        'trades': (np.diff(positions, axis=1, prepend=0.0) > 0).sum(axis=1),
+        'exposure': held.mean(axis=1) if bars else np.zeros(len(positions)),
+    }
+
+
+def _metric_rows(metrics):
+    names = list(metrics)
+    return [{name: int(value) if name == 'trades' else round(float(value), 6)
+             for name, value in zip(names, row)}
+            for row in zip(*(metrics[name] for name in names))]
+
+
+def expand_grid(strategy, grid=None):
+    """
+    All valid parameter combinations of a grid ({name: [values]}); names
+    missing from the grid keep their default value.
+
+    Raises:
+        BacktestError: For an unknown strategy or parameter name, a
+            non-integer window or an RSI level outside 0-100.
+    """
+    if strategy not in STRATEGIES:
+        raise BacktestError(f"Unknown strategy '{strategy}'")
+    _, defaults, default_grid, valid = STRATEGIES[strategy]
+    grid = default_grid if grid is None else grid
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise BacktestError(f"Unknown parameters for {strategy}: {', '.join(sorted(unknown))}")
+    for name, options in grid.items():
+        for value in options:
+            if name in WINDOW_PARAMS and (isinstance(value, bool)
+                                          or not isinstance(value, numbers.Integral)):
+                raise BacktestError(f"'{name}' must be a whole number of bars, got {value}")
+            if name in RSI_LEVEL_PARAMS and (not isinstance(value, numbers.Real)
+                                             or not 0 <= value <= 100):
+                raise BacktestError(f"'{name}' must be between 0 and 100, got {value}")
+    names = list(defaults)
+    values = [list(grid.get(name, [defaults[name]])) for name in names]
+    return [params for params in (dict(zip(names, combo)) for combo in itertools.product(*values))
+            if valid(params)]
+
+
+def run_chunk(arrays, strategy, params, fee_bps=DEFAULT_FEE_BPS):
+    """Evaluates one strategy over a list of parameter dicts; returns metric dicts."""
+    if not params or not len(arrays['close']):
+        return []
+    positions = STRATEGIES[strategy][0](arrays, params)
+    return _metric_rows(evaluate(arrays['close'], positions, fee_bps))
+
+
+def buy_and_hold(arrays):
+    close = arrays['close']
+    return _metric_rows(evaluate(close, np.ones((1, len(close))), fee_bps=0))[0]
+
+
+def load_arrays(symbol, days=DEFAULT_DAYS, currency='USD'):
+    """Daily candle arrays for symbol from the local OHLCV store (synced as needed)."""
+    return candles_to_arrays(get_store().get_candles(symbol, currency, 'day', lookback=days))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def new_pool(workers):
+    """A process pool whose workers start with BACKTEST_START_METHOD."""
+    return ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context(BACKTEST_START_METHOD))
+
+
+def get_pool(workers=BACKTEST_WORKERS):
+    """Returns the process-wide sweep pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = new_pool(workers)
+                atexit.register(shutdown_pool)
+    return _pool
+
+
+def shutdown_pool():
+    """Stops the sweep pool's workers (registered to run at exit)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def sweep(data, strategy, grid=None, fee_bps=DEFAULT_FEE_BPS, workers=BACKTEST_WORKERS,
+          chunk=BACKTEST_CHUNK):
+    """
+    Backtests every parameter combination on every symbol.
+
+    Args:
+        data (dict): {symbol: candle arrays} (see load_arrays).
+        strategy (str): Key of STRATEGIES.
+        grid (dict, optional): {parameter: [values]}; defaults to the
+            strategy's default grid.
+        fee_bps (float, optional): Cost per unit of turnover in basis points.
+        workers (int, optional): Process count; 1 runs in-process, as does a
+            sweep that fits in a single chunk.
+        chunk (int, optional): Combinations per task.
+
+    Returns:
+        list: {'symbol', 'params', **metrics} for each combination, best
+              Sharpe ratio first.
+    """
+    combos = expand_grid(strategy, grid)
+    tasks = [(symbol, combos[start:start + chunk])
+             for symbol, arrays in data.items() if len(arrays['close'])
+             for start in range(0, len(combos), chunk)]
+    if workers > 1 and len(tasks) > 1:
+        pool = get_pool(workers) if workers == BACKTEST_WORKERS else new_pool(workers)
+        futures = [pool.submit(run_chunk, data[symbol], strategy, params, fee_bps)
+                   for symbol, params in tasks]
+        try:
+            outputs = [future.result() for future in futures]
+        finally:
+            if pool is not _pool:
+                pool.shutdown()
+    else:
+        outputs = [run_chunk(data[symbol], strategy, params, fee_bps) for symbol, params in tasks]
+
+    results = [dict(metrics, symbol=symbol, params=params)
+               for (symbol, chunk_params), rows in zip(tasks, outputs)
+               for params, metrics in zip(chunk_params, rows)]
+    results.sort(key=lambda row: row['sharpe'], reverse=True)
+    return results
+
+
+def parse_grid(pairs):
+    """
+    Parses ['fast=5,10', 'slow=50'] into {'fast': [5, 10], 'slow': [50]}.
+
+    Raises:
+        BacktestError: For a malformed entry or a non-numeric value.
+    """
+    grid = {}
+    for pair in pairs:
+        name, _, values = pair.partition('=')
+        try:
+            grid[name.strip()] = [float(v) if '.' in v else int(v)
+                                  for v in values.split(',') if v.strip()]
+        except ValueError:
+            raise BacktestError(f"Invalid values for '{name}': {values}") from None
+        if not name.strip() or not grid[name.strip()]:
+            raise BacktestError(f"Invalid grid entry '{pair}'")
+    return grid
+
+
+def format_percent(value):
+    return f"{value * 100:8.2f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('symbols', nargs='+', help='e.g. BTC ETH SOL')
+    parser.add_argument('--strategy', default='ma_crossover', choices=sorted(STRATEGIES))
+    parser.add_argument('--grid', action='append', default=[],
+                        help="parameter values, e.g. fast=5,10,20 (repeatable; default grid if omitted)")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('--fee-bps', type=float, default=DEFAULT_FEE_BPS)
+    parser.add_argument('--workers', type=int, default=BACKTEST_WORKERS)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    data = {symbol.upper(): load_arrays(symbol.upper(), args.days) for symbol in args.symbols}
+    try:
+        grid = parse_grid(args.grid) if args.grid else None
+        started = time.perf_counter()
+        results = sweep(data, args.strategy, grid, args.fee_bps, args.workers)
+    except BacktestError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(results)} backtests ({args.strategy}, {len(data)} symbols) in {elapsed:.2f}s")
+    print(f"{'symbol':<8} {'params':<32} {'return':>9} {'annual':>9} {'max dd':>9} {'sharpe':>7} {'trades':>7}")
+    for row in results[:args.top]:
+        params = ' '.join(f"{k}={v}" for k, v in row['params'].items())
+        print(f"{row['symbol']:<8} {params:<32} {format_percent(row['total_return'])} "
+              f"{format_percent(row['annual_return'])} {format_percent(row['max_drawdown'])} "
+              f"{row['sharpe']:>7.2f} {int(row['trades']):>7}")
+    for symbol, arrays in data.items():
+        if len(arrays['close']):
+            hold = buy_and_hold(arrays)
+            print(f"{symbol:<8} {'buy and hold':<32} {format_percent(hold['total_return'])} "
+                  f"{format_percent(hold['annual_return'])} {format_percent(hold['max_drawdown'])} "
+                  f"{hold['sharpe']:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Alert engine throughput: ticks/second as the rule count grows.
+
+Compares AlertEngine (bisect over sorted thresholds) with a naive scan that
+checks every rule on every tick.
+
+    python benchmarks/bench_alerts.py --rules 1000,10000,100000 --ticks 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_engine import AlertEngine  # noqa: E402
+
+START_PRICE = 30000.0
+
+
+def random_walk(ticks, seed=7):
+    rng = random.Random(seed)
+    price = START_PRICE
+    prices = []
+    for _ in range(ticks):
+        price *= 1 + rng.gauss(0, 0.0005)
+        prices.append(price)
+    return prices
+
+
+def random_rules(count, seed=11):
+    rng = random.Random(seed)
+    kinds = ('above', 'below', 'cross')
+    return [(START_PRICE * rng.uniform(0.8, 1.2), rng.choice(kinds), rng.uniform(0, 50))
+            for _ in range(count)]
+
+
+def bench_engine(rules, prices):
+    engine = AlertEngine()
+    for level, kind, hysteresis in rules:
+        engine.add_threshold_rule('BTC', level, kind=kind, hysteresis=hysteresis)
+    engine.add_percent_move_rule('BTC', 1.0, 3600, direction='up')
+    engine.add_percent_move_rule('BTC', 1.0, 3600, direction='down')
+    started = time.perf_counter()
+    fired = 0
+    for i, price in enumerate(prices):
+        fired += len(engine.on_tick('BTC', price, timestamp=i))
+    return len(prices) / (time.perf_counter() - started), fired
+
+
+def bench_naive(rules, prices):
+    """Reference implementation: scan every rule on every tick."""
+    armed = [True] * len(rules)
+    previous = None
+    fired = 0
+    started = time.perf_counter()
+    for price in prices:
+        if previous is not None:
+            for i, (level, kind, hysteresis) in enumerate(rules):
+                crossed_up = previous < level <= price
+                crossed_down = price <= level < previous
+                if armed[i] and ((kind != 'below' and crossed_up) or (kind != 'above' and crossed_down)):
+                    armed[i] = False
+                    fired += 1
+                elif not armed[i] and abs(price - level) >= hysteresis:
+                    armed[i] = True
+        previous = price
+    return len(prices) / (time.perf_counter() - started), fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rules', default='1000,10000,100000',
+                        help='comma-separated rule counts')
+    parser.add_argument('--ticks', type=int, default=20000)
+    parser.add_argument('--naive-ticks', type=int, default=200,
+                        help='ticks for the naive scan (it is slow)')
+    args = parser.parse_args()
+
+    prices = random_walk(args.ticks)
+    print(f"{'rules':>10} {'engine ticks/s':>16} {'alerts':>8} {'naive ticks/s':>15} {'speedup':>9}")
+    for count in (int(n) for n in args.rules.split(',')):
+        rules = random_rules(count)
+        engine_rate, fired = bench_engine(rules, prices)
+        naive_rate, _ = bench_naive(rules, prices[:args.naive_ticks])
+        print(f"{count:>10} {engine_rate:>16,.0f} {fired:>8} {naive_rate:>15,.0f} "
+              f"{engine_rate / naive_rate:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
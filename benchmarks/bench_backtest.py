@@ -0,0 +1,57 @@
+"""
+Parameter-sweep throughput on synthetic daily candles (no network).
+
+    python benchmarks/bench_backtest.py --symbols 40 --days 1095 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest  # noqa: E402
+
+
+def random_walk(days, seed):
+    """Geometric random walk candles as the arrays load_arrays returns."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.035, days)))
+    spread = np.abs(rng.normal(0, 0.02, days)) * close
+    return {
+        'time': np.arange(days, dtype=np.float64) * 86400,
+        'open': np.concatenate((close[:1], close[:-1])),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1e6, 1e8, days),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=40)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--workers', type=int, default=backtest.BACKTEST_WORKERS)
+    args = parser.parse_args()
+
+    data = {f"SYM{i}": random_walk(args.days, seed=i) for i in range(args.symbols)}
+    grids = {
+        'ma_crossover': {'fast': list(range(5, 55, 5)), 'slow': list(range(20, 220, 10))},
+        'rsi_bands': {'period': [7, 10, 14, 21], 'lower': list(range(15, 45, 5)),
+                      'upper': list(range(55, 90, 5))},
+        'breakout': {'entry': list(range(10, 100, 10)), 'exit': list(range(5, 45, 5))},
+    }
+    print(f"{args.symbols} symbols x {args.days} days, {args.workers} workers")
+    print(f"{'strategy':<14} {'backtests':>10} {'seconds':>9} {'per second':>12}")
+    for strategy, grid in grids.items():
+        started = time.perf_counter()
+        results = backtest.sweep(data, strategy, grid, workers=args.workers)
+        elapsed = time.perf_counter() - started
+        print(f"{strategy:<14} {len(results):>10} {elapsed:>9.2f} {len(results) / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Cold-start import time per entry point, optionally against an older revision.
+
+    python benchmarks/bench_import.py --runs 7
+    python benchmarks/bench_import.py --ref HEAD~1      # before/after table
+
+Each run imports the module in a fresh interpreter with -X importtime and
+reports the median wall time, the module's cumulative import time, and
+whether the LLM stacks (langchain, google.generativeai) were loaded.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ('app', 'main', 'cryptocompare_api')
+HEAVY_PREFIXES = ('langchain', 'langchain_community', 'langchain_google_genai',
+                  'google.generativeai')
+
+
+def parse_importtime(stderr, module):
+    """
+    Returns (cumulative_us for `module`, set of imported module names) from
+    -X importtime output.
+    """
+    cumulative, names = None, set()
+    for line in stderr.splitlines():
+        # 'import time:   self [us] | cumulative | imported package'
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line.split(':', 1)[1].split('|'))
+        names.add(name)
+        if name == module:
+            cumulative = int(cumulative_us)
+    return cumulative, names
+
+
+def measure(tree, module, runs, env):
+    walls, cumulatives, heavy = [], [], set()
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=tree, env=env, capture_output=True, text=True)
+        walls.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            tail = result.stderr.strip().splitlines()[-1:] or ['']
+            return {'error': tail[0]}
+        cumulative, names = parse_importtime(result.stderr, module)
+        if cumulative is not None:
+            cumulatives.append(cumulative / 1e6)
+        heavy |= {name for name in names if name.startswith(HEAVY_PREFIXES)}
+    return {
+        'wall_ms': statistics.median(walls) * 1000,
+        'import_ms': statistics.median(cumulatives) * 1000 if cumulatives else None,
+        'llm_stack_loaded': bool(heavy),
+    }
+
+
+def export_revision(ref, target):
+    """Writes the tree at git revision `ref` into `target`."""
+    archive = subprocess.run(['git', 'archive', '--format=tar', ref], cwd=ROOT,
+                             capture_output=True, check=True).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(archive)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            if hasattr(tarfile, 'data_filter'):
+                tar.extractall(target, filter='data')
+            else:
+                tar.extractall(target)
+
+
+def fmt(value):
+    return '-' if value is None else f"{value:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--entry', default=','.join(ENTRY_POINTS),
+                        help='comma-separated modules to import')
+    parser.add_argument('--ref', help='git revision to compare against (e.g. HEAD~1)')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='bench-import-')
+    env = dict(os.environ,
+               OHLCV_DB_PATH=os.path.join(scratch, 'ohlcv.sqlite3'),
+               NEWS_DB_PATH=os.path.join(scratch, 'news.sqlite3'),
+               CACHE_SQLITE_PATH=os.path.join(scratch, 'cache.sqlite3'),
+               PYTHONDONTWRITEBYTECODE='1')
+    trees = {'current': ROOT}
+    if args.ref:
+        trees[args.ref] = os.path.join(scratch, 'ref')
+        export_revision(args.ref, trees[args.ref])
+
+    modules = [m.strip() for m in args.entry.split(',') if m.strip()]
+    # Warm the OS file cache so the first measured run is not an outlier.
+    for tree in trees.values():
+        for module in modules:
+            subprocess.run([sys.executable, '-c', f'import {module}'], cwd=tree, env=env,
+                           capture_output=True)
+
+    results = {label: {module: measure(tree, module, args.runs, env) for module in modules}
+               for label, tree in trees.items()}
+
+    print(f"{'entry point':<20} {'tree':<12} {'wall ms':>9} {'import ms':>10} {'LLM stack':>10}")
+    for module in modules:
+        for label in trees:
+            row = results[label][module]
+            if 'error' in row:
+                print(f"{module:<20} {label:<12} error: {row['error']}")
+                continue
+            print(f"{module:<20} {label:<12} {fmt(row['wall_ms']):>9} {fmt(row['import_ms']):>10} "
+                  f"{'yes' if row['llm_stack_loaded'] else 'no':>10}")
+        if args.ref:
+            before, after = results[args.ref][module], results['current'][module]
+            if 'error' not in before and 'error' not in after and before['wall_ms']:
+                saved = 1 - after['wall_ms'] / before['wall_ms']
+                print(f"{'':<20} {'reduction':<12} {saved * 100:>8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
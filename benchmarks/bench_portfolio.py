@@ -0,0 +1,79 @@
+"""
+Portfolio ledger timings for large transaction histories.
+
+    python benchmarks/bench_portfolio.py --transactions 100000 --symbols 50
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfolio_manager import CSV_FIELDS, Portfolio  # noqa: E402
+
+
+def write_transactions(path, count, symbols, seed=3):
+    rng = random.Random(seed)
+    held = {symbol: 0.0 for symbol in symbols}
+    ts = 1_600_000_000
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for _ in range(count):
+            ts += rng.randint(1, 600)
+            symbol = rng.choice(symbols)
+            price = rng.uniform(10, 1000)
+            if held[symbol] > 1 and rng.random() < 0.4:
+                kind = rng.choice(('sell', 'sell', 'transfer_out', 'fee'))
+                quantity = held[symbol] * rng.uniform(0.01, 0.5)
+                held[symbol] -= quantity
+            else:
+                kind = rng.choice(('buy', 'buy', 'transfer_in'))
+                quantity = rng.uniform(0.1, 10)
+                held[symbol] += quantity
+            writer.writerow((ts, kind, symbol, f"{quantity:.8f}", f"{price:.2f}", f"{rng.uniform(0, 2):.2f}"))
+
+
+def timed(label, func, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<28} {elapsed * 1000:>10.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--method', default='fifo', choices=('fifo', 'average'))
+    args = parser.parse_args()
+
+    symbols = [f"C{i:03d}" for i in range(args.symbols)]
+    prices = {symbol: random.uniform(10, 1000) for symbol in symbols}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'transactions.csv')
+        npz_path = os.path.join(tmp, 'portfolio.npz')
+        write_transactions(csv_path, args.transactions, symbols)
+
+        portfolio = Portfolio(method=args.method)
+        timed(f"import_csv ({args.transactions:,} rows)", lambda: portfolio.import_csv(csv_path))
+        timed("save (.npz)", lambda: portfolio.save(npz_path))
+        loaded = timed("load (.npz)", lambda: Portfolio.load(npz_path), repeat=10)
+
+        def tick():
+            loaded.update_prices(prices)
+            return loaded.summary()
+
+        summary = timed("price tick + revalue", tick, repeat=100)
+        print(f"open holdings: {len(summary['holdings'])}, "
+              f"total P&L: {summary['performance']['total_pnl']:,.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Screener matrix timings for a large universe (synthetic closes, no network).
+
+    python benchmarks/bench_screener.py --coins 500 --window 90
+
+Compares a full ReturnMatrix build with the incremental roll used when a new
+daily candle arrives, checks both give the same correlations, and times
+typical /api/screener queries.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from screener import ReturnMatrix, build_table, query_table  # noqa: E402
+
+DAY = 86400
+
+
+def synthetic_closes(coins, days, seed=5):
+    """Random-walk closes sharing a market factor; ~10% of coins listed late."""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.03, days)
+    returns = market * rng.uniform(0.3, 1.5, (coins, 1)) + rng.normal(0, 0.03, (coins, days))
+    closes = 100 * np.exp(np.cumsum(returns, axis=1))
+    late = rng.random(coins) < 0.1
+    closes[late, :rng.integers(5, days // 2)] = np.nan
+    return closes
+
+
+def timed(label, func, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<36} {elapsed * 1000:>10.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--coins', type=int, default=500)
+    parser.add_argument('--window', type=int, default=90)
+    args = parser.parse_args()
+
+    closes = synthetic_closes(args.coins, args.window + 2)
+    symbols = [f"C{i}" for i in range(args.coins)]
+    universe = [(symbol, symbol) for symbol in symbols]
+    quotes = {symbol: {'PRICE': float(closes[i, -1]), 'MKTCAP': float(1e9 / (i + 1)),
+                       'VOLUME24HOURTO': 1e7, 'CHANGEPCT24HOUR': 0.0}
+              for i, symbol in enumerate(symbols)}
+    last_day = 1_700_000_000 // DAY * DAY
+
+    print(f"{args.coins} coins x {args.window} daily returns")
+    timed('full build', lambda: ReturnMatrix(symbols, closes[:, :-1].copy(), last_day))
+
+    matrices = [ReturnMatrix(symbols, closes[:, :-1].copy(), last_day) for _ in range(5)]
+    timed('incremental roll (one new candle)',
+          lambda: matrices.pop().advance(closes[:, -1], last_day + DAY))
+    rolled = ReturnMatrix(symbols, closes[:, :-1].copy(), last_day)
+    rolled.advance(closes[:, -1], last_day + DAY)
+    rebuilt = ReturnMatrix(symbols, closes[:, 1:].copy(), last_day + DAY)
+    drift = np.nanmax(np.abs(rolled.correlation() - rebuilt.correlation()))
+    print(f"{'max |roll - rebuild| correlation':<36} {drift:>13.2e}")
+
+    table = timed('summary table', lambda: build_table(universe, quotes, rebuilt))
+    timed('correlation matrix (all coins)', rebuilt.correlation)
+    timed('query: top 50 by market cap', lambda: query_table(table, rebuilt, sort='market_cap'))
+    timed('query: filter + sort by momentum', lambda: query_table(
+        table, rebuilt, sort='momentum_rank', filters={'max_volatility': 0.9, 'min_market_cap': 1e7}))
+    timed('query: 50 rows + correlation', lambda: query_table(
+        table, rebuilt, sort='volatility', correlate='C0', correlation=True))
+
+
+if __name__ == '__main__':
+    main()
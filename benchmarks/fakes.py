@@ -0,0 +1,228 @@
+"""
+Local stand-ins for CryptoCompare, Serper and Gemini used by the benchmarks.
+
+CryptoCompare is served over real HTTP (so the pooled client, retries and the
+request budget are exercised) from the JSON fixtures in benchmarks/fixtures.
+Serper and the LLM are replaced in-process. Every stand-in counts its calls.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DAY = 86400
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return json.load(f)
+
+
+class CallCounter:
+    """Thread-safe counter of upstream calls by name."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def total(self):
+        with self._lock:
+            return sum(self._counts.values())
+
+
+class FakeCryptoCompare:
+    """
+    HTTP server answering pricemultifull, pricemulti, histoday and the
+    top/mktcapfull toplist from fixtures. Daily candles are shifted so the
+    newest one is today, so the candle store sees up-to-date history.
+
+    Args:
+        latency (float): Seconds added to every response.
+        error_rate (float): Fraction of requests answered with HTTP 429.
+    """
+
+    def __init__(self, latency=0.05, error_rate=0.0, seed=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = CallCounter()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.raw = load_fixture('pricemultifull.json')['RAW']
+        self.history = {}
+        today = int(time.time()) // DAY * DAY
+        for name in os.listdir(FIXTURES_DIR):
+            match = re.fullmatch(r'histoday_(\w+)\.json', name)
+            if match:
+                candles = load_fixture(name)['Data']['Data']
+                shift = today - candles[-1]['time']
+                self.history[match.group(1)] = [dict(c, time=c['time'] + shift) for c in candles]
+        self._server = None
+
+    def _should_fail(self):
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+
+    def respond(self, path, query):
+        """Returns (status, body) for one request."""
+        endpoint = path.rsplit('/', 1)[-1]
+        self.calls.add(endpoint)
+        if self.latency:
+            time.sleep(self.latency)
+        if self._should_fail():
+            return 429, {'Response': 'Error', 'Message': 'Rate limit excceeded!'}
+        if endpoint == 'pricemultifull':
+            tsyms = query.get('tsyms', 'USD').split(',')
+            raw = {s: {t: self.raw[s][t] for t in tsyms if t in self.raw.get(s, {})}
+                   for s in query.get('fsyms', '').split(',') if s in self.raw}
+            return 200, {'RAW': raw}
+        if endpoint == 'pricemulti':
+            tsyms = query.get('tsyms', 'USD').split(',')
+            return 200, {s: {t: self.raw[s][t]['PRICE'] for t in tsyms if t in self.raw[s]}
+                         for s in query.get('fsyms', '').split(',') if s in self.raw}
+        if endpoint == 'mktcapfull':
+            tsym = query.get('tsym', 'USD')
+            limit, page = int(query.get('limit', 10)), int(query.get('page', 0))
+            ranked = sorted(self.raw, key=lambda s: -self.raw[s].get(tsym, {}).get('MKTCAP', 0))
+            return 200, {'Message': 'Success', 'Data': [
+                {'CoinInfo': {'Name': s, 'FullName': s}, 'RAW': {tsym: self.raw[s][tsym]}}
+                for s in ranked[page * limit:(page + 1) * limit] if tsym in self.raw[s]]}
+        if endpoint == 'histoday':
+            candles = self.history.get(query.get('fsym'))
+            if candles is None:
+                return 200, {'Response': 'Error', 'Message': 'There is no data for the symbol'}
+            to_ts = int(query.get('toTs', candles[-1]['time']))
+            limit = int(query.get('limit', 30))
+            window = [c for c in candles if c['time'] <= to_ts][-(limit + 1):]
+            return 200, {'Response': 'Success', 'Data': {'Data': window}}
+        return 200, {'Response': 'Error', 'Message': f'No fixture for {endpoint}'}
+
+    def start(self):
+        """Starts the server and returns its base URL."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, body = fake.respond(url.path, query)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fake-cryptocompare',
+                         daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class FakeSerper:
+    """Returns canned search results per news category after `latency` seconds."""
+
+    def __init__(self, latency=0.3):
+        self.latency = latency
+        self.calls = CallCounter()
+        self.results = load_fixture('serper.json')
+
+    def run(self, query):
+        self.calls.add('search')
+        if self.latency:
+            time.sleep(self.latency)
+        query = query.lower()
+        category = 'regulatory' if 'regulation' in query else \
+            'development' if 'development' in query else 'market'
+        return self.results[category]
+
+
+class RateLimitError(Exception):
+    """Mimics the quota error raised by the Gemini client."""
+
+
+class FakeLLM:
+    """
+    Fake chat model with configurable latency and injected 429 errors.
+
+    Answers the analysis prompt with fixture JSON built from its inputs and
+    batched sentiment prompts with one '<n>: <sentiment>' line per headline.
+
+    Args:
+        latency (float): Mean seconds per call.
+        jitter (float): Uniform +/- fraction applied to the latency.
+        rate_429 (float): Fraction of calls that raise a 429 error.
+    """
+
+    def __init__(self, latency=1.0, jitter=0.2, rate_429=0.0, seed=2):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.calls = CallCounter()
+        self.analysis = load_fixture('llm_analysis.json')
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, kind):
+        self.calls.add(kind)
+        with self._lock:
+            delay = self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.rate_429
+        time.sleep(max(0.0, delay))
+        if fail:
+            self.calls.add('429')
+            raise RateLimitError("429 Resource has been exhausted (e.g. check quota).")
+
+    def predict(self, prompt):
+        self._call('predict')
+        numbered = re.findall(r'^(\d+)\. ', prompt, flags=re.MULTILINE)
+        if numbered:
+            labels = ('positive', 'negative', 'neutral')
+            return '\n'.join(f"{n}: {labels[int(n) % 3]}" for n in numbered)
+        return 'neutral'
+
+    def invoke_chain(self, inputs):
+        self._call('analysis')
+        analysis = dict(self.analysis)
+        symbol, price = inputs.get('symbol', ''), inputs.get('price', '')
+        analysis['market_points'] = [p.format(symbol=symbol, price=price)
+                                     for p in analysis['market_points']]
+        return {'text': json.dumps(analysis)}
+
+
+class FakeChain:
+    def __init__(self, llm):
+        self.llm = llm
+
+    def invoke(self, inputs):
+        return self.llm.invoke_chain(inputs)
+
+
+def install(app_module, llm, serper):
+    """Routes the app's LLM and Serper calls to the fakes."""
+    import llm_provider
+
+    llm_provider.get_chain = lambda template, *args, **kwargs: FakeChain(llm)
+    llm_provider.get_llm = lambda *args, **kwargs: llm
+    app_module.serper = serper
@@ -0,0 +1,234 @@
+"""
+Offline load test: drives the Flask routes with concurrent clients against
+local stand-ins for CryptoCompare, Serper and Gemini.
+
+    python benchmarks/load_test.py --clients 16 --requests 2000
+    python benchmarks/load_test.py --llm-latency 2 --llm-429-rate 0.1 --json-out run.json
+    python benchmarks/load_test.py --compare baseline.json --tolerance 0.25
+
+Reports p50/p95/p99 latency per route, requests per second, and upstream
+calls per request. With --compare, exits non-zero when p95 latency or
+upstream calls per request regress beyond the tolerance.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from fakes import FakeCryptoCompare, FakeLLM, FakeSerper, install  # noqa: E402
+
+# route name -> (path template, weight)
+DEFAULT_MIX = {
+    'index': ('/?coin={symbol}', 2),
+    'prices': ('/api/prices?symbols={symbol}', 3),
+    'chart': ('/api/chart/{symbol}?days=365', 2),
+    'indicators': ('/api/indicators/{symbol}', 1),
+    'analysis': ('/api/analysis/{symbol}', 2),
+    'news': ('/api/news/{symbol}?category=market', 1),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def start_app(args):
+    """Points the app at the fakes, imports it and serves it on a free port."""
+    upstream = FakeCryptoCompare(latency=args.upstream_latency, error_rate=args.upstream_error_rate)
+    os.environ['CRYPTOCOMPARE_BASE_URL'] = upstream.start()
+    # Every on-disk store starts empty, so repeated runs measure the same work.
+    data_dir = tempfile.mkdtemp(prefix='bench-')
+    os.environ['OHLCV_DB_PATH'] = os.path.join(data_dir, 'ohlcv.sqlite3')
+    os.environ['NEWS_DB_PATH'] = os.path.join(data_dir, 'news.sqlite3')
+    os.environ['CACHE_SQLITE_PATH'] = os.path.join(data_dir, 'cache.sqlite3')
+    os.environ.setdefault('PRICE_SOURCE', 'poll')
+
+    import app as app_module
+    from werkzeug.serving import make_server
+
+    llm = FakeLLM(latency=args.llm_latency, rate_429=args.llm_429_rate)
+    serper = FakeSerper(latency=args.serper_latency)
+    install(app_module, llm, serper)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server, upstream, llm, serper
+
+
+def build_plan(mix, symbols, total):
+    weighted = [name for name, (_, weight) in mix.items() for _ in range(weight)]
+    names = itertools.cycle(weighted)
+    coins = itertools.cycle(symbols)
+    return [(name, mix[name][0].format(symbol=next(coins))) for name, _ in zip(names, range(total))]
+
+
+def run_load(base_url, plan, clients, timeout):
+    results = []
+    lock = threading.Lock()
+    position = itertools.count()
+
+    def worker():
+        session = requests.Session()
+        while True:
+            i = next(position)
+            if i >= len(plan):
+                return
+            name, path = plan[i]
+            started = time.perf_counter()
+            try:
+                status = session.get(base_url + path, timeout=timeout).status_code
+            except requests.exceptions.RequestException:
+                status = 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                results.append((name, elapsed, status))
+
+    threads = [threading.Thread(target=worker, name=f'client-{i}') for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall_seconds, upstream_calls):
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for name, elapsed, status in results:
+        by_route[name].append(elapsed)
+        if status != 200:
+            errors[name] += 1
+    routes = {}
+    for name, latencies in sorted(by_route.items()):
+        latencies.sort()
+        routes[name] = {
+            'requests': len(latencies),
+            'errors': errors[name],
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+        }
+    overall = sorted(elapsed for _, elapsed, _ in results)
+    count = len(results)
+    totals = {name: sum(calls.values()) for name, calls in upstream_calls.items()}
+    return {
+        'requests': count,
+        'errors': sum(errors.values()),
+        'wall_seconds': round(wall_seconds, 3),
+        'rps': round(count / wall_seconds, 2) if wall_seconds else 0.0,
+        'p50_ms': round(percentile(overall, 50) * 1000, 2),
+        'p95_ms': round(percentile(overall, 95) * 1000, 2),
+        'p99_ms': round(percentile(overall, 99) * 1000, 2),
+        'routes': routes,
+        'upstream_calls': upstream_calls,
+        'upstream_calls_per_request': {name: round(total / count, 4) if count else 0.0
+                                       for name, total in totals.items()},
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['wall_seconds']}s "
+          f"({report['rps']} req/s), {report['errors']} errors")
+    print(f"{'route':<12} {'n':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, row in report['routes'].items():
+        print(f"{name:<12} {row['requests']:>6} {row['errors']:>5} {row['p50_ms']:>9} "
+              f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9}")
+    print(f"{'all':<12} {report['requests']:>6} {report['errors']:>5} {report['p50_ms']:>9} "
+          f"{report['p95_ms']:>9} {report['p99_ms']:>9}")
+    print("\nupstream calls (per request):")
+    for name, calls in report['upstream_calls'].items():
+        print(f"  {name:<14} {report['upstream_calls_per_request'][name]:>8}  {calls}")
+
+
+def compare(report, baseline, tolerance):
+    """Returns a list of regressions against a baseline report."""
+    problems = []
+    for name, row in report['routes'].items():
+        base = baseline.get('routes', {}).get(name)
+        if base and base['p95_ms'] and row['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            problems.append(f"{name}: p95 {row['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+    for name, value in report['upstream_calls_per_request'].items():
+        base = baseline.get('upstream_calls_per_request', {}).get(name)
+        if base is not None and value > base * (1 + tolerance) + 1e-9:
+            problems.append(f"{name}: {value} upstream calls/request vs baseline {base}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=0,
+                        help='requests sent (and not measured) before the run')
+    parser.add_argument('--symbols', default='BTC,ETH,SOL,XRP,DOGE')
+    parser.add_argument('--routes', default=','.join(DEFAULT_MIX),
+                        help=f"comma-separated subset of {', '.join(DEFAULT_MIX)}")
+    parser.add_argument('--upstream-latency', type=float, default=0.05)
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0,
+                        help='fraction of CryptoCompare requests answered with 429')
+    parser.add_argument('--serper-latency', type=float, default=0.3)
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    parser.add_argument('--llm-429-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--json-out', help='write the report as JSON')
+    parser.add_argument('--compare', help='baseline JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    mix = {name: DEFAULT_MIX[name] for name in args.routes.split(',') if name in DEFAULT_MIX}
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    base_url, server, upstream, llm, serper = start_app(args)
+
+    if args.warmup:
+        run_load(base_url, build_plan(mix, symbols, args.warmup), args.clients, args.timeout)
+    counters = {'cryptocompare': upstream.calls, 'serper': serper.calls, 'llm': llm.calls}
+    before = {name: counter.snapshot() for name, counter in counters.items()}
+
+    results, wall = run_load(base_url, build_plan(mix, symbols, args.requests),
+                             args.clients, args.timeout)
+
+    upstream_calls = {}
+    for name, counter in counters.items():
+        after = counter.snapshot()
+        upstream_calls[name] = {key: after[key] - before[name].get(key, 0)
+                                for key in after if after[key] - before[name].get(key, 0)}
+    report = summarize(results, wall, upstream_calls)
+    report['config'] = {key: value for key, value in vars(args).items()
+                        if key not in ('json_out', 'compare')}
+    print_report(report)
+
+    server.shutdown()
+    upstream.stop()
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        if problems:
+            print("\nREGRESSIONS:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+import hashlib
+import hmac
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 'memory' (per process), 'sqlite' (one WAL file shared by all workers on the
+# host) or 'redis' (any RESP server, e.g. resp_server.py or Redis itself)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join("data", "cache.sqlite3"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+# Longest a worker may hold a key's refresh lock before others take over
+CACHE_LOCK_TTL = float(os.getenv("CACHE_LOCK_TTL", 30))
+# How often a worker waiting on another worker's refresh re-checks the key
+CACHE_POLL_INTERVAL = float(os.getenv("CACHE_POLL_INTERVAL", 0.05))
+# Key for the HMAC on records in the shared backends; every worker sharing a
+# store needs the same value. Without it each process signs with a random
+# key, so records written by other processes are treated as misses.
+CACHE_SECRET = os.getenv("CACHE_SECRET")
+
+_signing_key = CACHE_SECRET.encode() if CACHE_SECRET else os.urandom(32)
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def _signature(key, payload):
+    return hmac.new(_signing_key, key.encode() + b'\0' + payload, hashlib.sha256).digest()
+
+
+def dump_record(key, record):
+    """Pickles a record for a shared store, prefixed with an HMAC bound to its key."""
+    payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+    return _signature(key, payload) + payload
+
+
+def load_record(key, data):
+    """
+    Unpickles a record from dump_record. The signature is checked first, so
+    data anyone else wrote into the store is never unpickled.
+
+    Returns:
+        The record, or None when the data is missing or its signature does
+        not match.
+    """
+    if data is None:
+        return None
+    data = bytes(data)
+    signature, payload = data[:_DIGEST_SIZE], data[_DIGEST_SIZE:]
+    if not hmac.compare_digest(signature, _signature(key, payload)):
+        if CACHE_SECRET:
+            # Without a secret, other processes' records are expected to fail.
+            print(f"Ignoring cache record with a bad signature: {key}")
+        return None
+    return pickle.loads(payload)
+
+
+def _warn_unsigned(name):
+    if not CACHE_SECRET:
+        print(f"CACHE_SECRET is not set; the {name} cache is not shared between processes")
+
+
+class MemoryBackend:
+    """
+    In-process LRU store; the default, with no cross-process sharing.
+
+    Args:
+        maxsize (int): Maximum number of entries before LRU eviction.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, record)
+        self._locks = {}  # key -> (token, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, record, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, prefix=''):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def count(self, prefix=''):
+        with self._lock:
+            return sum(1 for key in self._entries if key.startswith(prefix))
+
+    def acquire(self, key, ttl=CACHE_LOCK_TTL):
+        now = time.time()
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[1] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (token, now + ttl)
+            return token
+
+    def locked(self, key):
+        with self._lock:
+            held = self._locks.get(key)
+            return held is not None and held[1] > time.time()
+
+    def release(self, key, token):
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == token:
+                del self._locks[key]
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    record BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_locks (
+    key TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteBackend:
+    """
+    Store shared by every process on the host through one SQLite file in WAL
+    mode; refresh locks are rows claimed with a conditional upsert. Records
+    are signed (see dump_record), so only processes holding CACHE_SECRET can
+    write entries the others will unpickle.
+
+    Args:
+        path (str): Database file. Defaults to CACHE_SQLITE_PATH.
+    """
+
+    def __init__(self, path=CACHE_SQLITE_PATH):
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SQLITE_SCHEMA)
+        _warn_unsigned('sqlite')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT record FROM cache_entries WHERE key = ? AND expires_at > ?",
+            (key, time.time())).fetchone()
+        return load_record(key, row[0]) if row else None
+
+    def set(self, key, record, ttl):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, record, expires_at) VALUES (?, ?, ?)",
+            (key, dump_record(key, record), time.time() + ttl))
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self, prefix=''):
+        self._conn().execute("DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?",
+                             (len(prefix), prefix))
+
+    def count(self, prefix=''):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        return conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE substr(key, 1, ?) = ?",
+            (len(prefix), prefix)).fetchone()[0]
+
+    def acquire(self, key, ttl=CACHE_LOCK_TTL):
+        now = time.time()
+        token = uuid.uuid4().hex
+        cursor = self._conn().execute(
+            "INSERT INTO cache_locks (key, token, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+            "WHERE cache_locks.expires_at <= ?",
+            (key, token, now + ttl, now))
+        return token if cursor.rowcount == 1 else None
+
+    def locked(self, key):
+        return self._conn().execute(
+            "SELECT 1 FROM cache_locks WHERE key = ? AND expires_at > ?",
+            (key, time.time())).fetchone() is not None
+
+    def release(self, key, token):
+        self._conn().execute("DELETE FROM cache_locks WHERE key = ? AND token = ?", (key, token))
+
+
+class RespError(Exception):
+    """Error reply from a RESP server."""
+
+
+class RespConnection:
+    """Minimal blocking RESP2 client: one command at a time over one socket."""
+
+    def __init__(self, host, port, db=0, password=None, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.command('AUTH', password)
+        if db:
+            self.command('SELECT', db)
+
+    def command(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("RESP server closed the connection")
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            raise RespError(body.decode())
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(body)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RespError(f"Unexpected reply {line!r}")
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+_RELEASE_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then "
+                   "return redis.call('del', KEYS[1]) else return 0 end")
+
+
+class RedisBackend:
+    """
+    Store shared by every process that can reach a RESP server. Entries use
+    server-side expiry and are signed like the SQLite backend's; refresh
+    locks are SET NX PX keys.
+
+    Only GET, SET (NX/PX), DEL, KEYS, PING and DELIFEQ are used, so
+    resp_server.py can stand in for Redis; servers without DELIFEQ (Redis
+    itself) release locks with the equivalent EVAL script instead.
+
+    Args:
+        url (str): redis://[:password@]host:port/db. Defaults to CACHE_REDIS_URL.
+    """
+
+    def __init__(self, url=CACHE_REDIS_URL):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self._local = threading.local()
+        self._delifeq = True
+        _warn_unsigned('redis')
+
+    def _command(self, *args):
+        conn = getattr(self._local, 'conn', None)
+        for attempt in range(2):
+            if conn is None:
+                conn = self._local.conn = RespConnection(self.host, self.port, self.db,
+                                                         self.password)
+            try:
+                return conn.command(*args)
+            except (OSError, ConnectionError):
+                # Reconnect once, e.g. after the server restarted.
+                conn.close()
+                conn = self._local.conn = None
+                if attempt:
+                    raise
+
+    def get(self, key):
+        return load_record(key, self._command('GET', key))
+
+    def set(self, key, record, ttl):
+        self._command('SET', key, dump_record(key, record), 'PX', max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self._command('DEL', key)
+
+    def _keys(self, prefix):
+        escaped = ''.join('\\' + char if char in '*?[]\\' else char for char in prefix)
+        return self._command('KEYS', escaped + '*') or []
+
+    def clear(self, prefix=''):
+        keys = [key for key in self._keys(prefix) if not key.startswith(b'lock:')]
+        if keys:
+            self._command('DEL', *keys)
+
+    def count(self, prefix=''):
+        return len(self._keys(prefix))
+
+    def acquire(self, key, ttl=CACHE_LOCK_TTL):
+        token = uuid.uuid4().hex
+        reply = self._command('SET', f"lock:{key}", token, 'NX', 'PX', max(1, int(ttl * 1000)))
+        return token if reply == 'OK' else None
+
+    def locked(self, key):
+        return self._command('GET', f"lock:{key}") is not None
+
+    def release(self, key, token):
+        # Compare-and-delete in one server-side step: a separate GET and DEL
+        # could delete a lock another process took after ours expired.
+        if self._delifeq:
+            try:
+                return self._command('DELIFEQ', f"lock:{key}", token)
+            except RespError as e:
+                if 'unknown command' not in str(e).lower():
+                    raise
+                self._delifeq = False
+        return self._command('EVAL', _RELEASE_SCRIPT, 1, f"lock:{key}", token)
+
+
+def wait_for(backend, key, ready, timeout=CACHE_LOCK_TTL, poll=CACHE_POLL_INTERVAL):
+    """
+    Polls backend for key while another process holds its lock.
+
+    Returns:
+        The record once ready(record) holds, or None when the lock was
+        released without a usable record (e.g. the load failed) or after
+        `timeout` seconds; the caller should then try to take the lock itself.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        record = backend.get(key)
+        if ready(record):
+            return record
+        if not backend.locked(key):
+            # Re-read: the holder may have stored its result just before releasing.
+            record = backend.get(key)
+            return record if ready(record) else None
+        time.sleep(poll)
+    return None
+
+
+def create_backend(kind=CACHE_BACKEND, maxsize=128):
+    """Builds a backend by name ('memory', 'sqlite' or 'redis')."""
+    if kind == 'sqlite':
+        return SQLiteBackend()
+    if kind == 'redis':
+        return RedisBackend()
+    if kind != 'memory':
+        print(f"Unknown CACHE_BACKEND '{kind}', using memory")
+    return MemoryBackend(maxsize)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def default_backend(maxsize=128):
+    """
+    Returns the backend a cache should use when none is passed: the
+    process-wide shared backend for 'sqlite'/'redis', or a fresh
+    MemoryBackend(maxsize) per cache for 'memory'.
+    """
+    global _shared
+    if CACHE_BACKEND not in ('sqlite', 'redis'):
+        return MemoryBackend(maxsize)
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = create_backend(CACHE_BACKEND)
+    return _shared
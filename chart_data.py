@@ -0,0 +1,160 @@
+import json
+import os
+import re
+import struct
+
+import numpy as np
+
+from fx_rates import BASE_CURRENCY, historical_rates
+from ohlcv_store import INTERVALS, get_store
+
+# Longest history served per interval, in seconds (histominute only goes back
+# about a week upstream; daily covers about 10 years).
+MAX_SPAN = {'minute': 7 * 86400, 'hour': 730 * 86400, 'day': 3650 * 86400}
+# Default interval by span: intraday ranges get finer candles.
+AUTO_INTERVALS = ((2 * 86400, 'minute'), (90 * 86400, 'hour'))
+DEFAULT_RANGE = os.getenv("CHART_DEFAULT_RANGE", "30d")
+DEFAULT_POINTS = int(os.getenv("CHART_DEFAULT_POINTS", 500))
+MAX_POINTS = 5000
+
+_UNITS = {'h': 3600, 'd': 86400, 'w': 7 * 86400, 'm': 30 * 86400, 'y': 365 * 86400}
+_RANGE_RE = re.compile(r'^(\d+)([hdwmy])$')
+
+# Binary layout of format=f32 (little-endian):
+#   magic b'CHT1', uint32 n, uint32 time[n], float32 close[n], float32 volume[n]
+BINARY_MAGIC = b'CHT1'
+
+
+class ChartRequestError(ValueError):
+    """Raised for an unparseable range/interval combination."""
+
+
+def parse_range(value):
+    """
+    Parses a range like '24h', '7d', '3m', '5y' or 'max' into seconds.
+
+    Raises:
+        ChartRequestError: When the value is not a valid range.
+    """
+    value = (value or DEFAULT_RANGE).strip().lower()
+    if value == 'max':
+        return MAX_SPAN['day']
+    match = _RANGE_RE.match(value)
+    if not match or int(match.group(1)) == 0:
+        raise ChartRequestError(f"Invalid range '{value}'")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def resolve_request(range_value=None, interval=None, days=None):
+    """
+    Turns query parameters into (interval, candle_count).
+
+    `days` is the legacy parameter and means a daily range of that many days.
+
+    Raises:
+        ChartRequestError: For an unknown interval or a span the interval
+            cannot cover.
+    """
+    if days is not None and range_value is None:
+        span = max(1, days) * 86400
+        interval = interval or 'day'
+    else:
+        span = parse_range(range_value)
+    if interval is None:
+        interval = next((name for limit, name in AUTO_INTERVALS if span <= limit), 'day')
+    if interval not in INTERVALS:
+        raise ChartRequestError(f"Invalid interval '{interval}'")
+    span = min(span, MAX_SPAN[interval])
+    step = INTERVALS[interval][1]
+    return interval, max(1, span // step)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of threshold - 2 buckets,
+    the point forming the largest triangle with the previously kept point and
+    the next bucket's average, which preserves peaks and troughs.
+
+    Args:
+        x (np.ndarray): Increasing x values.
+        y (np.ndarray): Values to preserve the shape of.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def build_series(symbol, interval, count, points, currency=BASE_CURRENCY):
+    """
+    Loads candles from the local store and downsamples them.
+
+    Candles are stored in BASE_CURRENCY only; other currencies are converted
+    with historical rates (see fx_rates.historical_rates).
+
+    Returns:
+        dict: {'t': uint32 epochs, 'c': float closes, 'v': float volumes,
+               'source_points': int}. Volumes of dropped candles are added to
+               the kept candle before them, so totals are preserved.
+    """
+    candles = get_store().get_candles(symbol, BASE_CURRENCY, interval, lookback=count)
+    times = np.fromiter((c['time'] for c in candles), dtype=np.int64, count=len(candles))
+    closes = np.fromiter((c['close'] for c in candles), dtype=np.float64, count=len(candles))
+    volumes = np.fromiter((c['volumeto'] for c in candles), dtype=np.float64, count=len(candles))
+    if currency != BASE_CURRENCY and len(times):
+        rates = historical_rates(currency, interval, times)
+        closes *= rates
+        volumes *= rates
+    kept = lttb(times, closes, points) if points else np.arange(len(times))
+    if len(kept) < len(times):
+        volumes = np.add.reduceat(volumes, kept)
+    else:
+        volumes = volumes[kept]
+    return {'t': times[kept], 'c': closes[kept], 'v': volumes, 'source_points': len(times)}
+
+
+def encode_json(symbol, interval, series, currency=BASE_CURRENCY):
+    """Compact JSON: parallel epoch/close/volume arrays instead of per-candle objects."""
+    return json.dumps({
+        'symbol': symbol,
+        'currency': currency,
+        'interval': interval,
+        'source_points': series['source_points'],
+        't': series['t'].tolist(),
+        'c': [float(f"{value:.6g}") for value in series['c']],
+        'v': np.round(series['v']).astype(np.int64).tolist(),
+    }, separators=(',', ':')).encode()
+
+
+def encode_binary(series):
+    """Packs the series as described by BINARY_MAGIC (about 12 bytes per point)."""
+    n = len(series['t'])
+    return b''.join((
+        BINARY_MAGIC,
+        struct.pack('<I', n),
+        series['t'].astype('<u4').tobytes(),
+        series['c'].astype('<f4').tobytes(),
+        series['v'].astype('<f4').tobytes(),
+    ))
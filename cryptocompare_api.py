@@ -1,20 +1,41 @@
 import requests
-import os
-from dotenv import load_dotenv
+import sqlite3
 import time
 
-load_dotenv()
+import cryptocompare_client
+from ohlcv_store import get_store
 
-CRYPTOCARE_API_KEY = os.getenv("CRYPTOCARE_API_KEY")
+# CryptoCompare rejects fsyms lists longer than this many characters.
+FSYMS_MAX_CHARS = 300
+
+def chunk_symbols(symbols, max_chars=FSYMS_MAX_CHARS):
+    """
+    Splits symbols into comma-joined chunks that fit the API's fsyms limit.
+
+    Args:
+        symbols (list): Cryptocurrency symbols.
+        max_chars (int, optional): Maximum length of one fsyms value.
+
+    Returns:
+        list: Lists of symbols, one per request.
+    """
+    chunks, current, length = [], [], 0
+    for symbol in symbols:
+        extra = len(symbol) + (1 if current else 0)
+        if current and length + extra > max_chars:
+            chunks.append(current)
+            current, length = [], 0
+            extra = len(symbol)
+        current.append(symbol)
+        length += extra
+    if current:
+        chunks.append(current)
+    return chunks
 
 def get_latest_price(symbols, currency='USD'):
     """Fetches the latest price (same as before)"""
-    url = f"https://min-api.cryptocompare.com/data/pricemulti?fsyms={','.join(symbols)}&tsyms={currency}&api_key={CRYPTOCARE_API_KEY}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        return data
+        return cryptocompare_client.get('/data/pricemulti', fsyms=','.join(symbols), tsyms=currency)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data from CryptoCompare API: {e}")
         return None
@@ -33,19 +54,13 @@ def get_historical_daily_data(symbol, currency='USD', limit=30):
               Example: [{'time': 1674883200, 'open': 23000, 'high': 23500, 'low': 22800, 'close': 23200, 'volumefrom': ..., 'volumeto': ...}, ...]
               Returns None and prints an error message if API request fails.
     """
-    url = f"https://min-api.cryptocompare.com/data/v2/histoday?fsym={symbol}&tsym={currency}&limit={limit}&api_key={CRYPTOCARE_API_KEY}"
+    # Served from the local candle store; only missing candles are fetched.
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        if data['Response'] == 'Success':
-            return data['Data']['Data'] # Access the 'Data' array within 'Data'
-        else:
-            print(f"Error from CryptoCompare API: {data.get('Message', 'Unknown error')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching historical data from CryptoCompare API: {e}")
+        candles = get_store().get_candles(symbol, currency, 'day', lookback=limit)
+    except sqlite3.Error as e:
+        print(f"Error reading historical data from local store: {e}")
         return None
+    return candles or None
 
 
 if __name__ == '__main__':
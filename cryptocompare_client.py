@@ -0,0 +1,210 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from metrics import RETRIES, span
+
+load_dotenv()
+
+CRYPTOCARE_API_KEY = os.getenv("CRYPTOCARE_API_KEY")
+BASE_URL = os.getenv("CRYPTOCOMPARE_BASE_URL", "https://min-api.cryptocompare.com")
+
+CONNECT_TIMEOUT = float(os.getenv("CRYPTOCOMPARE_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.getenv("CRYPTOCOMPARE_READ_TIMEOUT", 10))
+POOL_MAXSIZE = int(os.getenv("CRYPTOCOMPARE_POOL_MAXSIZE", 10))
+MAX_RETRIES = int(os.getenv("CRYPTOCOMPARE_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.getenv("CRYPTOCOMPARE_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("CRYPTOCOMPARE_BACKOFF_MAX", 8))
+REQUESTS_PER_MINUTE = int(os.getenv("CRYPTOCOMPARE_REQUESTS_PER_MINUTE", 250))
+BUDGET_MAX_WAIT = float(os.getenv("CRYPTOCOMPARE_BUDGET_MAX_WAIT", 5))
+# Upper bound on one get() call across all attempts, budget waits and
+# backoff sleeps, so a page request cannot block for the sum of them.
+TOTAL_TIMEOUT = float(os.getenv("CRYPTOCOMPARE_TOTAL_TIMEOUT", 12))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RequestBudgetExceeded(requests.exceptions.RequestException):
+    """Raised when the per-minute request budget has no slot within max_wait."""
+
+
+class RateLimitedResponse(requests.exceptions.HTTPError):
+    """CryptoCompare signalled a rate limit in the body of a 200 response."""
+
+
+class RequestBudget:
+    """
+    Sliding one-minute window of request timestamps shared by all threads.
+
+    Args:
+        per_minute (int): Maximum number of requests started in any 60s window.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=BUDGET_MAX_WAIT):
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= 60:
+                    self._sent.popleft()
+                if len(self._sent) < self.per_minute:
+                    self._sent.append(now)
+                    return
+                wait = 60 - (now - self._sent[0])
+            if now + wait > deadline:
+                raise RequestBudgetExceeded(
+                    f"CryptoCompare budget of {self.per_minute} requests/minute exhausted"
+                )
+            time.sleep(wait)
+
+
+def _retry_after_seconds(response):
+    """Parses a Retry-After header given either in seconds or as an HTTP date."""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CryptoCompareClient:
+    """
+    Pooled, budgeted HTTP client for the CryptoCompare min-api.
+
+    One keep-alive session is shared by every caller; requests are bounded by
+    connect/read timeouts and retried with jittered exponential backoff on
+    429/5xx and connection errors, all within `total_timeout` seconds per call.
+    """
+
+    def __init__(self, api_key=CRYPTOCARE_API_KEY, base_url=BASE_URL,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), pool_maxsize=POOL_MAXSIZE,
+                 max_retries=MAX_RETRIES, requests_per_minute=REQUESTS_PER_MINUTE,
+                 session=None, total_timeout=TOTAL_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.budget = RequestBudget(requests_per_minute)
+        self.session = session or self._build_session(pool_maxsize)
+
+    @staticmethod
+    def _build_session(pool_maxsize):
+        session = requests.Session()
+        # pool_maxsize bounds the connections kept per host; pool_block makes
+        # extra threads wait for a free connection instead of opening more.
+        # Retries are handled in get() so they share the budget and backoff.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize,
+                              pool_block=True, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _backoff(self, attempt, response=None):
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, BACKOFF_MAX)
+        # Full jitter: uniform over [0, base * 2^attempt], capped.
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def get(self, path, params=None):
+        """
+        Performs a GET against the API and returns the decoded JSON body.
+
+        Args:
+            path (str): API path, e.g. '/data/pricemultifull'.
+            params (dict, optional): Query parameters (api_key is added).
+
+        Returns:
+            dict: Parsed JSON response.
+
+        Raises:
+            requests.exceptions.RequestException: When the request still fails
+                after all retries, the request budget is exhausted, or
+                total_timeout runs out (a retry that would not fit is not made).
+        """
+        params = dict(params or {})
+        if self.api_key:
+            params.setdefault('api_key', self.api_key)
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        deadline = time.monotonic() + self.total_timeout
+        connect_timeout, read_timeout = self.timeout
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(
+                    f"CryptoCompare request exceeded {self.total_timeout:g}s across retries")
+            self.budget.acquire(max_wait=min(BUDGET_MAX_WAIT, remaining))
+            remaining = max(deadline - time.monotonic(), 0.001)
+            response = None
+            try:
+                response = self.session.get(url, params=params, timeout=(
+                    min(connect_timeout, remaining), min(read_timeout, remaining)))
+                response.raise_for_status()
+                data = response.json()
+                if isinstance(data, dict) and data.get('Response') == 'Error' \
+                        and 'rate limit' in str(data.get('Message', '')).lower():
+                    raise RateLimitedResponse(data.get('Message'), response=response)
+                return data
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError) as e:
+                status = response.status_code if response is not None else None
+                retryable = (
+                    isinstance(e, (requests.exceptions.ConnectionError,
+                                   requests.exceptions.Timeout, RateLimitedResponse))
+                    or status in RETRY_STATUSES
+                )
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, response)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                RETRIES.inc(upstream='cryptocompare', reason=status or type(e).__name__)
+                print(f"CryptoCompare request failed ({e}), retrying in {delay:.2f}s...")
+                with span('cryptocompare_retry_sleep'):
+                    time.sleep(delay)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide CryptoCompare client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CryptoCompareClient()
+    return _client
+
+
+def set_client(client):
+    """Replaces the process-wide client (e.g. to point at a local stand-in)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def get(path, **params):
+    """Shortcut for get_client().get(path, params)."""
+    return get_client().get(path, params)
@@ -0,0 +1,85 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Events a slow subscriber may fall behind by before newer ones are dropped.
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+
+
+class EventBus:
+    """
+    In-process publish/subscribe hub used to push refresh notifications
+    (prices, analysis, news) to Server-Sent Events clients.
+
+    Args:
+        max_subscribers (int, optional): Most concurrent subscriptions; each
+            open SSE response holds a server thread for its whole lifetime.
+    """
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Returns a new subscription queue, or None when max_subscribers are connected."""
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event, data):
+        message = (event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self, accept=None, subscription=None):
+        """
+        Yields SSE-formatted messages until the client disconnects.
+        `accept(event, data)` can filter what is sent; `subscription` is a
+        queue from subscribe(), taken here when not given.
+        """
+        q = subscription or self.subscribe()
+        if q is None:
+            return
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event, data = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield f": heartbeat {int(time.time())}\n\n"
+                    continue
+                if accept is None or accept(event, data):
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(q)
+
+
+# Concurrent SSE clients per process
+SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", 32))
+
+bus = EventBus(SSE_MAX_SUBSCRIBERS)
@@ -0,0 +1,213 @@
+import os
+import time
+
+import numpy as np
+import requests
+from dotenv import load_dotenv
+
+import cryptocompare_client
+from ohlcv_store import INTERVALS, get_store
+from ttl_cache import ttl_cached
+
+load_dotenv()
+
+# Prices are fetched and stored in BASE_CURRENCY only; every other quote
+# currency is derived from the rate table below.
+BASE_CURRENCY = 'USD'
+FX_CURRENCIES = [c.strip().upper() for c in
+                 os.getenv("FX_CURRENCIES", "USD,EUR,GBP,JPY,BTC,ETH").split(',') if c.strip()]
+# Liquid coins whose price in every currency gives the cross rates; a
+# currency's rate is the median over pivots of price(currency) / price(base).
+FX_PIVOTS = [c.strip().upper() for c in os.getenv("FX_PIVOTS", "BTC,ETH").split(',') if c.strip()]
+FX_REFRESH = float(os.getenv("FX_REFRESH", 300))
+
+CURRENCY_SIGNS = {'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥', 'BTC': '₿', 'ETH': 'Ξ'}
+# pricemultifull fields that are amounts of the quote currency. Percentages
+# and volumes in coin units (e.g. VOLUME24HOUR) do not change.
+MONEY_FIELDS = ('PRICE', 'OPEN24HOUR', 'HIGH24HOUR', 'LOW24HOUR', 'CHANGE24HOUR',
+                'VOLUME24HOURTO', 'OPENDAY', 'HIGHDAY', 'LOWDAY', 'CHANGEDAY', 'VOLUMEDAYTO',
+                'OPENHOUR', 'HIGHHOUR', 'LOWHOUR', 'CHANGEHOUR', 'VOLUMEHOURTO',
+                'TOTALVOLUME24HTO', 'TOPTIERVOLUME24HOURTO', 'MKTCAP', 'CIRCULATINGSUPPLYMKTCAP')
+
+
+class FXError(ValueError):
+    """Raised for an unsupported currency or when no rate is available."""
+
+
+def triangulate(quotes, currencies=FX_CURRENCIES, pivots=FX_PIVOTS, base=BASE_CURRENCY):
+    """
+    Derives base -> currency rates from pivot prices.
+
+    Args:
+        quotes (dict): pricemulti data, {pivot: {currency: price}}.
+        currencies (list): Currencies to derive.
+        pivots (list): Pivot coins (rows of `quotes`).
+        base (str): Currency the rates are relative to.
+
+    Returns:
+        dict: {currency: units of currency per 1 base}; currencies no pivot
+              is quoted in are left out.
+    """
+    columns = {currency: j for j, currency in enumerate(currencies)}
+    table = np.full((len(pivots), len(currencies)), np.nan)
+    for i, pivot in enumerate(pivots):
+        for currency, price in (quotes.get(pivot) or {}).items():
+            if currency in columns and price:
+                table[i, columns[currency]] = price
+        if pivot in columns:
+            table[i, columns[pivot]] = 1.0
+    if base not in columns:
+        return {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = table / table[:, columns[base]][:, None]
+    valid = np.isfinite(ratios).any(axis=0)
+    rates = np.full(len(currencies), np.nan)
+    rates[valid] = np.nanmedian(ratios[:, valid], axis=0)
+    return {currency: float(rates[j]) for currency, j in columns.items() if np.isfinite(rates[j])}
+
+
+@ttl_cached(ttl=FX_REFRESH, stale_ttl=FX_REFRESH * 3, negative_ttl=30,
+            is_negative=lambda table: not table)
+def get_rate_table():
+    """
+    Base -> currency rates for FX_CURRENCIES from one pricemulti call, cached
+    for FX_REFRESH seconds and refreshed in the background after that.
+
+    Returns:
+        dict: {'base', 'rates': {currency: rate}, 'updated_at'}, or {} if the
+              upstream call failed.
+    """
+    try:
+        quotes = cryptocompare_client.get('/data/pricemulti', fsyms=','.join(FX_PIVOTS),
+                                          tsyms=','.join(dict.fromkeys([BASE_CURRENCY] + FX_CURRENCIES)))
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching FX rates: {e}")
+        return {}
+    rates = triangulate(quotes)
+    if not rates:
+        return {}
+    return {'base': BASE_CURRENCY, 'rates': rates, 'updated_at': time.time()}
+
+
+def normalize_currency(currency):
+    """
+    Upper-cases and validates a quote currency (None means BASE_CURRENCY).
+
+    Raises:
+        FXError: When the currency is not in FX_CURRENCIES.
+    """
+    currency = (currency or BASE_CURRENCY).strip().upper()
+    if currency != BASE_CURRENCY and currency not in FX_CURRENCIES:
+        raise FXError(f"Unsupported currency '{currency}', expected one of {', '.join(FX_CURRENCIES)}")
+    return currency
+
+
+def get_rate(currency, base=BASE_CURRENCY):
+    """
+    Units of `currency` per 1 `base`, from the cached rate table.
+
+    Raises:
+        FXError: For an unsupported currency or when rates are unavailable.
+    """
+    currency, base = normalize_currency(currency), normalize_currency(base)
+    if currency == base:
+        return 1.0
+    rates = get_rate_table().get('rates') or {}
+    if currency not in rates or base not in rates:
+        raise FXError(f"No {base}/{currency} rate available")
+    return rates[currency] / rates[base]
+
+
+def rate_matrix(rates, currencies=None):
+    """
+    Cross-rate matrix: M[i, j] converts an amount in currencies[i] to currencies[j].
+
+    Returns:
+        tuple: (currencies, np.ndarray)
+    """
+    currencies = [c for c in (currencies or rates) if c in rates]
+    vector = np.array([rates[c] for c in currencies])
+    return currencies, vector[None, :] / vector[:, None]
+
+
+def convert_quote(quote, currency, rate=None):
+    """
+    Converts a pricemultifull RAW quote in BASE_CURRENCY into `currency`.
+
+    Args:
+        quote (dict): RAW quote fields.
+        currency (str): Target currency.
+        rate (float, optional): Rate to use instead of get_rate(currency).
+    """
+    if not quote or currency == BASE_CURRENCY:
+        return quote
+    rate = get_rate(currency) if rate is None else rate
+    converted = dict(quote, TOSYMBOL=currency)
+    for field in MONEY_FIELDS:
+        if isinstance(quote.get(field), (int, float)):
+            converted[field] = quote[field] * rate
+    return converted
+
+
+def convert_prices(prices, currency, base=BASE_CURRENCY):
+    """
+    Converts {symbol: price} or pricemulti data ({symbol: {base: price}}) into
+    {symbol: {currency: price}}.
+    """
+    rate = get_rate(currency, base)
+    converted = {}
+    for symbol, value in (prices or {}).items():
+        if isinstance(value, dict):
+            value = value.get(base)
+        if value is not None:
+            converted[symbol] = {currency: value * rate}
+    return converted
+
+
+def _closes_at(symbol, currency, interval, times):
+    """Closes of symbol/currency candles at (or just before) each of `times`."""
+    step = INTERVALS[interval][1]
+    lookback = (int(time.time()) // step * step - int(times[0])) // step + 1
+    candles = get_store().get_candles(symbol, currency, interval, lookback=lookback)
+    out = np.full(len(times), np.nan)
+    if candles:
+        stored = np.array([c['time'] for c in candles])
+        closes = np.array([c['close'] or np.nan for c in candles], dtype=np.float64)
+        index = np.searchsorted(stored, times, side='right') - 1
+        found = index >= 0
+        out[found] = closes[index[found]]
+    return out
+
+
+def historical_rates(currency, interval, times):
+    """
+    BASE_CURRENCY -> currency rates at candle times, for converting history.
+
+    A pivot coin used as the quote currency (e.g. BTC) divides by its own
+    base-currency closes; other currencies use the first pivot's closes in
+    both currencies. Either way one candle series per currency is shared by
+    every coin's chart. Times without a historical rate use the current rate.
+
+    Args:
+        currency (str): Target currency.
+        interval (str): 'day', 'hour' or 'minute'.
+        times (np.ndarray): Candle epochs, increasing.
+
+    Returns:
+        np.ndarray: One rate per time.
+    """
+    currency = normalize_currency(currency)
+    times = np.asarray(times)
+    if currency == BASE_CURRENCY or not len(times):
+        return np.ones(len(times))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if currency in FX_PIVOTS:
+            rates = 1.0 / _closes_at(currency, BASE_CURRENCY, interval, times)
+        else:
+            pivot = FX_PIVOTS[0]
+            rates = (_closes_at(pivot, currency, interval, times)
+                     / _closes_at(pivot, BASE_CURRENCY, interval, times))
+    missing = ~np.isfinite(rates)
+    if missing.any():
+        rates[missing] = get_rate(currency)
+    return rates
@@ -0,0 +1,218 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Block length for the blocked EWM recurrence; keeps (1 - alpha)^k well above
+# float underflow while still processing each block as array operations.
+_EWM_BLOCK = 128
+
+
+def candles_to_arrays(candles):
+    """
+    Converts histoday-style candle dicts into float64 arrays.
+
+    Args:
+        candles (list): Candle dicts with time/open/high/low/close/volumeto.
+
+    Returns:
+        dict: Arrays keyed by 'time', 'open', 'high', 'low', 'close', 'volume'.
+    """
+    fields = ('time', 'open', 'high', 'low', 'close', 'volumeto')
+    table = np.array([[c.get(f, 0) for f in fields] for c in candles], dtype=np.float64)
+    if table.size == 0:
+        table = np.empty((0, len(fields)))
+    arrays = {f: table[:, i] for i, f in enumerate(fields)}
+    arrays['volume'] = arrays.pop('volumeto')
+    return arrays
+
+
+def sma(values, period):
+    """Simple moving average; the first period-1 entries are NaN."""
+    out = np.full(values.shape, np.nan)
+    if len(values) >= period:
+        csum = np.cumsum(np.insert(values, 0, 0.0))
+        out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def rolling_std(values, period):
+    """Population standard deviation over a trailing window (NaN-padded)."""
+    out = np.full(values.shape, np.nan)
+    if len(values) >= period:
+        windows = sliding_window_view(values, period)
+        out[period - 1:] = windows.std(axis=1)
+    return out
+
+
+def ewm(values, alpha):
+    """
+    Exponentially weighted mean y[t] = (1 - alpha) * y[t-1] + alpha * x[t],
+    seeded with y[0] = x[0].
+
+    The recurrence is solved in closed form per block, so each block is a
+    handful of array operations instead of a per-element Python loop.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+    # With carry c = y[start-1]: y[start+k] = d^(k+1) * (c + sum_j a*x_j / d^(j+1)).
+    # Seeding c = x[0] yields y[0] = d*x[0] + a*x[0] = x[0].
+    carry = values[0]
+    for start in range(0, len(values), _EWM_BLOCK):
+        block = values[start:start + _EWM_BLOCK]
+        powers = decay ** np.arange(1, len(block) + 1)
+        out[start:start + len(block)] = powers * (carry + np.cumsum(alpha * block / powers))
+        carry = out[start + len(block) - 1]
+    return out
+
+
+def ema(values, period):
+    return ewm(values, 2.0 / (period + 1))
+
+
+def rsi(close, period=14):
+    """Wilder RSI (smoothing alpha = 1/period)."""
+    delta = np.diff(close, prepend=close[:1])
+    gains = ewm(np.clip(delta, 0, None), 1.0 / period)
+    losses = ewm(np.clip(-delta, 0, None), 1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gains / losses
+        out = 100.0 - 100.0 / (1.0 + rs)
+    out[losses == 0] = 100.0
+    out[(losses == 0) & (gains == 0)] = 50.0
+    out[:period] = np.nan
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, period=20, width=2.0):
+    mid = sma(close, period)
+    std = rolling_std(close, period)
+    return mid - width * std, mid, mid + width * std
+
+
+def atr(high, low, close, period=14):
+    prev_close = np.concatenate((close[:1], close[:-1]))
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    out = ewm(true_range, 1.0 / period)
+    out[:period - 1] = np.nan
+    return out
+
+
+def rolling_volatility(close, period=20, periods_per_year=365):
+    """Annualized standard deviation of log returns over a trailing window."""
+    log_returns = np.diff(np.log(np.where(close > 0, close, np.nan)), prepend=np.nan)
+    out = np.full(close.shape, np.nan)
+    if len(close) > period:
+        windows = sliding_window_view(log_returns[1:], period)
+        out[period:] = windows.std(axis=1) * np.sqrt(periods_per_year)
+    return out
+
+
+def pivot_levels(high, low, price, span=3):
+    """
+    Derives support and resistance from swing pivots.
+
+    A pivot high is a candle whose high is the maximum of the 2*span+1 candles
+    centred on it (pivot lows likewise). Support is the highest pivot low
+    below the price, resistance the lowest pivot high above it; when no pivot
+    qualifies, the window low/high is used.
+
+    Returns:
+        tuple: (support, resistance, pivot_highs, pivot_lows)
+    """
+    window = 2 * span + 1
+    if len(high) < window:
+        return (float(np.min(low)) if len(low) else None,
+                float(np.max(high)) if len(high) else None, [], [])
+    centre_high = high[span:-span]
+    centre_low = low[span:-span]
+    pivot_highs = centre_high[centre_high == sliding_window_view(high, window).max(axis=1)]
+    pivot_lows = centre_low[centre_low == sliding_window_view(low, window).min(axis=1)]
+
+    below = pivot_lows[pivot_lows < price]
+    above = pivot_highs[pivot_highs > price]
+    support = float(below.max()) if below.size else float(low.min())
+    resistance = float(above.min()) if above.size else float(high.max())
+    return support, resistance, pivot_highs.tolist(), pivot_lows.tolist()
+
+
+def _last(values):
+    if len(values) == 0 or np.isnan(values[-1]):
+        return None
+    return round(float(values[-1]), 6)
+
+
+def compute_indicators(candles, price=None):
+    """
+    Computes the technical indicators for a candle series in one pass.
+
+    Args:
+        candles (list): Daily candles, oldest first (histoday format).
+        price (float, optional): Live price; defaults to the last close.
+
+    Returns:
+        dict: Latest indicator values plus pivot-based support/resistance.
+              Values needing more history than available are None.
+    """
+    arrays = candles_to_arrays(candles)
+    close, high, low = arrays['close'], arrays['high'], arrays['low']
+    if len(close) == 0:
+        return {}
+    price = float(price) if price else float(close[-1])
+
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_lower, bb_mid, bb_upper = bollinger(close)
+    atr_values = atr(high, low, close)
+    support, resistance, _, _ = pivot_levels(high, low, price)
+
+    change_7d = None
+    if len(close) > 7 and close[-8]:
+        change_7d = round(float((close[-1] / close[-8] - 1) * 100), 4)
+
+    return {
+        'price': price,
+        'candles': int(len(close)),
+        'sma_20': _last(sma(close, 20)),
+        'sma_50': _last(sma(close, 50)),
+        'sma_200': _last(sma(close, 200)),
+        'ema_12': _last(ema(close, 12)),
+        'ema_26': _last(ema(close, 26)),
+        'rsi_14': _last(rsi(close)),
+        'macd': _last(macd_line),
+        'macd_signal': _last(macd_signal),
+        'macd_histogram': _last(macd_hist),
+        'bollinger_lower': _last(bb_lower),
+        'bollinger_middle': _last(bb_mid),
+        'bollinger_upper': _last(bb_upper),
+        'atr_14': _last(atr_values),
+        'volatility_20d': _last(rolling_volatility(close)),
+        'change_7d_pct': change_7d,
+        'support': round(support, 6),
+        'resistance': round(resistance, 6),
+    }
+
+
+def format_indicator_facts(indicators):
+    """Renders computed indicators as prompt lines, skipping missing values."""
+    labels = {
+        'sma_20': 'SMA(20)', 'sma_50': 'SMA(50)', 'sma_200': 'SMA(200)',
+        'ema_12': 'EMA(12)', 'ema_26': 'EMA(26)', 'rsi_14': 'RSI(14)',
+        'macd': 'MACD(12,26)', 'macd_signal': 'MACD signal(9)',
+        'macd_histogram': 'MACD histogram', 'bollinger_lower': 'Bollinger lower(20,2)',
+        'bollinger_upper': 'Bollinger upper(20,2)', 'atr_14': 'ATR(14)',
+        'volatility_20d': '20d annualized volatility', 'change_7d_pct': '7d change %',
+        'support': 'Pivot support', 'resistance': 'Pivot resistance',
+    }
+    lines = [f"{label}: {indicators[key]:,.4f}" for key, label in labels.items()
+             if indicators.get(key) is not None]
+    return "\n".join(lines) if lines else "No indicator data available"
@@ -0,0 +1,242 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from metrics import RETRIES, observe_stage
+
+load_dotenv()
+
+# Quota of the Gemini project; both buckets refill continuously and allow
+# up to one minute's worth of calls in a burst.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", 60))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", 32000))
+# Longest a call may wait for quota before it is shed to its fallback
+LLM_INTERACTIVE_MAX_WAIT = float(os.getenv("LLM_INTERACTIVE_MAX_WAIT", 3))
+LLM_BACKGROUND_MAX_WAIT = float(os.getenv("LLM_BACKGROUND_MAX_WAIT", 15))
+# Pause applied to the whole gateway after a 429, unless the error says otherwise
+LLM_429_COOLDOWN = float(os.getenv("LLM_429_COOLDOWN", 5))
+# Re-queues after a 429 (only when the call can still start within its wait limit)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 1))
+# Tokens assumed for a completion when estimating a call's cost
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 512))
+
+# Lower runs first: dashboard analyses go ahead of sentiment and the monitor.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class LLMOverloaded(Exception):
+    """Raised instead of waiting when a call cannot start within its wait limit."""
+
+
+def is_rate_limit(error):
+    """True for quota errors from the Gemini client (HTTP 429 / ResourceExhausted)."""
+    return '429' in str(error) or type(error).__name__ == 'ResourceExhausted'
+
+
+def estimate_tokens(text, completion=LLM_COMPLETION_TOKENS):
+    """Rough token cost of a call: ~4 characters per prompt token plus the completion."""
+    return len(text) // 4 + completion
+
+
+class TokenBucket:
+    """
+    Continuously refilling token bucket.
+
+    Args:
+        capacity (float): Maximum tokens held (the burst size).
+        rate (float): Tokens added per second.
+        clock (callable): Monotonic clock. Defaults to time.monotonic.
+    """
+
+    def __init__(self, capacity, rate, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def time_until(self, amount, now=None):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill(self.clock() if now is None else now)
+        deficit = amount - self.tokens
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def consume(self, amount, now=None):
+        self._refill(self.clock() if now is None else now)
+        self.tokens -= amount
+
+
+class _Ticket:
+    __slots__ = ('priority', 'seq', 'tokens', 'expires', 'cancelled')
+
+    def __init__(self, priority, seq, tokens, expires):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.expires = expires
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMGateway:
+    """
+    Process-wide admission control for LLM calls.
+
+    Calls queue by priority (then arrival) for a request-per-minute and a
+    token-per-minute bucket. A call whose estimated queue wait exceeds its
+    limit raises LLMOverloaded immediately, so callers serve their fallback
+    instead of blocking a worker. A 429 pauses the whole gateway for a
+    cooldown, so concurrent callers stop hitting the exhausted quota.
+
+    Args:
+        rpm (int): Requests per minute. Defaults to GEMINI_RPM.
+        tpm (int): Tokens per minute. Defaults to GEMINI_TPM.
+        cooldown (float): Pause after a 429. Defaults to LLM_429_COOLDOWN.
+        max_retries (int): Re-queues after a 429. Defaults to LLM_MAX_RETRIES.
+        clock (callable): Monotonic clock. Defaults to time.monotonic.
+    """
+
+    def __init__(self, rpm=GEMINI_RPM, tpm=GEMINI_TPM, cooldown=LLM_429_COOLDOWN,
+                 max_retries=LLM_MAX_RETRIES, clock=time.monotonic):
+        self.requests = TokenBucket(rpm, rpm / 60.0, clock)
+        self.tokens = TokenBucket(tpm, tpm / 60.0, clock)
+        self.cooldown = cooldown
+        self.max_retries = max_retries
+        self.clock = clock
+        self.paused_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {'admitted': 0, 'shed': 0, 'expired': 0, 'rate_limited': 0,
+                       'retried': 0, 'wait_seconds': 0.0}
+
+    def _wait_for(self, requests, tokens, now):
+        """Seconds until `requests` calls costing `tokens` fit both buckets."""
+        return max(self.paused_until - now,
+                   self.requests.time_until(requests, now),
+                   self.tokens.time_until(tokens, now), 0.0)
+
+    def estimated_wait(self, priority=PRIORITY_BACKGROUND, tokens=LLM_COMPLETION_TOKENS):
+        """Seconds a new call at this priority would wait behind the current queue."""
+        with self._cond:
+            return self._estimate(priority, min(tokens, self.tokens.capacity), self.clock())
+
+    def _estimate(self, priority, tokens, now):
+        ahead = [t for t in self._queue if not t.cancelled and t.priority <= priority]
+        return self._wait_for(len(ahead) + 1, sum(t.tokens for t in ahead) + tokens, now)
+
+    def _enqueue(self, priority, tokens, max_wait, seq=None):
+        now = self.clock()
+        if self._estimate(priority, tokens, now) > max_wait:
+            self._stats['shed'] += 1
+            raise LLMOverloaded(f"LLM queue wait exceeds {max_wait:g}s")
+        ticket = _Ticket(priority, next(self._seq) if seq is None else seq, tokens, now + max_wait)
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _await_turn(self, ticket):
+        while True:
+            while self._queue and self._queue[0].cancelled:
+                heapq.heappop(self._queue)
+            now = self.clock()
+            if self._queue[0] is ticket:
+                wait = self._wait_for(1, ticket.tokens, now)
+                if wait <= 0:
+                    heapq.heappop(self._queue)
+                    self.requests.consume(1, now)
+                    self.tokens.consume(ticket.tokens, now)
+                    self._cond.notify_all()
+                    return
+            else:
+                wait = ticket.expires - now
+            if now >= ticket.expires:
+                ticket.cancelled = True
+                self._stats['expired'] += 1
+                self._cond.notify_all()
+                raise LLMOverloaded("LLM call expired while queued")
+            self._cond.wait(min(wait, ticket.expires - now))
+
+    def call(self, func, tokens=LLM_COMPLETION_TOKENS, priority=PRIORITY_BACKGROUND,
+             max_wait=None, label='llm'):
+        """
+        Runs func() once quota allows, in the calling thread.
+
+        Args:
+            func (callable): The LLM call.
+            tokens (int): Estimated token cost (see estimate_tokens).
+            priority (int): PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND.
+            max_wait (float, optional): Longest acceptable queue wait; defaults
+                by priority to LLM_INTERACTIVE_MAX_WAIT / LLM_BACKGROUND_MAX_WAIT.
+            label (str): Name used for the queue-wait timing.
+
+        Returns:
+            The result of func().
+
+        Raises:
+            LLMOverloaded: The call could not start within max_wait.
+            Exception: Whatever func() raises, including a 429 that could not
+                be retried within max_wait.
+        """
+        if max_wait is None:
+            max_wait = LLM_INTERACTIVE_MAX_WAIT if priority <= PRIORITY_INTERACTIVE \
+                else LLM_BACKGROUND_MAX_WAIT
+        tokens = min(tokens, self.tokens.capacity)
+        started = self.clock()
+        seq = None
+        for attempt in range(self.max_retries + 1):
+            remaining = max_wait - (self.clock() - started)
+            with self._cond:
+                queued_at = self.clock()
+                ticket = self._enqueue(priority, tokens, remaining, seq)
+                seq = ticket.seq  # a retry keeps its place in line
+                self._await_turn(ticket)
+                waited = self.clock() - queued_at
+                self._stats['admitted'] += 1
+                self._stats['wait_seconds'] += waited
+            observe_stage(f"{label}_queue_wait", waited)
+            try:
+                return func()
+            except Exception as e:
+                if not is_rate_limit(e):
+                    raise
+                with self._cond:
+                    self._stats['rate_limited'] += 1
+                    self.paused_until = max(self.paused_until, self.clock() + self.cooldown)
+                    self._cond.notify_all()
+                if attempt >= self.max_retries:
+                    raise
+                # Re-queued rather than slept on: _enqueue sheds the retry when
+                # the cooldown pushes it past max_wait.
+                RETRIES.inc(upstream='gemini', reason='429')
+                with self._cond:
+                    self._stats['retried'] += 1
+                print(f"Rate limit hit, re-queueing {label} behind the {self.cooldown:g}s cooldown")
+
+    def stats(self):
+        with self._cond:
+            now = self.clock()
+            admitted = self._stats['admitted']
+            return dict(
+                self._stats,
+                wait_seconds=round(self._stats['wait_seconds'], 4),
+                avg_wait_seconds=round(self._stats['wait_seconds'] / admitted, 4) if admitted else 0.0,
+                queued=sum(1 for t in self._queue if not t.cancelled),
+                paused_seconds=round(max(0.0, self.paused_until - now), 3),
+                request_tokens=round(self.requests.tokens, 2),
+                token_budget=round(self.tokens.tokens, 1),
+            )
+
+
+gateway = LLMGateway()
@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from llm_gateway import PRIORITY_BACKGROUND, estimate_tokens, gateway
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+# Build the LLM and search clients in a background thread at startup instead
+# of on the first request that needs them.
+LLM_PREWARM = os.getenv("LLM_PREWARM", "false").lower() in ('1', 'true', 'yes')
+
+# The google/langchain stacks are imported inside the builders below, so
+# importing this module (and routes that never call an LLM) stays cheap.
+
+# Built clients/chains/agents keyed by (kind, ...); shared by all threads.
+# Re-entrant because building a chain builds (or fetches) its LLM.
+_registry = {}
+_registry_lock = threading.RLock()
+# Set while this thread runs a builder; nested builds are timed by the outer one.
+_building = threading.local()
+
+# (label, phase) -> [count, total_seconds, max_seconds]
+_timings = {}
+_timings_lock = threading.Lock()
+
+
+def record_timing(label, phase, seconds):
+    with _timings_lock:
+        stats = _timings.setdefault((label, phase), [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+
+@contextmanager
+def timed(label, phase='inference'):
+    """Records the duration of the wrapped block under (label, phase)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(label, phase, time.perf_counter() - started)
+
+
+def get_timing_stats():
+    """
+    Returns per-label timing split by phase.
+
+    Returns:
+        dict: {label: {phase: {'count', 'total_seconds', 'avg_seconds',
+               'max_seconds'}}}; 'construct' covers building clients and
+               chains, 'inference' the model calls.
+    """
+    with _timings_lock:
+        items = list(_timings.items())
+    stats = {}
+    for (label, phase), (count, total, peak) in items:
+        stats.setdefault(label, {})[phase] = {
+            'count': count,
+            'total_seconds': round(total, 6),
+            'avg_seconds': round(total / count, 6) if count else 0.0,
+            'max_seconds': round(peak, 6),
+        }
+    return stats
+
+
+def get_or_build(key, builder, label=None):
+    """
+    Returns the registry entry for key, building it once with builder().
+
+    Construction happens under the registry lock so concurrent first callers
+    do not each build their own client. Its duration is recorded under
+    (label, 'construct'); pass the label the client's calls are timed under
+    so both phases line up. Defaults to the key's kind. Entries built inside
+    another builder (a chain's LLM) count toward the outer build only.
+    """
+    entry = _registry.get(key)
+    if entry is not None:
+        return entry
+    with _registry_lock:
+        entry = _registry.get(key)
+        if entry is None:
+            if getattr(_building, 'active', False):
+                entry = builder()
+            else:
+                _building.active = True
+                try:
+                    with timed(label or key[0], 'construct'):
+                        entry = builder()
+                finally:
+                    _building.active = False
+            _registry[key] = entry
+    return entry
+
+
+def configure_genai():
+    """Imports and configures google.generativeai once; returns the module."""
+    def build():
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        return genai
+
+    return get_or_build(('genai',), build)
+
+
+def get_llm(model=DEFAULT_MODEL, temperature=0.7, label=None):
+    """
+    Returns the shared chat model for (model, temperature); `label` names
+    its construction timing (see get_or_build).
+    """
+    def build():
+        configure_genai()
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=GEMINI_API_KEY,
+            temperature=temperature
+        )
+
+    return get_or_build(('llm', model, temperature), build, label)
+
+
+def get_chain(template, model=DEFAULT_MODEL, temperature=0.7, label=None):
+    """
+    Returns the shared LLMChain for a prompt template on (model, temperature);
+    `label` names its construction timing (see get_or_build).
+    """
+    def build():
+        from langchain.chains import LLMChain
+        from langchain.prompts import ChatPromptTemplate
+        prompt = ChatPromptTemplate.from_template(template)
+        return LLMChain(llm=get_llm(model, temperature, label), prompt=prompt)
+
+    return get_or_build(('chain', template, model, temperature), build, label)
+
+
+def get_serper(label='search'):
+    """Returns the shared Serper search wrapper."""
+    def build():
+        from langchain_community.utilities import GoogleSerperAPIWrapper
+        return GoogleSerperAPIWrapper(serper_api_key=SERPER_API_KEY)
+
+    return get_or_build(('serper',), build, label)
+
+
+class LazyClient:
+    """
+    Module-level stand-in for a shared client that is built by `factory` on
+    first attribute access, e.g. `serper = LazyClient(get_serper)`.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+def prewarm(*builders, background=True):
+    """
+    Builds clients ahead of the first request (the production hook behind
+    LLM_PREWARM). Failures are printed, not raised; the client is then
+    built on first use as usual.
+
+    Args:
+        *builders (callable): Zero-argument calls such as get_serper or
+            lambda: get_chain(TEMPLATE). Defaults to get_llm.
+        background (bool): Run in a daemon thread. Defaults to True.
+    """
+    def warm():
+        for build in builders or (get_llm,):
+            try:
+                build()
+            except Exception as e:
+                print(f"LLM prewarm failed: {e}")
+
+    if background:
+        threading.Thread(target=warm, name='llm-prewarm', daemon=True).start()
+    else:
+        warm()
+
+
+# Prompt tokens of a chain's template, which invoke() does not see.
+TEMPLATE_TOKENS = int(os.getenv("LLM_TEMPLATE_TOKENS", 400))
+
+
+def invoke(chain, inputs, label, priority=PRIORITY_BACKGROUND, max_wait=None):
+    """
+    Invokes a chain through the rate-limiting gateway, recording the call
+    under (label, 'inference').
+
+    Raises:
+        llm_gateway.LLMOverloaded: The call was shed instead of queued.
+    """
+    def call():
+        with timed(label):
+            return chain.invoke(inputs)
+
+    tokens = estimate_tokens(' '.join(str(value) for value in inputs.values())) + TEMPLATE_TOKENS
+    return gateway.call(call, tokens=tokens, priority=priority, max_wait=max_wait, label=label)
+
+
+def predict(llm, prompt, label, priority=PRIORITY_BACKGROUND, max_wait=None):
+    """
+    Calls llm.predict through the rate-limiting gateway, recording the call
+    under (label, 'inference').
+
+    Raises:
+        llm_gateway.LLMOverloaded: The call was shed instead of queued.
+    """
+    def call():
+        with timed(label):
+            return llm.predict(prompt)
+
+    return gateway.call(call, tokens=estimate_tokens(prompt), priority=priority,
+                        max_wait=max_wait, label=label)
+
+
+class GatedLLM:
+    """
+    Wraps a chat model so every predict() goes through the gateway; lets
+    helpers that take an `llm` (e.g. sentiment.classify_batch) share the quota.
+    """
+
+    def __init__(self, llm, label, priority=PRIORITY_BACKGROUND, max_wait=None):
+        self.llm = llm
+        self.label = label
+        self.priority = priority
+        self.max_wait = max_wait
+
+    def predict(self, prompt):
+        return predict(self.llm, prompt, self.label, self.priority, self.max_wait)
+
+
+def reset():
+    """Drops all built clients (e.g. after rotating the API key)."""
+    with _registry_lock:
+        _registry.clear()
@@ -2,17 +2,28 @@ import time
 import requests
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI  # Updated Gemini import!
-from langchain.chains import LLMChain # Importing LLMChain
-from langchain.prompts import ChatPromptTemplate # Importing ChatPromptTemplate
+import cryptocompare_client
+import fx_rates
+import llm_provider
+from alert_system import check_price_alerts
+from portfolio_manager import display_portfolio_summary, load_portfolio, track_portfolio
+from monitor_scheduler import MonitorScheduler
+from materiality import MaterialityGate
+from price_stream import PriceStream
 
 
 load_dotenv()
 
 CRYPTO_COMPARE_API_KEY = os.getenv("CRYPTOCARE_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
+
+# Monitoring schedule
+WATCHLIST = [s.strip().upper() for s in os.getenv("WATCHLIST", "BTC,ETH").split(',') if s.strip()]
+MONITOR_INTERVAL = float(os.getenv("MONITOR_INTERVAL", 30))  # seconds between price ticks
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 4))
+MIN_REANALYSIS_SECONDS = float(os.getenv("MIN_REANALYSIS_SECONDS", 300))
+REANALYSIS_JITTER = float(os.getenv("REANALYSIS_JITTER", 0.1))
+# 'poll' (REST pricemulti every tick) or 'stream' (live WebSocket ticker book)
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "poll").lower()
 
 
 # -------------------- Data Layer (CryptoCompare API) --------------------
@@ -20,36 +31,30 @@ print("--- Defining Data Layer Functions ---")
 
 def get_latest_price(symbols, currency='USD'):
     print("Entering get_latest_price function")
-    url = f"https://min-api.cryptocompare.com/data/pricemulti?fsyms={','.join(symbols)}&tsyms={currency}&api_key={CRYPTO_COMPARE_API_KEY}"
-    print(f"API Request URL: {url}")
+    print(f"API Request: pricemulti fsyms={','.join(symbols)} tsyms={currency}")
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        data = response.json()
+        # Pooled session with timeouts, retry/backoff and a request budget
+        data = cryptocompare_client.get('/data/pricemulti', fsyms=','.join(symbols), tsyms=currency)
         print("API Response Data:", data)  # Print API response
         return data
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data from CryptoCompare API: {e}")
         return None
 
-# -------------------- Analysis Engine (Langchain & Gemini) --------------------
-print("--- Defining Analysis Engine Functions ---")
+price_stream = PriceStream(WATCHLIST) if PRICE_SOURCE == 'stream' else None
 
-def analyze_price_with_gemini(crypto_symbol, price):
-    print("Entering analyze_price_with_gemini function")
-    print(f"Analyzing symbol: {crypto_symbol}, price: {price}")
+def get_streamed_price(symbols, currency='USD'):
+    # Live ticker book first; symbols without a tick yet fall back to REST
+    prices = price_stream.book.prices(symbols)
+    missing = [symbol for symbol in symbols if symbol not in prices]
+    if missing:
+        prices.update(get_latest_price(missing, currency) or {})
+    return prices or None
 
-    try:
-        print("Initializing Gemini LLM using ChatGoogleGenerativeAI...")
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-pro",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.7  # You can adjust temperature
-        )
-        print("Gemini LLM initialized successfully.")
+# -------------------- Analysis Engine (Langchain & Gemini) --------------------
+print("--- Defining Analysis Engine Functions ---")
 
-        # --- Define Prompt for Analysis ---
-        analysis_template = """You are a cryptocurrency analyst providing concise insights on current crypto prices.
+ANALYSIS_TEMPLATE = """You are a cryptocurrency analyst providing concise insights on current crypto prices.
 
         Analyze the current price of {crypto_symbol} which is ${price} USD.
 
@@ -57,14 +62,17 @@ def analyze_price_with_gemini(crypto_symbol, price):
 
         Format your response as a short paragraph."""
 
-        analysis_prompt = ChatPromptTemplate.from_template(analysis_template)
-        print("Analysis prompt created.")
+def analyze_price_with_gemini(crypto_symbol, price):
+    print("Entering analyze_price_with_gemini function")
+    print(f"Analyzing symbol: {crypto_symbol}, price: {price}")
 
-        analysis_chain = LLMChain(llm=llm, prompt=analysis_prompt) # Initialize LLMChain
-        print("Analysis LLMChain initialized.")
+    try:
+        # Client and chain are built once per process and shared across calls
+        analysis_chain = llm_provider.get_chain(ANALYSIS_TEMPLATE, temperature=0.7, label='monitor_analysis')
+        print("Analysis LLMChain ready.")
 
         print("Invoking analysis chain...")
-        analysis_output = analysis_chain.invoke({"crypto_symbol": crypto_symbol, "price": price}) # Invoke chain with input
+        analysis_output = llm_provider.invoke(analysis_chain, {"crypto_symbol": crypto_symbol, "price": price}, label='monitor_analysis')
         analysis_text = analysis_output['text'] # Extract text from output
         print("Analysis chain invoked.")
         print("Gemini Analysis Result:\n", analysis_text)
@@ -75,35 +83,35 @@ def analyze_price_with_gemini(crypto_symbol, price):
         print(error_message)
         return error_message
 
-# -------------------- Alert System (Placeholder) --------------------
-print("--- Defining Alert System Functions ---")
-
-def check_price_alerts(prices):
-    print("Entering check_price_alerts function")
-    alerts = []
-    # Add alert logic here based on price thresholds, etc.
-    # Example (very basic):
-    # if prices.get('BTC', {}).get('USD', 0) > 31000:
-    #     alerts.append("BTC price above $31000!")
-    print("Alert checks completed (placeholder logic). No alerts triggered yet.")
-    return alerts
-
-# -------------------- Portfolio Manager (Placeholder) --------------------
-print("--- Defining Portfolio Manager Functions ---")
-
-def track_portfolio(transactions):
-    print("Entering track_portfolio function")
-    portfolio_summary = {"holdings": {}, "performance": "N/A"} # Placeholder
-    # Add portfolio tracking logic here
-    print("Portfolio tracking completed (placeholder logic).")
-    return portfolio_summary
-
-def display_portfolio_summary(summary):
-    print("Entering display_portfolio_summary function")
-    print("\nPortfolio Summary:")
-    print(f"Holdings: {summary.get('holdings')}")
-    print(f"Performance: {summary.get('performance')}")
-    print("Portfolio summary displayed.")
+# Re-analysis is skipped unless the price moved by ANALYSIS_MOVE_PCT or the
+# last analysis is older than ANALYSIS_MAX_AGE.
+materiality_gate = MaterialityGate()
+
+def analyze_if_material(crypto_symbol, price):
+    analysis, as_of, reused = materiality_gate.get_or_analyze(
+        crypto_symbol, {'price': price},
+        lambda: analyze_price_with_gemini(crypto_symbol, price),
+        should_record=lambda text: not text.startswith("Error during analysis")
+    )
+    if reused:
+        as_of_text = time.strftime('%H:%M:%S', time.localtime(as_of))
+        return f"[as of {as_of_text}, no material move since] {analysis}"
+    return analysis
+
+# -------------------- Alert System --------------------
+# check_price_alerts is provided by alert_system (streaming AlertEngine).
+
+# -------------------- Portfolio Manager --------------------
+# track_portfolio / display_portfolio_summary are provided by portfolio_manager
+# (array-backed ledger with incremental FIFO/average-cost P&L).
+
+# Transactions CSV (timestamp,type,symbol,quantity,price,fee) or a saved .npz snapshot
+PORTFOLIO_FILE = os.getenv("PORTFOLIO_FILE")
+PORTFOLIO_COST_METHOD = os.getenv("PORTFOLIO_COST_METHOD", "fifo")
+# Currency the transactions are recorded in, and the one the summary is shown
+# in; prices are fetched in USD only and converted locally (see fx_rates).
+PORTFOLIO_CURRENCY = os.getenv("PORTFOLIO_CURRENCY", fx_rates.BASE_CURRENCY).upper()
+PORTFOLIO_REPORT_CURRENCY = os.getenv("PORTFOLIO_REPORT_CURRENCY", PORTFOLIO_CURRENCY).upper()
 
 
 # -------------------- Main Application Logic --------------------
@@ -111,48 +119,63 @@ print("--- Defining Main Application Logic (main function) ---")
 
 def main():
     print("Entering main function")
-    crypto_symbols = ['BTC', 'ETH'] # Symbols to monitor
-    transactions = [] # Placeholder for transaction data
-
-    print("Crypto Trading Assistant Started!")
-
-    while True: # Real-time monitoring loop (simplified for demonstration)
-        print("\n--- Starting Monitoring Loop Iteration ---")
-        prices = get_latest_price(crypto_symbols)
-
-        if prices:
-            print("\n--- Real-time Monitoring Data Received ---")
-            for symbol, price_data in prices.items():
-                if usd_price := price_data.get('USD'):
-                    print(f"{symbol}: ${usd_price}")
-
-                    # Analyze price with Gemini
-                    print(f"Calling analyze_price_with_gemini for {symbol}...")
-                    analysis = analyze_price_with_gemini(symbol, usd_price)
-                    print(f"Gemini Analysis for {symbol}:\n{analysis}\n")
-                else:
-                    print(f"Price data for {symbol} in USD not found.")
-
-            # Check for alerts
-            print("Checking for alerts...")
-            triggered_alerts = check_price_alerts(prices)
-            if triggered_alerts:
-                print("\nAlerts:")
-                for alert in triggered_alerts:
-                    print(f"- {alert}")
-            else:
-                print("No alerts triggered.")
-
-            # Portfolio Management
-            print("Updating portfolio...")
-            portfolio_summary = track_portfolio(transactions)
-            display_portfolio_summary(portfolio_summary)
-
-        else:
-            print("Failed to get crypto prices. Retrying in 30 seconds...")
-
-        print("Sleeping for 30 seconds...")
-        time.sleep(30) # Check every 30 seconds
+    portfolio = load_portfolio(PORTFOLIO_FILE, method=PORTFOLIO_COST_METHOD,
+                               currency=PORTFOLIO_CURRENCY)
+    print(f"Loaded portfolio with {len(portfolio.ledger)} transactions.")
+    if llm_provider.LLM_PREWARM:
+        llm_provider.prewarm(lambda: llm_provider.get_chain(ANALYSIS_TEMPLATE, temperature=0.7, label='monitor_analysis'))
+
+    def handle_prices(prices):
+        # Check for alerts
+        triggered_alerts = check_price_alerts(prices)
+        if triggered_alerts:
+            print("\nAlerts:")
+            for alert in triggered_alerts:
+                print(f"- {alert}")
+
+        # Revalues the running positions; the ledger is not replayed
+        try:
+            if portfolio.currency != fx_rates.BASE_CURRENCY:
+                prices = fx_rates.convert_prices(prices, portfolio.currency)
+            rate = fx_rates.get_rate(PORTFOLIO_REPORT_CURRENCY, portfolio.currency)
+        except fx_rates.FXError as e:
+            print(f"Portfolio not revalued: {e}")
+            return
+        portfolio_summary = track_portfolio(portfolio, prices,
+                                            report_currency=PORTFOLIO_REPORT_CURRENCY, rate=rate)
+        display_portfolio_summary(portfolio_summary)
+
+    def handle_analysis(symbol, price, analysis):
+        print(f"Gemini Analysis for {symbol} (${price}):\n{analysis}\n")
+
+    scheduler = MonitorScheduler(
+        WATCHLIST,
+        fetch=get_streamed_price if price_stream is not None else get_latest_price,
+        analyze=analyze_if_material,
+        on_prices=handle_prices,
+        on_analysis=handle_analysis,
+        interval=MONITOR_INTERVAL,
+        workers=ANALYSIS_WORKERS,
+        min_reanalysis=MIN_REANALYSIS_SECONDS,
+        jitter=REANALYSIS_JITTER,
+    )
+
+    if price_stream is not None:
+        price_stream.start()
+
+    print(f"Crypto Trading Assistant Started! Watching {len(WATCHLIST)} symbols "
+          f"every {MONITOR_INTERVAL}s in {len(scheduler.chunks)} price request(s).")
+    try:
+        # Fixed-rate ticks: the period does not drift with the work per tick
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("Stopping monitor...")
+    finally:
+        scheduler.shutdown(wait=False)
+        if price_stream is not None:
+            price_stream.stop()
+        print(f"Scheduler stats: {scheduler.stats()}")
+        print(f"Materiality gate: {materiality_gate.stats()}")
 
 if __name__ == "__main__":
     print("--- Script execution started ---")
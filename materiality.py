@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# A new analysis is requested when any of these is crossed since the last one.
+ANALYSIS_MOVE_PCT = float(os.getenv("ANALYSIS_MOVE_PCT", 1.0))
+ANALYSIS_VOL_RATIO = float(os.getenv("ANALYSIS_VOL_RATIO", 1.5))
+ANALYSIS_MAX_AGE = float(os.getenv("ANALYSIS_MAX_AGE", 1800))
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None  # drop NaN
+
+
+def analysis_inputs(price_data):
+    """
+    Extracts the gate inputs from CryptoCompare RAW price data.
+
+    Volatility is the 24h high-low range as a percentage of the price, which
+    tracks the intraday regime without needing the candle history.
+
+    Returns:
+        dict: {'price', 'high_24h', 'low_24h', 'volatility'}; missing values
+              are None.
+    """
+    price = _number(price_data.get('PRICE'))
+    high = _number(price_data.get('HIGH24HOUR'))
+    low = _number(price_data.get('LOW24HOUR'))
+    volatility = None
+    if price and high is not None and low is not None:
+        volatility = (high - low) / price * 100
+    return {'price': price, 'high_24h': high, 'low_24h': low, 'volatility': volatility}
+
+
+class _Record:
+    __slots__ = ('inputs', 'analysis', 'as_of')
+
+    def __init__(self, inputs, analysis, as_of):
+        self.inputs = inputs
+        self.analysis = analysis
+        self.as_of = as_of
+
+
+class MaterialityGate:
+    """
+    Remembers the inputs of the last analysis per symbol and decides whether
+    the market has moved enough to justify a new LLM call.
+
+    Args:
+        move_pct (float): Price move, in percent, that triggers a refresh.
+        vol_ratio (float): Factor by which volatility must rise or fall to
+            count as a regime change.
+        max_age (float): Seconds after which an analysis is refreshed anyway.
+    """
+
+    def __init__(self, move_pct=ANALYSIS_MOVE_PCT, vol_ratio=ANALYSIS_VOL_RATIO,
+                 max_age=ANALYSIS_MAX_AGE):
+        self.move_pct = move_pct
+        self.vol_ratio = vol_ratio
+        self.max_age = max_age
+        self._records = {}
+        self._lock = threading.Lock()
+        self._stats = {'reused': 0, 'refreshed': 0}
+        self._reasons = {}
+
+    def refresh_reason(self, symbol, inputs, now=None):
+        """
+        Returns why the symbol needs a new analysis, or None if the last one
+        still describes the market.
+        """
+        with self._lock:
+            record = self._records.get(symbol.upper())
+        if record is None:
+            return 'first'
+        now = time.time() if now is None else now
+        if now - record.as_of >= self.max_age:
+            return 'max_age'
+
+        last = record.inputs
+        price, last_price = inputs.get('price'), last.get('price')
+        if price is not None and last_price:
+            if abs(price - last_price) / last_price * 100 >= self.move_pct:
+                return 'price_move'
+
+        high, last_high = inputs.get('high_24h'), last.get('high_24h')
+        if price is not None and last_high is not None and \
+                (price > last_high or (high is not None and high > last_high)):
+            return 'new_high'
+        low, last_low = inputs.get('low_24h'), last.get('low_24h')
+        if price is not None and last_low is not None and \
+                (price < last_low or (low is not None and low < last_low)):
+            return 'new_low'
+
+        vol, last_vol = inputs.get('volatility'), last.get('volatility')
+        if vol is not None and last_vol:
+            ratio = vol / last_vol
+            if ratio >= self.vol_ratio or ratio <= 1 / self.vol_ratio:
+                return 'volatility_regime'
+        return None
+
+    def reuse(self, symbol, inputs, now=None, count=True):
+        """
+        Returns (analysis, as_of) of the previous analysis when the market
+        has not materially moved, otherwise None. Pass count=False for
+        lookups that should not show up in stats().
+        """
+        reason = self.refresh_reason(symbol, inputs, now)
+        with self._lock:
+            if reason is None:
+                record = self._records.get(symbol.upper())
+                if record is not None:
+                    if count:
+                        self._stats['reused'] += 1
+                    return record.analysis, record.as_of
+                reason = 'first'
+            if not count:
+                return None
+            self._stats['refreshed'] += 1
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+        return None
+
+    def record(self, symbol, inputs, analysis, as_of=None):
+        """Stores the analysis and the inputs it was generated from."""
+        with self._lock:
+            self._records[symbol.upper()] = _Record(
+                dict(inputs), analysis, time.time() if as_of is None else as_of)
+
+    def get_or_analyze(self, symbol, inputs, compute, should_record=None):
+        """
+        Serves the previous analysis unless a threshold is crossed, in which
+        case compute() is called and its result recorded.
+
+        Args:
+            symbol (str): Cryptocurrency symbol (e.g., 'BTC').
+            inputs (dict): Gate inputs (see analysis_inputs).
+            compute (callable): Zero-argument callable producing an analysis.
+            should_record (callable, optional): Predicate deciding whether a
+                computed analysis may be reused later (e.g. to skip fallbacks).
+
+        Returns:
+            tuple: (analysis, as_of, reused)
+        """
+        reused = self.reuse(symbol, inputs)
+        if reused is not None:
+            return reused[0], reused[1], True
+        analysis = compute()
+        as_of = time.time()
+        if should_record is None or should_record(analysis):
+            self.record(symbol, inputs, analysis, as_of)
+        return analysis, as_of, False
+
+    def forget(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._records.clear()
+            else:
+                self._records.pop(symbol.upper(), None)
+
+    def stats(self):
+        """Returns reuse/refresh counts and the refresh reasons seen so far."""
+        with self._lock:
+            total = self._stats['reused'] + self._stats['refreshed']
+            return {
+                'reused': self._stats['reused'],
+                'refreshed': self._stats['refreshed'],
+                'reuse_ratio': round(self._stats['reused'] / total, 4) if total else 0.0,
+                'refresh_reasons': dict(self._reasons),
+                'symbols': len(self._records),
+            }
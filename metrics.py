@@ -0,0 +1,246 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache hits up to slow LLM calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Stage timings of the current request, for the Server-Timing header. Worker
+# threads see it when the task is submitted with contextvars.copy_context().
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                  for key, value in items]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Holds metrics and scrape-time collectors and renders them as Prometheus
+    text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labels, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """
+        Adds a callable run at scrape time, returning a list of
+        (name, type, help, [(labels_dict, value), ...]) tuples. Used for
+        values that already live elsewhere (cache stats, LLM timings).
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        for collect in collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} "
+                                 f"{_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    'crypto_stage_seconds', 'Time spent in each hot-path stage.', ('stage',))
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'crypto_http_request_seconds', 'Flask request latency.', ('endpoint', 'method', 'status'))
+RETRIES = registry.counter(
+    'crypto_upstream_retries_total', 'Upstream calls retried, by upstream and reason.',
+    ('upstream', 'reason'))
+
+
+def observe_stage(stage, seconds):
+    """Records a stage duration in the histogram and the current request's timings."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def span(stage):
+    """Times the wrapped block as one `stage` observation."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def timed_stage(stage):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request():
+    """Starts collecting stage timings for the current request context."""
+    return _request_timings.set([])
+
+
+def request_timings():
+    return list(_request_timings.get() or [])
+
+
+def server_timing_header(timings, total=None):
+    """
+    Formats stage timings as a Server-Timing header value; repeated stages
+    are summed (e.g. 'history;dur=12.3;desc="x2", total;dur=40.1').
+    """
+    merged = {}
+    for stage, seconds in timings:
+        entry = merged.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for stage, (seconds, count) in merged.items():
+        part = f"{stage};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(parts)
+
+
+def cache_stats_collector(caches):
+    """
+    Returns a collector exposing cache.stats() for {name: cache}.
+
+    Counts become crypto_cache_events_total{cache,event}; 'size' becomes
+    crypto_cache_entries{cache}.
+    """
+    def collect():
+        events, sizes = [], []
+        for name, cache in caches.items():
+            stats = cache.stats()
+            for event, value in stats.items():
+                if event == 'size':
+                    sizes.append(({'cache': name}, value))
+                else:
+                    events.append(({'cache': name, 'event': event}, value))
+        return [
+            ('crypto_cache_events_total', 'counter', 'Cache hits, misses and refreshes.', events),
+            ('crypto_cache_entries', 'gauge', 'Entries currently cached.', sizes),
+        ]
+    return collect
@@ -0,0 +1,276 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptocompare_api import chunk_symbols
+
+
+class FixedRateTicker:
+    """
+    Yields tick deadlines at a fixed rate (start + n * interval).
+
+    Unlike sleeping a fixed time after the work, the period does not grow
+    with the work done per tick. When a tick overruns so far that later
+    deadlines have already passed, those ticks are skipped and counted as
+    missed rather than run back to back.
+
+    Args:
+        interval (float): Seconds between ticks.
+        clock (callable): Monotonic clock. Defaults to time.monotonic.
+        sleep (callable): Sleep function, or an Event.wait-style callable
+            returning True to stop early. Defaults to time.sleep.
+    """
+
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.started = None
+        self.ticks = 0
+        self.missed = 0
+
+    def wait_next(self):
+        """
+        Sleeps until the next deadline.
+
+        Returns:
+            tuple: (lag_seconds, missed) - how late the tick starts relative to
+                   its deadline and how many deadlines were skipped before it;
+                   (None, 0) if the sleep was interrupted.
+        """
+        now = self.clock()
+        if self.started is None:
+            self.started = now
+            self.ticks = 1
+            return 0.0, 0
+        deadline = self.started + self.ticks * self.interval
+        missed = 0
+        if now > deadline + self.interval:
+            # Overran by more than a period: jump to the latest deadline.
+            missed = int((now - deadline) // self.interval)
+            self.missed += missed
+            deadline += missed * self.interval
+        elif now < deadline:
+            if self.sleep(deadline - now):
+                return None, 0
+        self.ticks += missed + 1
+        return max(0.0, self.clock() - deadline), missed
+
+
+class MonitorScheduler:
+    """
+    Fixed-rate monitoring loop over a large watchlist.
+
+    Every tick fetches prices for the whole watchlist in fsyms-sized chunks
+    (concurrently), hands them to `on_prices`, and queues an analysis for
+    each symbol whose re-analysis interval has elapsed on a bounded worker
+    pool. Re-analysis times are jittered so a large watchlist does not fall
+    due all at once.
+
+    Args:
+        symbols (iterable): Watchlist.
+        fetch (callable): fetch(chunk) -> {symbol: {currency: price}} for
+            one chunk of symbols (e.g. a pricemulti call); None on failure.
+        analyze (callable, optional): analyze(symbol, price) run on the pool.
+        on_prices (callable, optional): Called with the merged prices of a tick.
+        on_analysis (callable, optional): Called with (symbol, price, result).
+        interval (float): Seconds between ticks. Defaults to 30.
+        currency (str): Quote currency. Defaults to 'USD'.
+        workers (int): Analysis pool size. Defaults to 4.
+        fetch_workers (int): Concurrent chunk fetches. Defaults to 4.
+        min_reanalysis (float): Minimum seconds between analyses of a symbol.
+            Defaults to 300.
+        jitter (float): Fractional jitter applied to re-analysis times.
+            Defaults to 0.1.
+        max_pending (int, optional): Queued analyses beyond which due symbols
+            wait for a later tick. Defaults to 2 * workers.
+    """
+
+    def __init__(self, symbols, fetch, analyze=None, on_prices=None, on_analysis=None,
+                 interval=30, currency='USD', workers=4, fetch_workers=4,
+                 min_reanalysis=300, jitter=0.1, max_pending=None):
+        self.symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        self.fetch = fetch
+        self.analyze = analyze
+        self.on_prices = on_prices
+        self.on_analysis = on_analysis
+        self.interval = interval
+        self.currency = currency
+        self.min_reanalysis = min_reanalysis
+        self.jitter = jitter
+        self.max_pending = max_pending if max_pending is not None else 2 * workers
+        self.chunks = chunk_symbols(self.symbols)
+        self._analysis_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis')
+        self._fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='fetch')
+        self._next_due = {}
+        self._latest_prices = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.ticker = FixedRateTicker(interval, sleep=self._stop.wait)
+        self._stats = {
+            'ticks': 0, 'missed_ticks': 0, 'overruns': 0,
+            'last_lag': 0.0, 'max_lag': 0.0, 'total_lag': 0.0,
+            'last_tick_seconds': 0.0, 'max_tick_seconds': 0.0,
+            'fetch_errors': 0, 'analyses_started': 0, 'analyses_completed': 0,
+            'analyses_failed': 0, 'analyses_deferred': 0, 'max_analysis_delay': 0.0,
+        }
+
+    def _jittered(self, seconds):
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def fetch_prices(self):
+        """Fetches all chunks concurrently and returns the merged prices."""
+        prices = {}
+        for data in self._fetch_pool.map(self._fetch_chunk, self.chunks):
+            if data:
+                prices.update(data)
+        return prices
+
+    def _fetch_chunk(self, chunk):
+        try:
+            data = self.fetch(chunk)
+        except Exception as e:
+            print(f"Price fetch failed for {len(chunk)} symbols: {e}")
+            data = None
+        if isinstance(data, dict) and data.get('Response') == 'Error':
+            # CryptoCompare reports errors in the body; none of it is a price.
+            print(f"Price fetch failed for {len(chunk)} symbols: {data.get('Message')}")
+            data = None
+        if data is None:
+            with self._lock:
+                self._stats['fetch_errors'] += 1
+        return data
+
+    def _run_analysis(self, symbol, price):
+        try:
+            result = self.analyze(symbol, price)
+        except Exception as e:
+            print(f"Analysis failed for {symbol}: {e}")
+            with self._lock:
+                self._stats['analyses_failed'] += 1
+            return
+        finally:
+            with self._lock:
+                self._in_flight.discard(symbol)
+        with self._lock:
+            self._stats['analyses_completed'] += 1
+        if self.on_analysis is not None:
+            self.on_analysis(symbol, price, result)
+        # Refill the freed slot from the latest prices instead of idling
+        # until the next tick.
+        if not self._stop.is_set():
+            self.schedule_analyses(self._latest_prices, refill=True)
+
+    def schedule_analyses(self, prices, now=None, refill=False):
+        """
+        Queues analyses for symbols that are due, up to max_pending.
+
+        Args:
+            prices (dict): Latest {symbol: {currency: price}}.
+            now (float, optional): Monotonic time. Defaults to now.
+            refill (bool): Set when called because a worker freed up; such
+                calls do not count deferred symbols again.
+
+        Returns:
+            tuple: (queued, deferred) symbol counts.
+        """
+        if self.analyze is None:
+            return 0, 0
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            for symbol in self.symbols:
+                price = (prices.get(symbol) or {}).get(self.currency)
+                if price is None or symbol in self._in_flight:
+                    continue
+                # New symbols are due now; max_pending paces the initial burst.
+                next_due = self._next_due.setdefault(symbol, now)
+                if next_due <= now:
+                    due.append((next_due, symbol, price))
+            due.sort()
+            capacity = max(0, self.max_pending - len(self._in_flight))
+            queued, deferred = due[:capacity], due[capacity:]
+            for next_due, symbol, price in queued:
+                self._in_flight.add(symbol)
+                self._next_due[symbol] = now + self._jittered(self.min_reanalysis)
+                self._stats['analyses_started'] += 1
+                self._stats['max_analysis_delay'] = max(self._stats['max_analysis_delay'],
+                                                        now - next_due)
+            if not refill:
+                self._stats['analyses_deferred'] += len(deferred)
+        for next_due, symbol, price in queued:
+            try:
+                self._analysis_pool.submit(self._run_analysis, symbol, price)
+            except RuntimeError:
+                # Pool shut down while a refill was in progress.
+                with self._lock:
+                    self._in_flight.discard(symbol)
+        return len(queued), len(deferred)
+
+    def tick(self):
+        """Runs one monitoring cycle and returns its report."""
+        started = time.monotonic()
+        prices = self.fetch_prices()
+        if prices:
+            self._latest_prices = prices
+        if prices and self.on_prices is not None:
+            try:
+                self.on_prices(prices)
+            except Exception as e:
+                print(f"Price handler failed: {e}")
+        queued, deferred = self.schedule_analyses(prices)
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._stats['last_tick_seconds'] = elapsed
+            self._stats['max_tick_seconds'] = max(self._stats['max_tick_seconds'], elapsed)
+            if elapsed > self.interval:
+                self._stats['overruns'] += 1
+            in_flight = len(self._in_flight)
+        return {
+            'prices': len(prices), 'symbols': len(self.symbols), 'chunks': len(self.chunks),
+            'seconds': elapsed, 'queued': queued, 'deferred': deferred, 'in_flight': in_flight,
+        }
+
+    def run(self, max_ticks=None):
+        """Runs ticks at a fixed rate until stop() is called (or max_ticks)."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            lag, missed = self.ticker.wait_next()
+            if lag is None:
+                break
+            with self._lock:
+                self._stats['ticks'] += 1
+                self._stats['missed_ticks'] += missed
+                self._stats['last_lag'] = lag
+                self._stats['max_lag'] = max(self._stats['max_lag'], lag)
+                self._stats['total_lag'] += lag
+            if missed:
+                print(f"Scheduler missed {missed} tick deadline(s); the previous tick overran "
+                      f"the {self.interval}s interval")
+            report = self.tick()
+            print(f"Tick {self._stats['ticks']}: {report['prices']}/{report['symbols']} prices "
+                  f"({report['chunks']} chunks) in {report['seconds']:.2f}s, lag {lag:.3f}s, "
+                  f"analyses queued {report['queued']}, deferred {report['deferred']}, "
+                  f"in flight {report['in_flight']}")
+            if max_ticks is not None and self._stats['ticks'] >= max_ticks:
+                break
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self, wait=True):
+        self.stop()
+        self._fetch_pool.shutdown(wait=wait)
+        self._analysis_pool.shutdown(wait=wait)
+
+    def stats(self):
+        """Returns scheduler counters, including average tick lag."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._in_flight)
+        stats['avg_lag'] = stats['total_lag'] / stats['ticks'] if stats['ticks'] else 0.0
+        del stats['total_lag']
+        return {key: round(value, 4) if isinstance(value, float) else value
+                for key, value in stats.items()}
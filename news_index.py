@@ -0,0 +1,237 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NEWS_DB_PATH = os.getenv("NEWS_DB_PATH", os.path.join("data", "news.sqlite3"))
+# Headlines not seen in any search for this long are dropped from the index
+NEWS_RETENTION_DAYS = float(os.getenv("NEWS_RETENTION_DAYS", 14))
+PRUNE_INTERVAL = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS headlines (
+    hash TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    source TEXT,
+    snippet TEXT,
+    sentiment TEXT,
+    sentiment_method TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS headline_owners (
+    symbol TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (symbol, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS headlines_last_seen ON headlines (last_seen);
+"""
+
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_title(title, source=None):
+    """
+    Normalizes a headline so re-worded copies of the same story match:
+    strips a trailing ' - Source' / ' | Source' naming the given source,
+    accents, punctuation, case and repeated whitespace. Letters of every
+    script are kept.
+    """
+    title = title or ''
+    if source and source.strip():
+        title = re.sub(rf"\s+[-|–—]\s+{re.escape(source.strip())}\s*$", '', title,
+                       flags=re.IGNORECASE)
+    title = ''.join(char for char in unicodedata.normalize('NFKD', title)
+                    if not unicodedata.combining(char))
+    title = _NON_WORD_RE.sub(' ', title.casefold())
+    return _SPACE_RE.sub(' ', title).strip()
+
+
+def title_hash(title, source=None):
+    """
+    Content address of a headline: SHA-1 of its normalized title (16 hex
+    chars), or None when nothing is left of the title after normalizing.
+    """
+    normalized = normalize_title(title, source)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16] if normalized else None
+
+
+def format_age(first_seen, now=None):
+    """Short 'first seen' label such as 'Just now', '25m ago', '3h ago' or '2d ago'."""
+    seconds = max(0, (now or time.time()) - first_seen)
+    if seconds < 60:
+        return 'Just now'
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}h ago"
+    return f"{int(seconds // 86400)}d ago"
+
+
+class NewsIndex:
+    """
+    SQLite index of headlines keyed by normalized-title hash.
+
+    Each headline keeps its sentiment, source and first-seen time, so a
+    search that returns known stories needs no new sentiment calls. A story
+    belongs to the first category it was seen under for a symbol and is
+    dropped from the other categories' results.
+
+    Args:
+        path (str): SQLite database file. Defaults to NEWS_DB_PATH.
+    """
+
+    def __init__(self, path=NEWS_DB_PATH):
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._last_prune = 0.0
+        self._stats = {'new': 0, 'known': 0, 'duplicates': 0, 'other_category': 0,
+                       'untitled': 0, 'classified': 0, 'sentiment_reused': 0}
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def ingest(self, symbol, category, items, needs_sentiment=None, now=None):
+        """
+        Records a search result and returns its deduplicated items.
+
+        Args:
+            symbol (str): Cryptocurrency symbol (e.g., 'BTC').
+            category (str): News category the search was for.
+            items (list): Dicts with 'title', 'snippet' and 'source'.
+            needs_sentiment (callable, optional): Called with a stored
+                sentiment method; True means the headline is classified
+                again (e.g. lexicon results once the LLM is available).
+            now (float, optional): Current epoch seconds.
+
+        Returns:
+            list: Items in search order, without duplicates, untitled items
+                  or stories owned by another category, each with 'hash', 'first_seen' and
+                  'sentiment' (None when it still has to be classified).
+        """
+        now = time.time() if now is None else now
+        unique, seen, untitled = [], set(), 0
+        for item in items:
+            key = title_hash(item['title'], item.get('source'))
+            if key is None:
+                untitled += 1
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(dict(item, hash=key))
+        duplicates = len(items) - untitled - len(unique)
+        if not unique:
+            self._count(duplicates=duplicates, untitled=untitled)
+            return []
+
+        hashes = [item['hash'] for item in unique]
+        marks = ','.join('?' * len(hashes))
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                known = {row[0]: row[1:] for row in conn.execute(
+                    f"SELECT hash, sentiment, sentiment_method, first_seen FROM headlines "
+                    f"WHERE hash IN ({marks})", hashes)}
+                conn.executemany(
+                    "INSERT INTO headlines (hash, title, source, snippet, first_seen, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(hash) DO UPDATE SET last_seen = excluded.last_seen",
+                    [(item['hash'], item['title'], item.get('source'), item.get('snippet'), now, now)
+                     for item in unique])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO headline_owners (symbol, hash, category) VALUES (?, ?, ?)",
+                    [(symbol, key, category) for key in hashes])
+                owners = dict(conn.execute(
+                    f"SELECT hash, category FROM headline_owners WHERE symbol = ? AND hash IN ({marks})",
+                    [symbol] + hashes))
+
+        results, other_category = [], 0
+        for item in unique:
+            if owners.get(item['hash'], category) != category:
+                other_category += 1
+                continue
+            sentiment, method, first_seen = known.get(item['hash'], (None, None, now))
+            if sentiment is not None and needs_sentiment is not None and needs_sentiment(method):
+                sentiment = None
+            results.append(dict(item, first_seen=first_seen, sentiment=sentiment))
+        self._count(new=len(hashes) - len(known), known=len(known), duplicates=duplicates,
+                    other_category=other_category, untitled=untitled,
+                    sentiment_reused=sum(1 for item in results if item['sentiment'] is not None))
+        if now - self._last_prune >= PRUNE_INTERVAL:
+            self.prune(now)
+        return results
+
+    def record_sentiments(self, sentiments, method):
+        """
+        Stores classified sentiments.
+
+        Args:
+            sentiments (dict): {hash: sentiment}.
+            method (str): 'llm' or 'lexicon'.
+        """
+        if not sentiments:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "UPDATE headlines SET sentiment = ?, sentiment_method = ? WHERE hash = ?",
+                    [(sentiment, method, key) for key, sentiment in sentiments.items()])
+        self._count(classified=len(sentiments))
+
+    def prune(self, now=None):
+        """Deletes headlines not seen for NEWS_RETENTION_DAYS."""
+        now = time.time() if now is None else now
+        self._last_prune = now
+        cutoff = now - NEWS_RETENTION_DAYS * 86400
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM headline_owners WHERE hash IN "
+                             "(SELECT hash FROM headlines WHERE last_seen < ?)", (cutoff,))
+                conn.execute("DELETE FROM headlines WHERE last_seen < ?", (cutoff,))
+
+    def stats(self):
+        """Returns ingest counts since start and the number of indexed headlines."""
+        size = self._conn().execute("SELECT COUNT(*) FROM headlines").fetchone()[0]
+        with self._stats_lock:
+            return dict(self._stats, headlines=size)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_news_index():
+    """Returns the process-wide NewsIndex, opening it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NewsIndex()
+    return _index
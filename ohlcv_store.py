@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+import cryptocompare_client
+
+OHLCV_DB_PATH = os.getenv("OHLCV_DB_PATH", os.path.join("data", "ohlcv.sqlite3"))
+
+# interval -> (CryptoCompare endpoint, seconds per candle)
+INTERVALS = {
+    'day': ('/data/v2/histoday', 86400),
+    'hour': ('/data/v2/histohour', 3600),
+    'minute': ('/data/v2/histominute', 60),
+}
+# Maximum candles the histo* endpoints return per call.
+MAX_LIMIT = 2000
+# Minimum seconds between refreshes of the still-open latest candle.
+OPEN_CANDLE_REFRESH = {'day': 300, 'hour': 60, 'minute': 20}
+
+FIELDS = ('time', 'open', 'high', 'low', 'close', 'volumefrom', 'volumeto')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    volumefrom REAL, volumeto REAL,
+    PRIMARY KEY (symbol, currency, interval, time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    symbol TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    synced_at REAL,
+    history_start INTEGER,
+    PRIMARY KEY (symbol, currency, interval)
+);
+"""
+
+
+class OHLCVStore:
+    """
+    SQLite-backed candle store keyed by symbol/currency/interval.
+
+    Candles are fetched incrementally: only those after the last stored
+    timestamp (plus the still-open latest candle) are requested, and older
+    history is backfilled with toTs paging when a longer window is asked for.
+
+    Args:
+        path (str): SQLite database file. Defaults to OHLCV_DB_PATH.
+    """
+
+    def __init__(self, path=OHLCV_DB_PATH):
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key_lock(self, key):
+        with self._key_locks_lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def bounds(self, symbol, currency, interval):
+        """Returns (first_time, last_time) of stored candles, or (None, None)."""
+        row = self._conn().execute(
+            "SELECT MIN(time), MAX(time) FROM candles WHERE symbol=? AND currency=? AND interval=?",
+            (symbol, currency, interval)).fetchone()
+        return row[0], row[1]
+
+    def _sync_state(self, symbol, currency, interval):
+        row = self._conn().execute(
+            "SELECT synced_at, history_start FROM sync_state WHERE symbol=? AND currency=? AND interval=?",
+            (symbol, currency, interval)).fetchone()
+        return row if row else (None, None)
+
+    def _set_sync_state(self, symbol, currency, interval, synced_at=None, history_start=None):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                "INSERT INTO sync_state (symbol, currency, interval, synced_at, history_start) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(symbol, currency, interval) DO UPDATE SET "
+                "synced_at=COALESCE(excluded.synced_at, synced_at), "
+                "history_start=COALESCE(excluded.history_start, history_start)",
+                (symbol, currency, interval, synced_at, history_start))
+            conn.commit()
+
+    def upsert(self, symbol, currency, interval, candles):
+        rows = [(symbol, currency, interval) + tuple(candle.get(f, 0) for f in FIELDS)
+                for candle in candles]
+        if not rows:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO candles (symbol, currency, interval, time, open, high, "
+                "low, close, volumefrom, volumeto) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+
+    def read(self, symbol, currency='USD', interval='day', since=None):
+        """Returns stored candles (oldest first) as dicts, optionally from `since`."""
+        rows = self._conn().execute(
+            "SELECT time, open, high, low, close, volumefrom, volumeto FROM candles "
+            "WHERE symbol=? AND currency=? AND interval=? AND time>=? ORDER BY time",
+            (symbol, currency, interval, since or 0)).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    @staticmethod
+    def _fetch(symbol, currency, interval, limit, to_ts=None):
+        """Fetches up to `limit` + 1 candles ending at to_ts (or now)."""
+        path, _ = INTERVALS[interval]
+        params = {'fsym': symbol, 'tsym': currency, 'limit': min(max(limit, 1), MAX_LIMIT)}
+        if to_ts is not None:
+            params['toTs'] = to_ts
+        data = cryptocompare_client.get(path, **params)
+        if data.get('Response') != 'Success':
+            raise requests.exceptions.RequestException(data.get('Message', 'Unknown error'))
+        return data.get('Data', {}).get('Data', [])
+
+    def sync(self, symbol, currency='USD', interval='day', lookback=30):
+        """
+        Makes sure the last `lookback` candles up to now are stored locally.
+
+        Args:
+            symbol (str): Cryptocurrency symbol (e.g., 'BTC').
+            currency (str, optional): Quote currency. Defaults to 'USD'.
+            interval (str, optional): 'day', 'hour' or 'minute'.
+            lookback (int, optional): Number of candles wanted before now.
+        """
+        _, step = INTERVALS[interval]
+        with self._key_lock((symbol, currency, interval)):
+            now = time.time()
+            now_bucket = int(now) // step * step
+            want_start = now_bucket - lookback * step
+            first, last = self.bounds(symbol, currency, interval)
+            synced_at, history_start = self._sync_state(symbol, currency, interval)
+
+            if last is None:
+                self._backfill(symbol, currency, interval, now_bucket, want_start, to_ts=None)
+            else:
+                open_candle_due = synced_at is None or now - synced_at >= OPEN_CANDLE_REFRESH[interval]
+                if last < now_bucket or open_candle_due:
+                    # Re-fetch from the last stored candle, which may have been open.
+                    self._backfill(symbol, currency, interval, now_bucket, last, to_ts=None)
+                if first > want_start and (history_start is None or history_start < first):
+                    self._backfill(symbol, currency, interval, first - step, want_start, to_ts=first - step)
+            self._set_sync_state(symbol, currency, interval, synced_at=now)
+
+    def _backfill(self, symbol, currency, interval, end, start, to_ts):
+        """Fetches candles in [start, end] newest-first, paging with toTs."""
+        _, step = INTERVALS[interval]
+        while end >= start:
+            limit = (end - start) // step
+            candles = self._fetch(symbol, currency, interval, limit, to_ts=to_ts)
+            # Before a coin was listed the API returns zero-filled candles.
+            listed = [c for c in candles if c.get('close') or c.get('open')]
+            self.upsert(symbol, currency, interval, listed)
+            if not candles or len(listed) < len(candles):
+                earliest = listed[0]['time'] if listed else end + step
+                self._set_sync_state(symbol, currency, interval, history_start=earliest)
+                return
+            end = candles[0]['time'] - step
+            to_ts = end
+
+    def get_candles(self, symbol, currency='USD', interval='day', lookback=30):
+        """
+        Returns the last `lookback` candles up to now (oldest first), syncing
+        only missing candles from CryptoCompare. If the upstream is
+        unavailable, whatever is stored locally is returned.
+        """
+        _, step = INTERVALS[interval]
+        try:
+            self.sync(symbol, currency, interval, lookback)
+        except requests.exceptions.RequestException as e:
+            print(f"Error syncing {symbol}/{currency} {interval} candles: {e}")
+        now_bucket = int(time.time()) // step * step
+        return self.read(symbol, currency, interval, since=now_bucket - lookback * step)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns the process-wide OHLCVStore, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = OHLCVStore()
+    return _store
@@ -0,0 +1,121 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", 16))
+
+# Shared by all requests; a stage that misses its deadline keeps running here
+# and fills the caches for the next page load.
+_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix='stage')
+
+
+class Stage:
+    """
+    One independent unit of work for run_stages.
+
+    Args:
+        name (str): Key of the stage's result.
+        func (callable): Called with no arguments, or with the result of
+            `depends_on` when that is set.
+        deadline (float): Seconds after the run starts by which the result
+            must be available; otherwise the fallback is used.
+        fallback: Value (or zero-argument callable producing it) used when the
+            stage times out or raises.
+        depends_on (str, optional): Name of a stage whose result this stage
+            needs; it is started as soon as that result arrives.
+    """
+
+    def __init__(self, name, func, deadline, fallback=None, depends_on=None):
+        self.name = name
+        self.func = func
+        self.deadline = deadline
+        self.fallback = fallback
+        self.depends_on = depends_on
+
+    def fallback_value(self):
+        return self.fallback() if callable(self.fallback) else self.fallback
+
+
+def submit(func, *args):
+    """
+    Runs func(*args) on the stage pool without waiting for it, in a copy of
+    the caller's context (so per-request stage timings follow the work).
+    """
+    return _executor.submit(contextvars.copy_context().run, func, *args)
+
+
+def _chain(parent, stage):
+    """Returns a Future that runs stage.func(parent_result) once parent is done."""
+    chained = Future()
+    context = contextvars.copy_context()
+
+    def start(done):
+        try:
+            arg = done.result()
+        except Exception as e:
+            chained.set_exception(e)
+            return
+        inner = _executor.submit(context.run, stage.func, arg)
+        inner.add_done_callback(lambda f: _copy_result(f, chained))
+
+    parent.add_done_callback(start)
+    return chained
+
+
+def _copy_result(source, target):
+    error = source.exception()
+    if error is not None:
+        target.set_exception(error)
+    else:
+        target.set_result(source.result())
+
+
+def run_stages(stages):
+    """
+    Runs stages concurrently, each bounded by its own deadline.
+
+    Returns:
+        tuple: (results, timings) where results maps stage name to its value
+               (or fallback) and timings maps stage name to
+               {'seconds': float, 'status': 'ok' | 'timeout' | 'error'}.
+    """
+    started = time.monotonic()
+    futures = {}
+    finished_at = {}
+    lock = threading.Lock()
+
+    def record(name):
+        def callback(_):
+            with lock:
+                finished_at[name] = time.monotonic() - started
+        return callback
+
+    for stage in stages:
+        if stage.depends_on is None:
+            futures[stage.name] = submit(stage.func)
+    for stage in stages:
+        if stage.depends_on is not None:
+            futures[stage.name] = _chain(futures[stage.depends_on], stage)
+    for stage in stages:
+        futures[stage.name].add_done_callback(record(stage.name))
+
+    results, timings = {}, {}
+    for stage in sorted(stages, key=lambda s: s.deadline):
+        remaining = max(0.0, started + stage.deadline - time.monotonic())
+        try:
+            results[stage.name] = futures[stage.name].result(timeout=remaining)
+            status = 'ok'
+        except TimeoutError:
+            print(f"Stage '{stage.name}' missed its {stage.deadline}s deadline, using fallback")
+            results[stage.name] = stage.fallback_value()
+            status = 'timeout'
+        except Exception as e:
+            print(f"Stage '{stage.name}' failed: {e}")
+            results[stage.name] = stage.fallback_value()
+            status = 'error'
+        with lock:
+            seconds = finished_at.get(stage.name, time.monotonic() - started)
+        timings[stage.name] = {'seconds': round(seconds, 4), 'status': status}
+    return results, timings
@@ -1,30 +1,570 @@
-def track_portfolio(transactions):
+import csv
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+TRANSACTION_TYPES = ('buy', 'sell', 'transfer_in', 'transfer_out', 'fee')
+BUY, SELL, TRANSFER_IN, TRANSFER_OUT, FEE = range(len(TRANSACTION_TYPES))
+_TYPE_CODES = {name: code for code, name in enumerate(TRANSACTION_TYPES)}
+
+COST_METHODS = ('fifo', 'average')
+CSV_FIELDS = ('timestamp', 'type', 'symbol', 'quantity', 'price', 'fee')
+
+# Remaining quantities below this are float dust and close the position.
+DUST = 1e-12
+
+_COLUMNS = (
+    ('timestamp', np.float64),
+    ('kind', np.int8),
+    ('symbol_id', np.int32),
+    ('quantity', np.float64),
+    ('price', np.float64),
+    ('fee', np.float64),
+)
+
+
+def parse_timestamp(value):
+    """
+    Parses epoch seconds or an ISO-8601 date/time (naive values are UTC).
+
+    Returns:
+        float: Epoch seconds.
+    """
+    if value is None or value == '':
+        return time.time()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_column(values, count, parse):
+    """Converts a column to float64, falling back to parse() per value."""
+    if values is None:
+        values = [None] * count
+    try:
+        parsed = np.asarray(values, dtype=np.float64)
+        if not np.isnan(parsed).any():
+            return parsed
+    except (TypeError, ValueError):
+        pass
+    # Empty cells, None (which numpy reads as nan) or ISO timestamps.
+    try:
+        return np.fromiter((parse(v) for v in values), dtype=np.float64, count=count)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid transaction value: {e}") from e
+
+
+def _grow(values, size, fill=0.0):
+    grown = np.full(size, fill)
+    grown[:len(values)] = values
+    return grown
+
+
+class Ledger:
+    """
+    Append-only transaction log stored as one numpy column per field.
+
+    Columns grow by doubling, so appending is amortised O(1) and the whole
+    history can be saved, loaded or sliced without per-row Python objects.
     """
-    (Placeholder) - This will eventually track portfolio holdings,
-    calculate performance, and manage transaction history.
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._data = {name: np.empty(capacity, dtype=dtype) for name, dtype in _COLUMNS}
+        self.symbols = []
+        self._symbol_ids = {}
+
+    def __len__(self):
+        return self._size
+
+    def symbol_id(self, symbol):
+        symbol = symbol.upper()
+        sid = self._symbol_ids.get(symbol)
+        if sid is None:
+            sid = len(self.symbols)
+            self._symbol_ids[symbol] = sid
+            self.symbols.append(symbol)
+        return sid
+
+    def column(self, name):
+        """Returns a read-only view of one column (e.g. 'quantity')."""
+        view = self._data[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._data['timestamp'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, values in self._data.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._data[name] = grown
+
+    def append(self, timestamp, kind, symbol_id, quantity, price, fee):
+        self._reserve(1)
+        i = self._size
+        self._data['timestamp'][i] = timestamp
+        self._data['kind'][i] = kind
+        self._data['symbol_id'][i] = symbol_id
+        self._data['quantity'][i] = quantity
+        self._data['price'][i] = price
+        self._data['fee'][i] = fee
+        self._size += 1
+
+    def extend(self, columns):
+        """Appends equal-length arrays keyed by column name."""
+        count = len(columns['timestamp'])
+        self._reserve(count)
+        for name, _ in _COLUMNS:
+            self._data[name][self._size:self._size + count] = columns[name]
+        self._size += count
+
+    def rows(self):
+        """Yields transactions as dicts, oldest first."""
+        kinds = self.column('kind')
+        sids = self.column('symbol_id')
+        for i in range(self._size):
+            yield {
+                'timestamp': float(self._data['timestamp'][i]),
+                'type': TRANSACTION_TYPES[kinds[i]],
+                'symbol': self.symbols[sids[i]],
+                'quantity': float(self._data['quantity'][i]),
+                'price': float(self._data['price'][i]),
+                'fee': float(self._data['fee'][i]),
+            }
+
+
+class Portfolio:
+    """
+    Transaction ledger with running positions and lot accounting.
+
+    Each transaction updates the affected position as it is added (FIFO lots
+    or average cost), so revaluing on a new price tick only touches the
+    current holdings and never replays the history.
 
     Args:
-        transactions (list): List of transactions (to be defined later).
+        method (str): 'fifo' or 'average' cost basis. Defaults to 'fifo'.
+        currency (str): Quote currency of prices and fees. Defaults to 'USD'.
+    """
+
+    def __init__(self, method='fifo', currency='USD'):
+        if method not in COST_METHODS:
+            raise ValueError(f"Unknown cost method '{method}', expected one of {COST_METHODS}")
+        self.method = method
+        self.currency = currency
+        self.ledger = Ledger()
+        # Per-symbol position state, indexed by ledger symbol id.
+        self._qty = np.zeros(0)
+        self._cost = np.zeros(0)
+        self._realized = np.zeros(0)
+        self._fees = np.zeros(0)
+        self._price = np.zeros(0)
+        self._lots = []  # symbol id -> deque of [quantity, unit_cost] (FIFO only)
+        self.prices_updated_at = None
+
+    def _symbol_id(self, symbol):
+        sid = self.ledger.symbol_id(symbol)
+        if sid >= len(self._qty):
+            size = max(8, 2 * len(self._qty), sid + 1)
+            self._qty = _grow(self._qty, size)
+            self._cost = _grow(self._cost, size)
+            self._realized = _grow(self._realized, size)
+            self._fees = _grow(self._fees, size)
+            self._price = _grow(self._price, size, fill=np.nan)
+        while len(self._lots) <= sid:
+            self._lots.append(deque())
+        return sid
+
+    def _remove_cost(self, sid, quantity):
+        """Takes quantity out of the position and returns the cost basis it carried."""
+        if self.method == 'average':
+            held = self._qty[sid]
+            return self._cost[sid] * (quantity / held) if held > 0 else 0.0
+        lots = self._lots[sid]
+        removed = 0.0
+        remaining = quantity
+        while remaining > DUST and lots:
+            lot = lots[0]
+            take = min(lot[0], remaining)
+            removed += take * lot[1]
+            lot[0] -= take
+            remaining -= take
+            if lot[0] <= DUST:
+                lots.popleft()
+        return removed
+
+    def _apply(self, kind, sid, quantity, price, fee):
+        if quantity < 0 or price < 0 or fee < 0:
+            raise ValueError("quantity, price and fee must not be negative")
+        if kind in (BUY, TRANSFER_IN):
+            cost = quantity * price + fee
+            self._qty[sid] += quantity
+            self._cost[sid] += cost
+            if self.method == 'fifo' and quantity > 0:
+                self._lots[sid].append([quantity, cost / quantity])
+        else:
+            held = self._qty[sid]
+            if quantity > held + DUST:
+                raise ValueError(
+                    f"Cannot {TRANSACTION_TYPES[kind]} {quantity} {self.ledger.symbols[sid]}: "
+                    f"only {held} held"
+                )
+            removed = self._remove_cost(sid, quantity)
+            if kind == SELL:
+                self._realized[sid] += quantity * price - fee - removed
+            elif kind == FEE:
+                # Coins paid as a fee are a disposal with no proceeds.
+                self._realized[sid] -= removed + fee
+            else:
+                # Transferred coins take their cost basis with them.
+                self._realized[sid] -= fee
+            remaining = held - quantity
+            if remaining <= DUST:
+                self._qty[sid] = 0.0
+                self._cost[sid] = 0.0
+                self._lots[sid].clear()
+            else:
+                self._qty[sid] = remaining
+                self._cost[sid] = max(self._cost[sid] - removed, 0.0)
+        self._fees[sid] += fee
+
+    def add(self, kind, symbol, quantity, price=0.0, fee=0.0, timestamp=None):
+        """
+        Records one transaction and updates its position.
+
+        Args:
+            kind (str): One of TRANSACTION_TYPES.
+            symbol (str): Asset symbol (e.g., 'BTC').
+            quantity (float): Units of the asset moved.
+            price (float): Unit price in the portfolio currency (the cost basis
+                for 'transfer_in').
+            fee (float): Fee in the portfolio currency.
+            timestamp: Epoch seconds or ISO date. Defaults to now.
+
+        Raises:
+            ValueError: If the type is unknown or more is disposed than held.
+        """
+        code = _TYPE_CODES.get(str(kind).lower())
+        if code is None:
+            raise ValueError(f"Unknown transaction type '{kind}', expected one of {TRANSACTION_TYPES}")
+        sid = self._symbol_id(symbol)
+        ts = parse_timestamp(timestamp)
+        quantity, price, fee = float(quantity), float(price or 0.0), float(fee or 0.0)
+        self._apply(code, sid, quantity, price, fee)
+        self.ledger.append(ts, code, sid, quantity, price, fee)
+
+    def import_columns(self, columns):
+        """
+        Bulk-imports transactions given as columns.
+
+        The columns are parsed with numpy, sorted by timestamp and applied in
+        one pass, then written to the ledger as a single block. If a
+        transaction is rejected (e.g. selling more than is held), the ones
+        before it in timestamp order are kept.
+
+        Args:
+            columns (dict): CSV_FIELDS name -> sequence of values (strings or
+                numbers). 'type', 'symbol' and 'quantity' are required.
+
+        Returns:
+            int: Number of transactions imported.
+        """
+        count = len(columns.get('type', ()))
+        if count == 0:
+            return 0
+        missing = [name for name in ('symbol', 'quantity') if name not in columns]
+        if missing:
+            raise ValueError(f"Missing transaction columns: {', '.join(missing)}")
+
+        types = np.char.lower(np.char.strip(np.asarray(columns['type'], dtype=str)))
+        names, inverse = np.unique(types, return_inverse=True)
+        unknown = [str(name) for name in names if name not in _TYPE_CODES]
+        if unknown:
+            raise ValueError(f"Unknown transaction type(s) {unknown}, expected one of {TRANSACTION_TYPES}")
+        kinds = np.array([_TYPE_CODES[name] for name in names], dtype=np.int8)[inverse]
+
+        symbols = np.char.upper(np.char.strip(np.asarray(columns['symbol'], dtype=str)))
+        names, inverse = np.unique(symbols, return_inverse=True)
+        sids = np.array([self._symbol_id(str(name)) for name in names], dtype=np.int32)[inverse]
+
+        timestamps = _parse_column(columns.get('timestamp'), count, parse_timestamp)
+        quantities = _parse_column(columns['quantity'], count, float)
+        prices = _parse_column(columns.get('price'), count, lambda v: float(v or 0.0))
+        fees = _parse_column(columns.get('fee'), count, lambda v: float(v or 0.0))
+
+        order = np.argsort(timestamps, kind='stable')
+        block = {
+            'timestamp': timestamps[order], 'kind': kinds[order], 'symbol_id': sids[order],
+            'quantity': quantities[order], 'price': prices[order], 'fee': fees[order],
+        }
+
+        # Lot accounting is inherently sequential; plain lists make the
+        # per-row updates much cheaper than numpy scalar indexing.
+        state = ('_qty', '_cost', '_realized', '_fees')
+        for name in state:
+            setattr(self, name, getattr(self, name).tolist())
+        applied = 0
+        try:
+            for code, sid, quantity, price, fee in zip(
+                    block['kind'].tolist(), block['symbol_id'].tolist(), block['quantity'].tolist(),
+                    block['price'].tolist(), block['fee'].tolist()):
+                self._apply(code, sid, quantity, price, fee)
+                applied += 1
+        except ValueError as e:
+            raise ValueError(f"Transaction {applied + 1} of the import (by timestamp) rejected: {e}") from e
+        finally:
+            for name in state:
+                setattr(self, name, np.array(getattr(self, name), dtype=np.float64))
+            if applied:
+                self.ledger.extend({name: values[:applied] for name, values in block.items()})
+        return applied
+
+    def import_rows(self, rows):
+        """
+        Bulk-imports transaction dicts with the CSV_FIELDS keys.
+
+        Returns:
+            int: Number of transactions imported.
+        """
+        rows = list(rows)
+        columns = {name: [row.get(name) for row in rows] for name in CSV_FIELDS
+                   if any(name in row for row in rows)}
+        return self.import_columns(columns)
+
+    def import_csv(self, path):
+        """
+        Bulk-imports a CSV file with a header of CSV_FIELDS
+        (timestamp,type,symbol,quantity,price,fee).
+
+        Returns:
+            int: Number of transactions imported.
+        """
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = [name.strip().lower() for name in next(reader, [])]
+            values = list(zip(*reader))
+        columns = {name: values[i] if values else () for i, name in enumerate(header)
+                   if name in CSV_FIELDS}
+        return self.import_columns(columns)
+
+    def update_prices(self, prices):
+        """
+        Records the latest prices for revaluation.
+
+        Args:
+            prices (dict): {symbol: price} or CryptoCompare pricemulti data
+                ({symbol: {currency: price}}).
+        """
+        for symbol, value in prices.items():
+            if isinstance(value, dict):
+                value = value.get(self.currency)
+            sid = self.ledger._symbol_ids.get(symbol.upper())
+            if sid is None or value is None:
+                continue
+            self._price[sid] = float(value)
+        self.prices_updated_at = time.time()
+
+    def summary(self, currency=None, rate=None):
+        """
+        Values the open positions at the latest prices.
+
+        Args:
+            currency (str, optional): Report currency. Defaults to the
+                portfolio currency.
+            rate (float, optional): Units of `currency` per unit of the
+                portfolio currency; required when `currency` differs. All
+                amounts, including cost basis and realized P&L, are
+                translated at this one (current) rate.
+
+        Returns:
+            dict: {'holdings': {symbol: {...}}, 'performance': {...}} with cost
+                  basis, market value and realized/unrealized P&L. Values of
+                  unpriced holdings are None and they are left out of totals;
+                  their cost is reported as 'unpriced_cost_basis'.
+        """
+        currency = currency or self.currency
+        if currency == self.currency:
+            rate = 1.0
+        elif rate is None:
+            raise ValueError(f"A {self.currency}/{currency} rate is needed to report in {currency}")
+        n = len(self.ledger.symbols)
+        open_ids = np.flatnonzero(self._qty[:n] > DUST)
+        qty = self._qty[open_ids]
+        cost = self._cost[open_ids] * rate
+        price = self._price[open_ids] * rate
+        value = qty * price
+        unrealized = value - cost
+        priced = ~np.isnan(price)
+        realized_by_id = self._realized[:n] * rate
+        fees_by_id = self._fees[:n] * rate
+
+        holdings = {}
+        for j, sid in enumerate(open_ids):
+            has_price = bool(priced[j])
+            holdings[self.ledger.symbols[sid]] = {
+                'quantity': float(qty[j]),
+                'cost_basis': round(float(cost[j]), 2),
+                'average_cost': float(cost[j] / qty[j]),
+                'price': float(price[j]) if has_price else None,
+                'market_value': round(float(value[j]), 2) if has_price else None,
+                'unrealized_pnl': round(float(unrealized[j]), 2) if has_price else None,
+                'unrealized_pct': round(float(unrealized[j] / cost[j] * 100), 2)
+                if has_price and cost[j] > 0 else None,
+                'realized_pnl': round(float(realized_by_id[sid]), 2),
+                'fees': round(float(fees_by_id[sid]), 2),
+            }
+
+        realized = float(realized_by_id.sum())
+        unrealized_total = float(unrealized[priced].sum())
+        return {
+            'holdings': holdings,
+            'performance': {
+                'currency': currency,
+                'method': self.method,
+                'cost_basis': round(float(cost[priced].sum()), 2),
+                'market_value': round(float(value[priced].sum()), 2),
+                'unrealized_pnl': round(unrealized_total, 2),
+                'realized_pnl': round(realized, 2),
+                'total_pnl': round(realized + unrealized_total, 2),
+                'fees': round(float(fees_by_id.sum()), 2),
+                'transactions': len(self.ledger),
+                'unpriced': [self.ledger.symbols[sid] for sid in open_ids[~priced]],
+                'unpriced_cost_basis': round(float(cost[~priced].sum()), 2),
+            },
+        }
+
+    def save(self, path):
+        """Saves the ledger and position state to a .npz file."""
+        n = len(self.ledger.symbols)
+        lot_ids, lot_qty, lot_cost = [], [], []
+        for sid, lots in enumerate(self._lots):
+            for quantity, unit_cost in lots:
+                lot_ids.append(sid)
+                lot_qty.append(quantity)
+                lot_cost.append(unit_cost)
+        np.savez(
+            path,
+            method=np.array(self.method),
+            currency=np.array(self.currency),
+            symbols=np.array(self.ledger.symbols, dtype=str),
+            qty=self._qty[:n], cost=self._cost[:n],
+            realized=self._realized[:n], fees=self._fees[:n],
+            lot_ids=np.array(lot_ids, dtype=np.int32),
+            lot_qty=np.array(lot_qty, dtype=np.float64),
+            lot_cost=np.array(lot_cost, dtype=np.float64),
+            **{f"col_{name}": self.ledger.column(name) for name, _ in _COLUMNS}
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Loads a portfolio written by save() without replaying its history."""
+        with np.load(path) as data:
+            portfolio = cls(method=str(data['method']), currency=str(data['currency']))
+            for symbol in data['symbols']:
+                portfolio._symbol_id(str(symbol))
+            n = len(portfolio.ledger.symbols)
+            portfolio._qty[:n] = data['qty']
+            portfolio._cost[:n] = data['cost']
+            portfolio._realized[:n] = data['realized']
+            portfolio._fees[:n] = data['fees']
+            for sid, quantity, unit_cost in zip(data['lot_ids'], data['lot_qty'], data['lot_cost']):
+                portfolio._lots[sid].append([float(quantity), float(unit_cost)])
+            portfolio.ledger.extend({name: data[f"col_{name}"] for name, _ in _COLUMNS})
+        return portfolio
+
+
+def load_portfolio(path, method='fifo', currency='USD'):
+    """
+    Loads a portfolio from a saved .npz snapshot or a transactions CSV.
 
     Returns:
-        dict: Portfolio summary (placeholder for now).
+        Portfolio: The loaded portfolio (empty if the file does not exist).
     """
-    portfolio_summary = {"holdings": {}, "performance": "N/A"} # Placeholder
-    # Add portfolio tracking logic here
-    return portfolio_summary
+    if not path or not os.path.exists(path):
+        return Portfolio(method=method, currency=currency)
+    if path.endswith('.npz'):
+        return Portfolio.load(path)
+    portfolio = Portfolio(method=method, currency=currency)
+    portfolio.import_csv(path)
+    return portfolio
+
+
+def track_portfolio(transactions, prices=None, method='fifo', currency='USD',
+                    report_currency=None, rate=None):
+    """
+    Tracks portfolio holdings and performance.
+
+    Args:
+        transactions (Portfolio | list): A Portfolio to revalue in place, or a
+            list of transaction dicts (timestamp, type, symbol, quantity,
+            price, fee) to build one from.
+        prices (dict, optional): Latest prices, {symbol: price} or
+            CryptoCompare pricemulti data.
+        method (str): Cost basis method when building from a list.
+        currency (str): Quote currency when building from a list.
+        report_currency (str, optional): Currency of the summary; see
+            Portfolio.summary for `rate`.
+
+    Returns:
+        dict: Portfolio summary with 'holdings' and 'performance'.
+    """
+    if isinstance(transactions, Portfolio):
+        portfolio = transactions
+    else:
+        portfolio = Portfolio(method=method, currency=currency)
+        portfolio.import_rows(transactions or [])
+    if prices:
+        portfolio.update_prices(prices)
+    return portfolio.summary(report_currency, rate)
+
 
 def display_portfolio_summary(summary):
     """
-    (Placeholder) - Displays a portfolio summary.
+    Displays a portfolio summary.
     """
     print("\nPortfolio Summary:")
-    print(f"Holdings: {summary.get('holdings')}")
-    print(f"Performance: {summary.get('performance')}")
+    holdings = summary.get('holdings') or {}
+    if not holdings:
+        print("Holdings: none")
+    for symbol, position in holdings.items():
+        value = position['market_value']
+        pnl = position['unrealized_pnl']
+        print(f"  {symbol}: {position['quantity']:.8g} @ avg {position['average_cost']:,.2f}"
+              f" | value {'n/a' if value is None else f'{value:,.2f}'}"
+              f" | unrealized {'n/a' if pnl is None else f'{pnl:+,.2f}'}")
+    performance = summary.get('performance')
+    if isinstance(performance, dict):
+        print(f"Performance ({performance['currency']}, {performance['method']}): "
+              f"value {performance['market_value']:,.2f}, cost {performance['cost_basis']:,.2f}, "
+              f"unrealized {performance['unrealized_pnl']:+,.2f}, "
+              f"realized {performance['realized_pnl']:+,.2f}, fees {performance['fees']:,.2f}")
+        if performance['unpriced']:
+            print(f"Unpriced (cost {performance['unpriced_cost_basis']:,.2f}, not in totals): "
+                  f"{', '.join(performance['unpriced'])}")
+    else:
+        print(f"Performance: {performance}")
 
 
 if __name__ == '__main__':
-    # Example usage (placeholder transactions):
-    example_transactions = [] # To be defined with transaction details later
+    example_transactions = [
+        {'timestamp': '2024-01-02', 'type': 'buy', 'symbol': 'BTC', 'quantity': 0.5, 'price': 42000, 'fee': 10},
+        {'timestamp': '2024-02-10', 'type': 'buy', 'symbol': 'BTC', 'quantity': 0.25, 'price': 47000, 'fee': 5},
+        {'timestamp': '2024-03-05', 'type': 'sell', 'symbol': 'BTC', 'quantity': 0.3, 'price': 65000, 'fee': 8},
+        {'timestamp': '2024-03-06', 'type': 'transfer_in', 'symbol': 'ETH', 'quantity': 2, 'price': 3000},
+        {'timestamp': '2024-03-07', 'type': 'fee', 'symbol': 'ETH', 'quantity': 0.01},
+    ]
 
-    portfolio_sum = track_portfolio(example_transactions)
-    display_portfolio_summary(portfolio_sum)
\ No newline at end of file
+    portfolio_sum = track_portfolio(example_transactions, {'BTC': 60000, 'ETH': 3200})
+    display_portfolio_summary(portfolio_sum)
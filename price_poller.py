@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+
+import cryptocompare_client
+from cryptocompare_api import chunk_symbols
+
+load_dotenv()
+
+# Most symbols watched on request on top of the configured ones; each one
+# makes every refresh larger.
+WATCH_MAX_SYMBOLS = int(os.getenv("WATCH_MAX_SYMBOLS", 50))
+# Requested symbols are dropped after this many poll intervals without a request
+WATCH_IDLE_INTERVALS = int(os.getenv("WATCH_IDLE_INTERVALS", 10))
+
+
+class SnapshotStore:
+    """
+    Thread-safe in-process store of the latest pricemultifull RAW data.
+
+    Each symbol keeps the time it was last refreshed, so readers can report
+    how old the data they serve is.
+    """
+
+    def __init__(self):
+        self._prices = {}  # symbol -> (data, updated_at)
+        self._lock = threading.Lock()
+        self.last_refresh = None
+        self.last_error = None
+
+    def put(self, symbol, data, updated_at=None):
+        with self._lock:
+            self._prices[symbol] = (data, updated_at or time.time())
+
+    def update(self, prices, updated_at=None):
+        updated_at = updated_at or time.time()
+        with self._lock:
+            for symbol, data in prices.items():
+                self._prices[symbol] = (data, updated_at)
+            self.last_refresh = updated_at
+            self.last_error = None
+
+    def merge(self, prices, updated_at=None):
+        """Merges partial ticker fields (e.g. from the price stream) into the stored data."""
+        updated_at = updated_at or time.time()
+        with self._lock:
+            for symbol, fields in prices.items():
+                data, _ = self._prices.get(symbol, ({}, None))
+                self._prices[symbol] = (dict(data, **fields), updated_at)
+
+    def get(self, symbol):
+        """Returns (data, updated_at) for the symbol, or (None, None)."""
+        with self._lock:
+            return self._prices.get(symbol, (None, None))
+
+    def age(self, symbol):
+        _, updated_at = self.get(symbol)
+        return None if updated_at is None else time.time() - updated_at
+
+    def snapshot(self, symbols=None):
+        """
+        Returns the stored prices with staleness metadata.
+
+        Args:
+            symbols (list, optional): Restrict to these symbols.
+
+        Returns:
+            dict: {'prices': {symbol: data}, 'updated_at': {symbol: ts},
+                   'age_seconds': {symbol: age}, 'last_refresh', 'last_error'}
+        """
+        now = time.time()
+        with self._lock:
+            items = self._prices.items() if symbols is None else \
+                [(s, self._prices[s]) for s in symbols if s in self._prices]
+            return {
+                'prices': {s: data for s, (data, _) in items},
+                'updated_at': {s: ts for s, (_, ts) in items},
+                'age_seconds': {s: round(now - ts, 1) for s, (_, ts) in items},
+                'last_refresh': self.last_refresh,
+                'last_error': self.last_error,
+            }
+
+
+class WatchSet:
+    """
+    Symbols kept up to date in the background: the pinned ones for good, and
+    ones added on request until nobody has asked for them for `idle_ttl`
+    seconds.
+
+    Args:
+        pinned (iterable): Symbols that are always watched.
+        allow (callable, optional): allow(symbol) -> bool; requested symbols
+            it rejects are not watched.
+        max_symbols (int): Most requested symbols watched at once.
+        idle_ttl (float): Seconds without a request before a symbol is dropped.
+    """
+
+    def __init__(self, pinned=(), allow=None, max_symbols=WATCH_MAX_SYMBOLS, idle_ttl=300):
+        self.pinned = set(s.upper() for s in pinned)
+        self.allow = allow
+        self.max_symbols = max_symbols
+        self.idle_ttl = idle_ttl
+        self.rejected = 0
+        self._requested = {}  # symbol -> last requested at
+        self._lock = threading.Lock()
+
+    def __contains__(self, symbol):
+        with self._lock:
+            return symbol in self.pinned or symbol in self._requested
+
+    def __len__(self):
+        with self._lock:
+            return len(self.pinned | self._requested.keys())
+
+    @property
+    def symbols(self):
+        with self._lock:
+            return sorted(self.pinned | self._requested.keys())
+
+    def touch(self, symbol):
+        """
+        Records a request for the symbol.
+
+        Returns:
+            tuple: (watched, added); added is True only when the symbol was
+                   not watched before.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            if symbol in self.pinned:
+                return True, False
+            if symbol in self._requested:
+                self._requested[symbol] = time.time()
+                return True, False
+        if self.allow is not None and not self.allow(symbol):
+            with self._lock:
+                self.rejected += 1
+            return False, False
+        with self._lock:
+            if symbol in self._requested:
+                return True, False
+            if len(self._requested) >= self.max_symbols:
+                self.rejected += 1
+                return False, False
+            self._requested[symbol] = time.time()
+        return True, True
+
+    def discard(self, symbol):
+        """Stops watching a symbol, pinned or requested; returns whether it was watched."""
+        symbol = symbol.upper()
+        with self._lock:
+            watched = symbol in self.pinned or symbol in self._requested
+            self.pinned.discard(symbol)
+            self._requested.pop(symbol, None)
+        return watched
+
+    def expire(self, now=None):
+        """Drops requested symbols idle for longer than idle_ttl; returns them."""
+        cutoff = (now or time.time()) - self.idle_ttl
+        with self._lock:
+            idle = [s for s, requested_at in self._requested.items() if requested_at < cutoff]
+            for symbol in idle:
+                del self._requested[symbol]
+        return idle
+
+
+class PricePoller:
+    """
+    Background thread that refreshes a SnapshotStore with one batched
+    pricemultifull call per chunk of watched symbols every `interval` seconds.
+
+    Args:
+        store (SnapshotStore): Store to write into.
+        symbols (iterable): Symbols that are always watched.
+        interval (float): Seconds between refreshes. Defaults to 30.
+        currency (str): Quote currency. Defaults to 'USD'.
+        on_update (callable, optional): Called with the refreshed
+            {symbol: data} mapping after each successful refresh.
+        allow (callable, optional): allow(symbol) -> bool for symbols added
+            by watch(); see WatchSet.
+        max_symbols (int): Most symbols watched on request.
+        idle_intervals (int): Intervals without a watch() call before a
+            requested symbol is dropped.
+    """
+
+    def __init__(self, store, symbols=(), interval=30, currency='USD', on_update=None,
+                 allow=None, max_symbols=WATCH_MAX_SYMBOLS, idle_intervals=WATCH_IDLE_INTERVALS):
+        self.store = store
+        self.on_update = on_update
+        self.interval = interval
+        self.currency = currency
+        self.watching = WatchSet(symbols, allow, max_symbols, idle_ttl=interval * idle_intervals)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def symbols(self):
+        return self.watching.symbols
+
+    def watch(self, symbol):
+        """
+        Keeps a requested symbol refreshed; new symbols trigger an early
+        refresh. Returns False when the symbol is not allowed or the watched
+        set is full.
+        """
+        watched, added = self.watching.touch(symbol)
+        if added:
+            self._wake.set()
+        return watched
+
+    def is_stale(self, symbol):
+        age = self.store.age(symbol)
+        return age is None or age > self.interval * 3
+
+    def refresh(self):
+        """Fetches all watched symbols now and writes them into the store."""
+        self.watching.expire()
+        symbols = self.symbols
+        if not symbols:
+            return
+        prices = {}
+        error = None
+        for chunk in chunk_symbols(symbols):
+            try:
+                data = cryptocompare_client.get('/data/pricemultifull',
+                                                fsyms=','.join(chunk), tsyms=self.currency)
+            except requests.exceptions.RequestException as e:
+                print(f"Price poller error: {e}")
+                error = str(e)
+                continue
+            for symbol, quotes in data.get('RAW', {}).items():
+                if self.currency in quotes:
+                    prices[symbol] = quotes[self.currency]
+        if prices:
+            self.store.update(prices)
+            if self.on_update is not None:
+                self.on_update(prices)
+        if error:
+            self.store.last_error = error
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        """Starts the polling thread if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='price-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,359 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import websocket_lite
+from price_poller import WATCH_MAX_SYMBOLS, WatchSet
+
+load_dotenv()
+
+CRYPTOCARE_API_KEY = os.getenv("CRYPTOCARE_API_KEY")
+# Point at a replay server (see replay_server.py) to run without the upstream.
+PRICE_STREAM_URL = os.getenv("PRICE_STREAM_URL", "wss://streamer.cryptocompare.com/v2")
+PRICE_STREAM_EXCHANGE = os.getenv("PRICE_STREAM_EXCHANGE", "CCCAGG")
+# Ticker updates are coalesced and handed on at most this often.
+PRICE_STREAM_PUBLISH_INTERVAL = float(os.getenv("PRICE_STREAM_PUBLISH_INTERVAL", 0.5))
+# Optional JSONL file the raw upstream messages are appended to, for replay.
+PRICE_STREAM_RECORD = os.getenv("PRICE_STREAM_RECORD")
+# The streamer sends a heartbeat about every 30s; silence longer than this
+# means the connection is dead.
+READ_TIMEOUT = float(os.getenv("PRICE_STREAM_READ_TIMEOUT", 45))
+RECONNECT_BASE = 1.0
+RECONNECT_MAX = 60.0
+# Symbols subscribed on request are removed after this long without a request
+PRICE_STREAM_IDLE_SECONDS = float(os.getenv("PRICE_STREAM_IDLE_SECONDS", 300))
+
+# Streamer message types
+TYPE_TRADE = '0'
+TYPE_AGGREGATE = '5'
+TYPE_SUBSCRIBE_COMPLETE = '16'
+TYPE_WELCOME = '20'
+TYPE_HEARTBEAT = '999'
+ERROR_TYPES = {'401', '429', '500'}
+
+# Aggregate fields that are not part of the ticker itself.
+_ENVELOPE_FIELDS = {'TYPE', 'MARKET', 'FROMSYMBOL', 'TOSYMBOL', 'FLAGS'}
+# Aggregate fields the book does arithmetic on.
+_NUMERIC_FIELDS = ('PRICE', 'OPEN24HOUR')
+
+
+def aggregate_sub(symbol, currency='USD', exchange=PRICE_STREAM_EXCHANGE):
+    """Returns the streamer subscription id, e.g. '5~CCCAGG~BTC~USD'."""
+    return f"{TYPE_AGGREGATE}~{exchange}~{symbol.upper()}~{currency.upper()}"
+
+
+class TickerBook:
+    """
+    Latest ticker and last trade per symbol, built from streamer messages.
+
+    Aggregate messages only carry the fields that changed, so each one is
+    merged into the stored ticker. Field names match pricemultifull RAW data
+    (PRICE, HIGH24HOUR, LOW24HOUR, ...), so tickers can be merged straight
+    into a SnapshotStore.
+
+    Args:
+        currency (str): Quote currency kept in the book. Defaults to 'USD'.
+    """
+
+    def __init__(self, currency='USD'):
+        self.currency = currency.upper()
+        self._tickers = {}
+        self._trades = {}
+        self._lock = threading.Lock()
+
+    def apply(self, message):
+        """
+        Applies one decoded streamer message.
+
+        Returns:
+            str: The symbol whose ticker changed, or None.
+
+        Raises:
+            ValueError: For an aggregate with a non-numeric price field; the
+                stored ticker is left unchanged.
+        """
+        kind = str(message.get('TYPE'))
+        if kind == TYPE_AGGREGATE:
+            symbol = message.get('FROMSYMBOL')
+            if not symbol or message.get('TOSYMBOL', self.currency) != self.currency:
+                return None
+            fields = {k: v for k, v in message.items() if k not in _ENVELOPE_FIELDS}
+            for name in _NUMERIC_FIELDS:
+                value = fields.get(name)
+                if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                    raise ValueError(f"Non-numeric {name} for {symbol}: {value!r}")
+            with self._lock:
+                ticker = self._tickers.setdefault(symbol, {'FROMSYMBOL': symbol,
+                                                           'TOSYMBOL': self.currency})
+                ticker.update(fields)
+                price, open_24h = ticker.get('PRICE'), ticker.get('OPEN24HOUR')
+                if price is not None and open_24h:
+                    ticker['CHANGE24HOUR'] = price - open_24h
+                    ticker['CHANGEPCT24HOUR'] = (price - open_24h) / open_24h * 100
+                ticker['RECEIVED_AT'] = time.time()
+            return symbol
+        if kind == TYPE_TRADE:
+            symbol = message.get('FSYM')
+            if not symbol or message.get('TSYM', self.currency) != self.currency:
+                return None
+            flags = message.get('F', 0)
+            side = 'buy' if str(flags) == '1' else 'sell' if str(flags) == '2' else 'unknown'
+            with self._lock:
+                self._trades[symbol] = {
+                    'price': message.get('P'), 'quantity': message.get('Q'),
+                    'market': message.get('M'), 'time': message.get('TS'), 'side': side,
+                }
+            return None
+        return None
+
+    def get(self, symbol):
+        with self._lock:
+            ticker = self._tickers.get(symbol.upper())
+            return dict(ticker) if ticker is not None else None
+
+    def last_trade(self, symbol):
+        with self._lock:
+            trade = self._trades.get(symbol.upper())
+            return dict(trade) if trade is not None else None
+
+    def snapshot(self, symbols=None):
+        """Returns {symbol: ticker} for the given symbols (default: all)."""
+        with self._lock:
+            keys = self._tickers.keys() if symbols is None else \
+                [s.upper() for s in symbols if s.upper() in self._tickers]
+            return {s: dict(self._tickers[s]) for s in keys}
+
+    def prices(self, symbols=None):
+        """Returns pricemulti-shaped {symbol: {currency: price}} data."""
+        return {symbol: {self.currency: ticker['PRICE']}
+                for symbol, ticker in self.snapshot(symbols).items() if 'PRICE' in ticker}
+
+
+class PriceStream:
+    """
+    One upstream WebSocket subscription for a set of symbols, feeding a
+    TickerBook and handing coalesced updates to `on_update`.
+
+    However many dashboards are open, the process holds a single upstream
+    connection; consumers read the book or subscribe through `on_update`
+    (app.py fans it out over the event bus).
+
+    Args:
+        symbols (iterable): Symbols to subscribe to.
+        currency (str): Quote currency. Defaults to 'USD'.
+        url (str): Streamer URL. Defaults to PRICE_STREAM_URL.
+        api_key (str, optional): Appended as ?api_key= when set.
+        on_update (callable, optional): Called with {symbol: ticker} for the
+            symbols that changed, at most every `publish_interval` seconds.
+        publish_interval (float): Coalescing window for on_update.
+        record_path (str, optional): JSONL file to append raw messages to.
+        allow (callable, optional): allow(symbol) -> bool for symbols added
+            by watch(); see price_poller.WatchSet.
+        max_symbols (int): Most symbols subscribed on request.
+        idle_ttl (float): Seconds without a watch() call before a requested
+            symbol is unsubscribed.
+    """
+
+    def __init__(self, symbols=(), currency='USD', url=PRICE_STREAM_URL,
+                 api_key=CRYPTOCARE_API_KEY, exchange=PRICE_STREAM_EXCHANGE,
+                 on_update=None, publish_interval=PRICE_STREAM_PUBLISH_INTERVAL,
+                 record_path=PRICE_STREAM_RECORD, allow=None, max_symbols=WATCH_MAX_SYMBOLS,
+                 idle_ttl=PRICE_STREAM_IDLE_SECONDS):
+        self.currency = currency.upper()
+        self.url = url
+        self.api_key = api_key
+        self.exchange = exchange
+        self.on_update = on_update
+        self.publish_interval = publish_interval
+        self.record_path = record_path
+        self.book = TickerBook(currency)
+        self.watching = WatchSet(symbols, allow, max_symbols, idle_ttl)
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._conn = None
+        self._threads = []
+        self._record_file = None
+        self._stats = {'connects': 0, 'messages': 0, 'errors': 0,
+                       'connected': False, 'last_message_at': None, 'last_error': None}
+
+    @property
+    def symbols(self):
+        return self.watching.symbols
+
+    def _connect_url(self):
+        if not self.api_key:
+            return self.url
+        separator = '&' if '?' in self.url else '?'
+        return f"{self.url}{separator}api_key={self.api_key}"
+
+    def _send_subs(self, action, symbols):
+        conn = self._conn
+        if conn is None or not symbols:
+            return
+        subs = [aggregate_sub(s, self.currency, self.exchange) for s in symbols]
+        try:
+            conn.send(json.dumps({'action': action, 'subs': subs}))
+        except OSError as e:
+            print(f"Price stream {action} failed: {e}")
+
+    def watch(self, symbol):
+        """
+        Keeps a requested symbol subscribed, adding it on the live connection
+        if it is new. Returns False when the symbol is not allowed or the
+        watched set is full.
+        """
+        watched, added = self.watching.touch(symbol)
+        if added:
+            self._send_subs('SubAdd', [symbol.upper()])
+        return watched
+
+    def unwatch(self, symbol):
+        if self.watching.discard(symbol):
+            self._send_subs('SubRemove', [symbol.upper()])
+
+    def expire_idle(self):
+        """Unsubscribes requested symbols nobody has asked for within idle_ttl."""
+        idle = self.watching.expire()
+        self._send_subs('SubRemove', idle)
+        return idle
+
+    def _message_error(self, error):
+        print(f"Price stream skipped a message: {error}")
+        with self._lock:
+            self._stats['errors'] += 1
+            self._stats['last_error'] = str(error)
+
+    def handle_message(self, raw):
+        """
+        Decodes and applies one raw message; returns the decoded dict, or
+        None when the message was malformed and skipped.
+        """
+        try:
+            message = json.loads(raw)
+        except ValueError as e:
+            self._message_error(f"invalid JSON ({e})")
+            return None
+        if not isinstance(message, dict):
+            self._message_error(f"expected an object, got {type(message).__name__}")
+            return None
+        with self._lock:
+            self._stats['messages'] += 1
+            self._stats['last_message_at'] = time.time()
+        if self._record_file is not None:
+            self._record_file.write(json.dumps({'t': time.time(), 'msg': message}) + '\n')
+        kind = str(message.get('TYPE'))
+        if kind in ERROR_TYPES:
+            print(f"Price stream error {kind}: {message.get('MESSAGE')} {message.get('INFO', '')}")
+            with self._lock:
+                self._stats['errors'] += 1
+                self._stats['last_error'] = message.get('MESSAGE')
+            return message
+        try:
+            symbol = self.book.apply(message)
+        except Exception as e:
+            # One bad message must not take the connection thread down.
+            self._message_error(e)
+            return None
+        if symbol is not None:
+            with self._lock:
+                self._dirty.add(symbol)
+        return message
+
+    def _run_connection(self):
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                conn = websocket_lite.connect(self._connect_url(), timeout=READ_TIMEOUT)
+            except (OSError, ValueError) as e:
+                attempt += 1
+                # Full jitter so restarted processes do not reconnect in lockstep.
+                delay = random.uniform(0, min(RECONNECT_MAX, RECONNECT_BASE * 2 ** attempt))
+                print(f"Price stream connect failed ({e}), retrying in {delay:.1f}s")
+                with self._lock:
+                    self._stats['last_error'] = str(e)
+                self._stop.wait(delay)
+                continue
+
+            attempt = 0
+            self._conn = conn
+            with self._lock:
+                self._stats['connects'] += 1
+                self._stats['connected'] = True
+            self._send_subs('SubAdd', self.symbols)
+            try:
+                while not self._stop.is_set():
+                    raw = conn.recv()
+                    if isinstance(raw, str):
+                        self.handle_message(raw)
+            except (OSError, socket.timeout, ValueError) as e:
+                if not self._stop.is_set():
+                    print(f"Price stream disconnected: {e}")
+                    with self._lock:
+                        self._stats['last_error'] = str(e)
+            finally:
+                self._conn = None
+                with self._lock:
+                    self._stats['connected'] = False
+                conn.close()
+
+    def _run_publisher(self):
+        while not self._stop.wait(self.publish_interval):
+            self.flush()
+            self.expire_idle()
+
+    def flush(self):
+        """Hands the tickers changed since the last flush to on_update."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty or self.on_update is None:
+            return
+        try:
+            self.on_update(self.book.snapshot(dirty))
+        except Exception as e:
+            print(f"Price stream update handler failed: {e}")
+
+    def start(self):
+        """
+        Starts the connection and publisher threads, restarting either one
+        that has died; threads still running are left alone.
+        """
+        targets = [(self._run_connection, 'price-stream'),
+                   (self._run_publisher, 'price-stream-publish')]
+        with self._lock:
+            threads = self._threads or [None] * len(targets)
+            dead = [i for i, thread in enumerate(threads) if thread is None or not thread.is_alive()]
+            if not dead:
+                return
+            self._stop.clear()
+            if self.record_path and self._record_file is None:
+                self._record_file = open(self.record_path, 'a', buffering=1)
+            for i in dead:
+                target, name = targets[i]
+                threads[i] = threading.Thread(target=target, name=name, daemon=True)
+            self._threads = threads
+        for i in dead:
+            threads[i].start()
+
+    def stop(self):
+        self._stop.set()
+        conn = self._conn
+        if conn is not None:
+            conn.close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['symbols'] = len(self.watching)
+        stats['rejected'] = self.watching.rejected
+        return stats
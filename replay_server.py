@@ -0,0 +1,225 @@
+"""
+Local stand-in for the CryptoCompare streamer that replays recorded ticks.
+
+Record ticks by running the app (or main.py) with PRICE_STREAM_RECORD=ticks.jsonl,
+then serve them and point PRICE_STREAM_URL at the printed URL:
+
+    python replay_server.py ticks.jsonl --port 8765 --speed 10 --loop
+    PRICE_STREAM_URL=ws://127.0.0.1:8765/v2 PRICE_SOURCE=stream python app.py
+
+Without a recording, --synthetic generates random-walk ticks.
+"""
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+
+import websocket_lite
+from price_stream import TYPE_AGGREGATE, TYPE_HEARTBEAT, TYPE_SUBSCRIBE_COMPLETE, TYPE_WELCOME
+
+HEARTBEAT_SECONDS = 30
+
+
+def load_ticks(path):
+    """
+    Loads recorded ticks from JSONL: either {'t': epoch, 'msg': {...}} lines
+    (as written by PRICE_STREAM_RECORD) or bare message dicts.
+
+    Returns:
+        list: [(offset_seconds, message)] relative to the first tick.
+    """
+    ticks = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if 'msg' in entry:
+                ticks.append((float(entry.get('t', 0)), entry['msg']))
+            else:
+                ticks.append((float(entry.get('LASTUPDATE', 0)), entry))
+    if not ticks:
+        return []
+    start = ticks[0][0]
+    return [(max(0.0, t - start), message) for t, message in ticks]
+
+
+def synthetic_ticks(symbols, count, interval=0.1, currency='USD', seed=1):
+    """Generates random-walk aggregate ticks for the given symbols."""
+    rng = random.Random(seed)
+    prices = {symbol: rng.uniform(1, 60000) for symbol in symbols}
+    opens = dict(prices)
+    ticks = []
+    for i in range(count):
+        symbol = symbols[i % len(symbols)]
+        prices[symbol] *= 1 + rng.gauss(0, 0.0008)
+        ticks.append((i * interval, {
+            'TYPE': TYPE_AGGREGATE, 'MARKET': 'CCCAGG', 'FROMSYMBOL': symbol,
+            'TOSYMBOL': currency, 'FLAGS': 1 if rng.random() < 0.5 else 2,
+            'PRICE': round(prices[symbol], 6), 'OPEN24HOUR': round(opens[symbol], 6),
+            'LASTUPDATE': int(time.time()) + int(i * interval),
+            'LASTVOLUME': round(rng.uniform(0.001, 2), 6),
+        }))
+    return ticks
+
+
+def _subscription_key(message):
+    """Returns the (type, from, to) a message belongs to, or None."""
+    kind = str(message.get('TYPE'))
+    if kind == TYPE_AGGREGATE:
+        return kind, message.get('FROMSYMBOL'), message.get('TOSYMBOL')
+    if kind == '0':
+        return kind, message.get('FSYM'), message.get('TSYM')
+    return None
+
+
+class ReplayServer:
+    """
+    Serves ticks to every connected client at recorded pace (divided by
+    `speed`), sending each client only the symbols it subscribed to.
+
+    Args:
+        ticks (list): [(offset_seconds, message)] as from load_ticks.
+        host (str): Bind address. Defaults to '127.0.0.1'.
+        port (int): Bind port; 0 picks a free one. Defaults to 0.
+        speed (float): Replay speed multiplier; 0 sends as fast as possible.
+        loop (bool): Restart from the beginning when the ticks run out.
+    """
+
+    def __init__(self, ticks, host='127.0.0.1', port=0, speed=1.0, loop=False):
+        self.ticks = ticks
+        self.speed = speed
+        self.loop = loop
+        self._server = socket.create_server((host, port))
+        self.host, self.port = self._server.getsockname()[:2]
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.messages_sent = 0
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/v2"
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name='replay-accept', daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self._stop.set()
+        try:
+            self._server.close()
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(sock,), name='replay-client',
+                             daemon=True).start()
+
+    def _serve(self, sock):
+        try:
+            conn, _ = websocket_lite.accept(sock)
+        except (OSError, websocket_lite.HandshakeError) as e:
+            print(f"Replay handshake failed: {e}")
+            sock.close()
+            return
+        with self._lock:
+            self.connections += 1
+        subs = set()
+        subs_lock = threading.Lock()
+        subscribed = threading.Event()
+
+        def read_commands():
+            try:
+                while True:
+                    command = json.loads(conn.recv())
+                    keys = {tuple(sub.split('~')[i] for i in (0, 2, 3))
+                            for sub in command.get('subs', [])}
+                    with subs_lock:
+                        if command.get('action') == 'SubAdd':
+                            subs.update(keys)
+                        elif command.get('action') == 'SubRemove':
+                            subs.difference_update(keys)
+                    conn.send(json.dumps({'TYPE': TYPE_SUBSCRIBE_COMPLETE,
+                                          'MESSAGE': 'SUBSCRIBECOMPLETE'}))
+                    subscribed.set()
+            except (OSError, ValueError):
+                subscribed.set()
+
+        try:
+            conn.send(json.dumps({'TYPE': TYPE_WELCOME, 'MESSAGE': 'STREAMERWELCOME'}))
+            threading.Thread(target=read_commands, name='replay-commands', daemon=True).start()
+            subscribed.wait(5)
+            self._replay(conn, subs, subs_lock)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def _replay(self, conn, subs, subs_lock):
+        last_heartbeat = time.monotonic()
+        while not self._stop.is_set() and not conn.closed:
+            started = time.monotonic()
+            for offset, message in self.ticks:
+                if self._stop.is_set() or conn.closed:
+                    return
+                if self.speed:
+                    delay = started + offset / self.speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                if time.monotonic() - last_heartbeat >= HEARTBEAT_SECONDS:
+                    conn.send(json.dumps({'TYPE': TYPE_HEARTBEAT, 'MESSAGE': 'HEARTBEAT'}))
+                    last_heartbeat = time.monotonic()
+                key = _subscription_key(message)
+                with subs_lock:
+                    wanted = key is None or key in subs
+                if wanted:
+                    conn.send(json.dumps(message))
+                    with self._lock:
+                        self.messages_sent += 1
+            if not self.loop:
+                break
+        # Keep the connection open (with heartbeats) after the replay ends.
+        while not self._stop.wait(HEARTBEAT_SECONDS) and not conn.closed:
+            conn.send(json.dumps({'TYPE': TYPE_HEARTBEAT, 'MESSAGE': 'HEARTBEAT'}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', nargs='?', help='recorded ticks (JSONL)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='replay speed multiplier (0 = as fast as possible)')
+    parser.add_argument('--loop', action='store_true')
+    parser.add_argument('--synthetic', default=None,
+                        help='comma-separated symbols to generate ticks for instead of a file')
+    parser.add_argument('--count', type=int, default=10000, help='synthetic tick count')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        ticks = synthetic_ticks([s.strip().upper() for s in args.synthetic.split(',')], args.count)
+    elif args.path:
+        ticks = load_ticks(args.path)
+    else:
+        parser.error('pass a recording path or --synthetic SYMBOLS')
+
+    server = ReplayServer(ticks, args.host, args.port, args.speed, args.loop)
+    print(f"Replaying {len(ticks)} ticks on {server.start()}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
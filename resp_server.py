@@ -0,0 +1,184 @@
+"""
+Local stand-in for Redis implementing the few RESP commands the 'redis'
+cache backend uses (PING, GET, SET with NX/XX/PX/EX, DEL, DELIFEQ, KEYS,
+DBSIZE, FLUSHDB), so several app workers can share a cache without a Redis
+install:
+
+    python resp_server.py --port 6379
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6379/0 CACHE_SECRET=... gunicorn -w 8 app:app
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class RespStore:
+    """Thread-safe bytes key/value store with millisecond expiry."""
+
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        name = args[0].decode().upper()
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise ValueError(f"ERR unknown command '{name}'")
+        with self._lock:
+            return handler(args[1:], time.time())
+
+    def cmd_ping(self, args, now):
+        return args[0] if args else 'PONG'
+
+    def cmd_select(self, args, now):
+        return 'OK'
+
+    def cmd_get(self, args, now):
+        entry = self._live(args[0], now)
+        return entry[0] if entry else None
+
+    def cmd_set(self, args, now):
+        key, value = args[0], args[1]
+        options = [arg.decode().upper() for arg in args[2:]]
+        expires_at = None
+        i = 0
+        while i < len(options):
+            if options[i] in ('PX', 'EX'):
+                amount = float(options[i + 1])
+                expires_at = now + (amount / 1000 if options[i] == 'PX' else amount)
+                i += 1
+            i += 1
+        exists = self._live(key, now) is not None
+        if ('NX' in options and exists) or ('XX' in options and not exists):
+            return None
+        self._data[key] = (value, expires_at)
+        return 'OK'
+
+    def cmd_del(self, args, now):
+        removed = 0
+        for key in args:
+            if self._live(key, now) is not None:
+                del self._data[key]
+                removed += 1
+        return removed
+
+    def cmd_delifeq(self, args, now):
+        """DELIFEQ key value: deletes the key only if it holds value (lock release)."""
+        entry = self._live(args[0], now)
+        if entry is None or entry[0] != args[1]:
+            return 0
+        del self._data[args[0]]
+        return 1
+
+    def cmd_keys(self, args, now):
+        pattern = args[0].decode()
+        return [key for key in list(self._data)
+                if self._live(key, now) is not None
+                and fnmatch.fnmatchcase(key.decode(errors='replace'), pattern)]
+
+    def cmd_dbsize(self, args, now):
+        return sum(1 for key in list(self._data) if self._live(key, now) is not None)
+
+    def cmd_flushdb(self, args, now):
+        self._data.clear()
+        return 'OK'
+
+
+def encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b''.join(encode_reply(item) for item in value)
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def read_command(reader):
+    """Reads one RESP array-of-bulk-strings command, or None at EOF."""
+    line = reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split()  # inline command, e.g. from telnet
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int(reader.readline()[1:-2])
+        args.append(reader.read(length + 2)[:-2])
+    return args
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """
+    Serves one RespStore to any number of clients.
+
+    Args:
+        host (str): Bind address. Defaults to '127.0.0.1'.
+        port (int): Bind port; 0 picks a free one. Defaults to 6379.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=6379):
+        self.store = RespStore()
+        store = self.store
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        args = read_command(self.rfile)
+                    except (OSError, ValueError):
+                        return
+                    if args is None:
+                        return
+                    if not args:
+                        continue
+                    try:
+                        reply = encode_reply(store.execute(args))
+                    except Exception as e:
+                        message = str(e) if str(e).startswith('ERR') else f"ERR {e}"
+                        reply = f"-{message}\r\n".encode()
+                    self.wfile.write(reply)
+
+        super().__init__((host, port), Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='resp-server', daemon=True).start()
+        return self.url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+
+    server = RespServer(args.host, args.port)
+    print(f"Serving RESP on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
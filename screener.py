@@ -0,0 +1,457 @@
+import os
+import threading
+import time
+
+import numpy as np
+import requests
+
+import cryptocompare_client
+from cryptocompare_api import chunk_symbols
+from ohlcv_store import get_store
+
+# Coins tracked, by market cap
+SCREENER_TOP_N = int(os.getenv("SCREENER_TOP_N", 100))
+# Daily returns kept per coin for volatility and correlations
+SCREENER_WINDOW = int(os.getenv("SCREENER_WINDOW", 90))
+SCREENER_REFRESH = float(os.getenv("SCREENER_REFRESH", 300))
+# Coins whose candles are synced per refresh, so a cold start does not use up
+# the CryptoCompare request budget; refreshes run every BACKFILL_INTERVAL
+# seconds until every coin is synced
+SCREENER_SYNC_BATCH = int(os.getenv("SCREENER_SYNC_BATCH", 50))
+SCREENER_BACKFILL_INTERVAL = float(os.getenv("SCREENER_BACKFILL_INTERVAL", 30))
+UNIVERSE_TTL = 3600
+TOPLIST_PAGE = 100
+# Fewer overlapping daily returns than this give no volatility/correlation
+MIN_OVERLAP = 10
+DAY = 86400
+
+SORT_FIELDS = ('rank', 'price', 'market_cap', 'volume_24h', 'change_24h', 'return_7d',
+               'return_30d', 'return_window', 'volatility', 'momentum_rank')
+# Fields sorted ascending unless order=desc is given
+ASCENDING_FIELDS = ('rank', 'momentum_rank', 'volatility')
+
+
+class ScreenerError(ValueError):
+    """Raised for an unknown sort field or symbol in a screener query."""
+
+
+def _log_returns(closes, previous):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.log(closes / previous)
+    mask = np.isfinite(returns)
+    return np.where(mask, returns, 0.0), mask.astype(np.float64)
+
+
+class ReturnMatrix:
+    """
+    Daily closes and log returns of many coins as (coins x days) arrays.
+
+    Alongside the returns it keeps the pairwise sums behind a
+    pairwise-complete Pearson correlation (sum x*y, sum x, sum x^2 and the
+    overlap count, each an N x N matrix). Rolling the window forward by one
+    candle then costs a few rank-one updates instead of recomputing
+    everything.
+
+    Args:
+        symbols (list): Row labels.
+        closes (np.ndarray): (coins x window + 1) daily closes, NaN where missing.
+        last_day (int): Epoch of the last column.
+    """
+
+    def __init__(self, symbols, closes, last_day):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.closes = closes
+        self.last_day = last_day
+        self.updates = 0
+        self.returns, self.mask = _log_returns(closes[:, 1:], closes[:, :-1])
+        x, m = self.returns, self.mask
+        self.sum_xy = x @ x.T
+        self.sum_x = x @ m.T  # [i, j]: sum of x_i over days where j is also present
+        self.sum_xx = (x * x) @ m.T
+        self.count = m @ m.T
+
+    def _swap_column(self, old_x, old_m, new_x, new_m):
+        # Each sum gets new*new' - old*old' as one (N x 2) @ (2 x N) product.
+        x = np.stack((new_x, old_x))
+        m = np.stack((new_m, -old_m))
+        self.sum_xy += x.T @ (x * [[1.0], [-1.0]])
+        self.sum_x += x.T @ m
+        self.sum_xx += (x * x).T @ m
+        self.count += np.stack((new_m, old_m)).T @ m
+        self.updates += 1
+
+    def advance(self, closes, day):
+        """Appends the closes of `day` (the day after last_day) and drops the oldest day."""
+        x, m = _log_returns(closes, self.closes[:, -1])
+        self._swap_column(self.returns[:, 0], self.mask[:, 0], x, m)
+        self.closes = np.column_stack((self.closes[:, 1:], closes))
+        self.returns = np.column_stack((self.returns[:, 1:], x))
+        self.mask = np.column_stack((self.mask[:, 1:], m))
+        self.last_day = day
+
+    def replace_last(self, closes):
+        """Replaces the closes of last_day, e.g. with candles that arrived late."""
+        x, m = _log_returns(closes, self.closes[:, -2])
+        self._swap_column(self.returns[:, -1], self.mask[:, -1], x, m)
+        self.closes[:, -1] = closes
+        self.returns[:, -1] = x
+        self.mask[:, -1] = m
+
+    def correlation(self, rows=None, cols=None):
+        """
+        Pairwise-complete correlations of daily returns.
+
+        Args:
+            rows (array-like, optional): Row indices; all coins by default.
+            cols (array-like, optional): Column indices; same as rows by default.
+
+        Returns:
+            np.ndarray: (rows x cols) correlations, NaN where fewer than
+                        MIN_OVERLAP days overlap.
+        """
+        rows = np.arange(len(self.symbols)) if rows is None else np.asarray(rows)
+        cols = rows if cols is None else np.asarray(cols)
+        ix = np.ix_(rows, cols)
+        n, sxy = self.count[ix], self.sum_xy[ix]
+        sx, sy = self.sum_x[ix], self.sum_x.T[ix]
+        sxx, syy = self.sum_xx[ix], self.sum_xx.T[ix]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+        corr[(n < MIN_OVERLAP) | ~np.isfinite(corr)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def summary(self):
+        """
+        Per-coin statistics, each an array over the rows.
+
+        Returns:
+            dict: return_7d, return_30d, return_window (over the whole
+                  window), volatility (annualized std of daily log returns)
+                  and momentum_rank (1 = strongest return_window).
+        """
+        n = np.diag(self.count)
+        s = np.diag(self.sum_x)
+        q = np.diag(self.sum_xx)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (q - s * s / n) / (n - 1)
+            volatility = np.sqrt(np.clip(variance, 0, None) * 365)
+            last = self.closes[:, -1]
+            width = self.closes.shape[1] - 1
+            change = {k: last / self.closes[:, -1 - min(k, width)] - 1 for k in (7, 30, width)}
+        volatility[n < MIN_OVERLAP] = np.nan
+        momentum = change[width]
+        valid = np.isfinite(momentum)
+        order = np.argsort(np.where(valid, -momentum, np.inf), kind='stable')
+        rank = np.empty(len(order))
+        rank[order] = np.arange(1, len(order) + 1)
+        rank[~valid] = np.nan
+        return {
+            'return_7d': change[7],
+            'return_30d': change[30],
+            'return_window': momentum,
+            'volatility': volatility,
+            'momentum_rank': rank,
+        }
+
+
+def build_table(universe, quotes, matrix):
+    """
+    Column arrays of the screener table.
+
+    Args:
+        universe (list): (symbol, name) pairs, largest market cap first.
+        quotes (dict): {symbol: pricemultifull RAW quote}.
+        matrix (ReturnMatrix): History of the same symbols, in the same order.
+
+    Returns:
+        dict: {'symbol', 'name'} lists and one float array per SORT_FIELDS entry.
+    """
+    symbols = [symbol for symbol, _ in universe]
+
+    def quote_field(field):
+        # None (missing) becomes NaN.
+        return np.array([quotes.get(symbol, {}).get(field) for symbol in symbols], dtype=np.float64)
+
+    table = {
+        'symbol': symbols,
+        'name': [name for _, name in universe],
+        'rank': np.arange(1, len(symbols) + 1, dtype=np.float64),
+        'price': quote_field('PRICE'),
+        'market_cap': quote_field('MKTCAP'),
+        'volume_24h': quote_field('VOLUME24HOURTO'),
+        'change_24h': quote_field('CHANGEPCT24HOUR'),
+    }
+    table.update(matrix.summary())
+    return table
+
+
+def _value(value):
+    return None if not np.isfinite(value) else round(float(value), 8)
+
+
+def query_table(table, matrix, sort='rank', order=None, limit=50, offset=0, filters=None,
+                correlate=None, correlation=False):
+    """
+    Filters, sorts and pages the screener table.
+
+    Args:
+        table (dict): From build_table.
+        matrix (ReturnMatrix): History the table was built from.
+        sort (str): One of SORT_FIELDS. Missing values always sort last.
+        order (str, optional): 'asc' or 'desc'; by default ascending for
+            ASCENDING_FIELDS and descending otherwise.
+        limit (int): Rows returned.
+        offset (int): Rows skipped.
+        filters (dict, optional): {'min_<field>' or 'max_<field>': value}
+            for any field in SORT_FIELDS; rows missing the field are dropped.
+        correlate (str, optional): Adds each row's correlation with this symbol.
+        correlation (bool): Adds the correlation matrix of the returned rows.
+
+    Returns:
+        dict: {'matched', 'rows', and optionally 'correlation'}.
+
+    Raises:
+        ScreenerError: For an unknown field or correlate symbol.
+    """
+    if sort not in SORT_FIELDS:
+        raise ScreenerError(f"Unknown sort field '{sort}'")
+    keep = np.ones(len(table['symbol']), dtype=bool)
+    for name, bound in (filters or {}).items():
+        kind, _, field = name.partition('_')
+        if kind not in ('min', 'max') or field not in SORT_FIELDS:
+            raise ScreenerError(f"Unknown filter '{name}'")
+        with np.errstate(invalid='ignore'):
+            keep &= table[field] >= bound if kind == 'min' else table[field] <= bound
+    if correlate is not None and correlate not in matrix.index:
+        raise ScreenerError(f"'{correlate}' is not in the screener universe")
+
+    indices = np.flatnonzero(keep)
+    key = table[sort][indices]
+    descending = order == 'desc' if order else sort not in ASCENDING_FIELDS
+    order_index = np.lexsort((-key if descending else key, np.isnan(key)))
+    page = indices[order_index][offset:offset + limit]
+
+    fields = [field for field in SORT_FIELDS if field != 'rank']
+    rows = [dict({'symbol': table['symbol'][i], 'name': table['name'][i], 'rank': int(table['rank'][i])},
+                 **{field: _value(table[field][i]) for field in fields})
+            for i in page]
+    result = {'matched': len(indices), 'rows': rows}
+    if correlate is not None:
+        column = matrix.correlation(page, [matrix.index[correlate]])[:, 0]
+        for row, value in zip(rows, column):
+            row['correlation'] = _value(value)
+    if correlation:
+        result['correlation'] = {
+            'symbols': [row['symbol'] for row in rows],
+            'matrix': [[_value(value) for value in line] for line in matrix.correlation(page)],
+        }
+    return result
+
+
+class Screener:
+    """
+    Background-refreshed view of the top coins by market cap.
+
+    Each refresh re-reads the toplist (hourly), fetches quotes with batched
+    pricemultifull calls, syncs daily candles into the OHLCV store, and
+    updates the ReturnMatrix: a new daily candle rolls the matrix forward
+    incrementally, while a changed coin list or backfilled history rebuilds it.
+
+    Args:
+        top_n (int): Number of coins tracked.
+        window (int): Daily returns kept per coin.
+        currency (str): Quote currency. Defaults to 'USD'.
+        interval (float): Seconds between refreshes.
+        default_symbols (iterable): Universe used while the toplist is unavailable.
+        on_quotes (callable, optional): Called with {symbol: quote} after
+            each quote fetch (e.g. to share them with the price store).
+    """
+
+    def __init__(self, top_n=SCREENER_TOP_N, window=SCREENER_WINDOW, currency='USD',
+                 interval=SCREENER_REFRESH, default_symbols=('BTC', 'ETH'), on_quotes=None):
+        self.top_n = top_n
+        self.window = window
+        self.currency = currency
+        self.interval = interval
+        self.default_symbols = [symbol.upper() for symbol in default_symbols]
+        self.on_quotes = on_quotes
+        self._universe = []
+        self._universe_at = 0.0
+        self._quotes = {}
+        self._matrix = None
+        self._table = None
+        self._updated_at = None
+        self._pending = 0
+        self._failed = {}  # symbol -> day its candle sync last failed
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_universe(self):
+        if self._universe and time.time() - self._universe_at < UNIVERSE_TTL:
+            return self._universe
+        coins, seen = [], set()
+        for page in range(-(-self.top_n // TOPLIST_PAGE)):
+            try:
+                data = cryptocompare_client.get('/data/top/mktcapfull', limit=TOPLIST_PAGE,
+                                                page=page, tsym=self.currency)
+            except requests.exceptions.RequestException as e:
+                print(f"Screener toplist error: {e}")
+                break
+            entries = data.get('Data') or []
+            for entry in entries:
+                info = entry.get('CoinInfo') or {}
+                if info.get('Name') and info['Name'] not in seen:
+                    seen.add(info['Name'])
+                    coins.append((info['Name'], info.get('FullName') or info['Name']))
+            if len(entries) < TOPLIST_PAGE:
+                break
+        if coins:
+            self._universe, self._universe_at = coins[:self.top_n], time.time()
+        elif not self._universe:
+            self._universe = [(symbol, symbol) for symbol in self.default_symbols]
+        return self._universe
+
+    def _fetch_quotes(self, symbols):
+        quotes = {}
+        for chunk in chunk_symbols(symbols):
+            try:
+                data = cryptocompare_client.get('/data/pricemultifull', fsyms=','.join(chunk),
+                                                tsyms=self.currency)
+            except requests.exceptions.RequestException as e:
+                print(f"Screener quote error: {e}")
+                continue
+            for symbol, raw in data.get('RAW', {}).items():
+                if self.currency in raw:
+                    quotes[symbol] = raw[self.currency]
+        if quotes and self.on_quotes is not None:
+            self.on_quotes(quotes)
+        return quotes
+
+    def _sync(self, symbols, target_day):
+        """
+        Syncs up to SCREENER_SYNC_BATCH coins whose candles are behind.
+
+        Returns:
+            tuple: (synced symbols, whether any needed more than the one
+                    newest candle, i.e. history was backfilled).
+        """
+        store = get_store()
+        due = []
+        for symbol in symbols:
+            if self._failed.get(symbol) == target_day:
+                continue
+            _, last = store.bounds(symbol, self.currency, 'day')
+            if last is None or last < target_day:
+                due.append((symbol, last is None or last < target_day - DAY))
+        synced, backfilled = [], False
+        for symbol, backfill in due[:SCREENER_SYNC_BATCH]:
+            try:
+                store.sync(symbol, self.currency, 'day', lookback=self.window + 2)
+            except requests.exceptions.RequestException as e:
+                print(f"Screener candle sync error for {symbol}: {e}")
+                self._failed[symbol] = target_day
+                continue
+            synced.append(symbol)
+            backfilled = backfilled or backfill
+        self._pending = max(0, len(due) - SCREENER_SYNC_BATCH)
+        return synced, backfilled
+
+    def _read_closes(self, symbols, start_day, end_day):
+        """(coins x days) closes from the store for [start_day, end_day]."""
+        store = get_store()
+        days = (end_day - start_day) // DAY + 1
+        closes = np.full((len(symbols), days), np.nan)
+        for i, symbol in enumerate(symbols):
+            candles = [c for c in store.read(symbol, self.currency, 'day', since=start_day)
+                       if c['time'] <= end_day and c['close']]
+            if candles:
+                times = np.fromiter((c['time'] for c in candles), dtype=np.int64, count=len(candles))
+                closes[i, (times - start_day) // DAY] = [c['close'] for c in candles]
+        return closes
+
+    def refresh(self):
+        """Re-reads the universe and quotes, syncs candles and updates the matrix."""
+        universe = self._load_universe()
+        symbols = [symbol for symbol, _ in universe]
+        quotes = self._fetch_quotes(symbols)
+        target_day = int(time.time()) // DAY * DAY - DAY
+        synced, backfilled = self._sync(symbols, target_day)
+
+        with self._lock:
+            matrix = self._matrix
+            if (matrix is None or matrix.symbols != symbols or backfilled
+                    or target_day - matrix.last_day >= self.window * DAY
+                    or matrix.updates >= self.window):
+                # Full rebuild; also bounds float drift from the rank-one updates.
+                start = target_day - self.window * DAY
+                matrix = ReturnMatrix(symbols, self._read_closes(symbols, start, target_day),
+                                      target_day)
+            else:
+                advanced = matrix.last_day < target_day
+                for day in range(matrix.last_day + DAY, target_day + 1, DAY):
+                    matrix.advance(self._read_closes(symbols, day, day)[:, 0], day)
+                if synced and not advanced:
+                    matrix.replace_last(self._read_closes(symbols, target_day, target_day)[:, 0])
+            self._matrix = matrix
+            self._quotes.update(quotes)
+            self._table = build_table(universe, self._quotes, matrix)
+            self._updated_at = time.time()
+
+    def query(self, **kwargs):
+        """
+        Runs query_table on the latest table (see query_table for arguments).
+
+        Returns:
+            dict: The query result plus 'updated_at', 'day' and 'universe',
+                  or {'pending': True, 'rows': []} before the first refresh.
+        """
+        with self._lock:
+            if self._table is None:
+                return {'pending': True, 'rows': []}
+            result = query_table(self._table, self._matrix, **kwargs)
+            result.update(updated_at=self._updated_at, day=self._matrix.last_day,
+                          universe=len(self._table['symbol']), syncing=self._pending)
+        return result
+
+    def top(self, count):
+        """Returns the first `count` (symbol, name) pairs of the current universe."""
+        return list(self._universe[:count])
+
+    def lists(self, symbol):
+        """Whether the symbol is in the current universe."""
+        return any(listed == symbol for listed, _ in self._universe)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'universe': len(self._universe),
+                'with_history': 0 if self._matrix is None
+                else int((np.diag(self._matrix.count) >= MIN_OVERLAP).sum()),
+                'syncing': self._pending,
+                'updated_at': self._updated_at,
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Screener refresh error: {e}")
+            self._wake.wait(SCREENER_BACKFILL_INTERVAL if self._pending else self.interval)
+            self._wake.clear()
+
+    def start(self):
+        """Starts the refresh thread if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='screener', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,158 @@
+import re
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+# Small crypto-news lexicon; weights are summed per headline.
+POSITIVE_TERMS = {
+    'surge': 2, 'surges': 2, 'soar': 2, 'soars': 2, 'rally': 2, 'rallies': 2,
+    'jump': 1, 'jumps': 1, 'gain': 1, 'gains': 1, 'rise': 1, 'rises': 1,
+    'climb': 1, 'climbs': 1, 'record': 1, 'high': 1, 'highs': 1, 'bull': 1,
+    'bullish': 2, 'breakout': 2, 'approval': 2, 'approved': 2, 'approves': 2,
+    'adoption': 1, 'launch': 1, 'launches': 1, 'upgrade': 1, 'partnership': 1,
+    'inflows': 1, 'recover': 1, 'recovers': 1, 'rebound': 1, 'rebounds': 1,
+    'etf': 1, 'milestone': 1, 'growth': 1, 'boost': 1, 'boosts': 1,
+}
+NEGATIVE_TERMS = {
+    'crash': 2, 'crashes': 2, 'plunge': 2, 'plunges': 2, 'tumble': 2,
+    'tumbles': 2, 'slump': 2, 'slumps': 2, 'fall': 1, 'falls': 1, 'drop': 1,
+    'drops': 1, 'decline': 1, 'declines': 1, 'low': 1, 'lows': 1, 'bear': 1,
+    'bearish': 2, 'hack': 2, 'hacked': 2, 'exploit': 2, 'scam': 2, 'fraud': 2,
+    'lawsuit': 2, 'sues': 2, 'ban': 2, 'bans': 2, 'crackdown': 2,
+    'outflows': 1, 'liquidation': 1, 'liquidations': 1, 'selloff': 2,
+    'sell-off': 2, 'warning': 1, 'warns': 1, 'fine': 1, 'fined': 1,
+    'delay': 1, 'delays': 1, 'rejects': 2, 'rejected': 2, 'loss': 1,
+    'losses': 1, 'fear': 1, 'risk': 1,
+}
+NEGATORS = {'not', 'no', "isn't", "won't", "doesn't", 'without', 'fails'}
+# A negator applies to the next few words of its clause only
+NEGATION_WINDOW = 3
+# Words that start a new clause and end a negation's scope
+CLAUSE_BREAKS = {'and', 'as', 'but', 'or', 'while', 'yet', 'though', 'although', 'after'}
+# Words an LLM answers with, mapped onto SENTIMENTS
+SENTIMENT_LABELS = {
+    'positive': 'positive', 'bullish': 'positive',
+    'negative': 'negative', 'bearish': 'negative',
+    'neutral': 'neutral', 'mixed': 'neutral',
+}
+
+_TOKEN_RE = re.compile(r"[a-z][a-z'\-]*|[.,;:!?]")
+_BATCH_LINE_RE = re.compile(r"^\s*[*\[]*(\d+)[*\]]*\s*[:.)\-]\s*\**\s*(positive|negative|neutral)\b", re.I)
+
+
+def scoped_words(text):
+    """
+    Yields (word, negated) for the words of text. A negator flips at most
+    the next NEGATION_WINDOW words and the first weighted word it reaches;
+    punctuation and CLAUSE_BREAKS end its scope early.
+    """
+    remaining = 0
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        if token in NEGATORS:
+            remaining = NEGATION_WINDOW
+            continue
+        if not token[0].isalpha() or token in CLAUSE_BREAKS:
+            remaining = 0
+            continue
+        negated = remaining > 0
+        remaining = max(remaining - 1, 0)
+        if negated and (token in POSITIVE_TERMS or token in NEGATIVE_TERMS
+                        or token in SENTIMENT_LABELS):
+            remaining = 0
+        yield token, negated
+
+
+def classify_lexicon(text):
+    """
+    Classifies a headline with the local lexicon (no network call).
+
+    Args:
+        text (str): Headline or snippet.
+
+    Returns:
+        str: 'positive', 'negative' or 'neutral'.
+    """
+    score = 0
+    for word, negated in scoped_words(text):
+        weight = POSITIVE_TERMS.get(word, 0) - NEGATIVE_TERMS.get(word, 0)
+        score += -weight if negated else weight
+    if score > 0:
+        return 'positive'
+    if score < 0:
+        return 'negative'
+    return 'neutral'
+
+
+def normalize_sentiment(text):
+    """
+    Maps a free-form LLM answer onto one of SENTIMENTS, or None.
+
+    Whole words are matched against SENTIMENT_LABELS, so 'nonnegative' is not
+    'negative'; a negated label ('not bullish') counts as neutral.
+    """
+    for word, negated in scoped_words(text):
+        sentiment = SENTIMENT_LABELS.get(word)
+        if sentiment is not None:
+            return 'neutral' if negated else sentiment
+    return None
+
+
+def build_batch_prompt(titles):
+    numbered = "\n".join(f"{i}. {title}" for i, title in enumerate(titles, 1))
+    return (
+        "Classify the sentiment of each numbered crypto news headline below.\n"
+        "Respond with exactly one line per headline in the form "
+        "'<number>: <sentiment>' where <sentiment> is positive, negative or "
+        "neutral. Do not add any other text.\n\n"
+        f"{numbered}"
+    )
+
+
+def parse_batch_response(text, count):
+    """
+    Parses '<number>: <sentiment>' lines from a batched LLM answer.
+
+    Returns:
+        list: One sentiment per headline, or None where the line was missing
+              or could not be parsed.
+    """
+    results = [None] * count
+    for line in (text or '').splitlines():
+        match = _BATCH_LINE_RE.match(line)
+        if not match:
+            continue
+        index = int(match.group(1)) - 1
+        if 0 <= index < count and results[index] is None:
+            results[index] = match.group(2).lower()
+    return results
+
+
+def classify_batch(llm, titles):
+    """
+    Classifies all headlines in a single LLM call.
+
+    Items the model did not answer for are retried one at a time; errors
+    (including 429s) propagate so the caller can choose a fallback.
+
+    Args:
+        llm: LangChain chat model exposing predict().
+        titles (list): Headlines to classify.
+
+    Returns:
+        list: One sentiment per headline.
+    """
+    if not titles:
+        return []
+    sentiments = parse_batch_response(llm.predict(build_batch_prompt(titles)), len(titles))
+    for i, sentiment in enumerate(sentiments):
+        if sentiment is None:
+            sentiments[i] = classify_single(llm, titles[i])
+    return sentiments
+
+
+def classify_single(llm, title):
+    """
+    Classifies one headline with its own LLM call. Errors propagate, so a
+    caller falling back to the lexicon can record that it did.
+    """
+    sentiment_prompt = f"Analyze the sentiment of this crypto news headline: '{title}'. Respond with ONLY one word: positive, negative, or neutral"
+    return normalize_sentiment(llm.predict(sentiment_prompt)) or 'neutral'
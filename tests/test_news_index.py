@@ -0,0 +1,47 @@
+from news_index import NewsIndex, normalize_title, title_hash
+
+
+def items(*titles, source='CoinDesk'):
+    return [{'title': title, 'snippet': '', 'source': source} for title in titles]
+
+
+def test_normalize_title_keeps_non_latin_scripts():
+    titles = ['比特币创下新高', 'ビットコインが最高値を更新', 'Биткоин обновил максимум']
+    assert len({title_hash(title) for title in titles}) == 3
+    assert title_hash('!!!') is None
+
+
+def test_only_the_known_source_suffix_is_stripped():
+    assert normalize_title('Bitcoin hits new high - CoinDesk', 'CoinDesk') == 'bitcoin hits new high'
+    assert normalize_title('Bitcoin hits new high - again', 'CoinDesk') == 'bitcoin hits new high again'
+    assert normalize_title('Bítcoin HITS new high!') == 'bitcoin hits new high'
+
+
+def test_ingest_drops_duplicates_and_untitled_items():
+    index = NewsIndex(':memory:')
+    results = index.ingest('BTC', 'market', items(
+        'Bitcoin hits new high', 'Bitcoin hits new high - CoinDesk', '???', 'ETF inflows slow'))
+    assert [item['title'] for item in results] == ['Bitcoin hits new high', 'ETF inflows slow']
+    stats = index.stats()
+    assert (stats['duplicates'], stats['untitled'], stats['headlines']) == (1, 1, 2)
+
+
+def test_headlines_belong_to_the_first_category():
+    index = NewsIndex(':memory:')
+    headlines = items('Bitcoin hits new high')
+    assert len(index.ingest('BTC', 'market', headlines)) == 1
+    assert index.ingest('BTC', 'regulatory', headlines) == []
+    assert len(index.ingest('BTC', 'market', headlines)) == 1
+    # Ownership is per symbol.
+    assert len(index.ingest('ETH', 'regulatory', headlines)) == 1
+
+
+def test_stored_sentiment_is_reused_unless_reclassification_is_needed():
+    index = NewsIndex(':memory:')
+    key = index.ingest('BTC', 'market', items('Bitcoin hits new high'))[0]['hash']
+    index.record_sentiments({key: 'positive'}, 'lexicon')
+
+    assert index.ingest('BTC', 'market', items('Bitcoin hits new high'))[0]['sentiment'] == 'positive'
+    upgrade = index.ingest('BTC', 'market', items('Bitcoin hits new high'),
+                           needs_sentiment=lambda method: method == 'lexicon')
+    assert upgrade[0]['sentiment'] is None
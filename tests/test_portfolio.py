@@ -0,0 +1,69 @@
+import pytest
+
+from portfolio_manager import Portfolio
+
+
+def test_fifo_sells_the_oldest_lots_first():
+    portfolio = Portfolio('fifo')
+    portfolio.add('buy', 'BTC', 1, 100, timestamp=1)
+    portfolio.add('buy', 'BTC', 1, 200, timestamp=2)
+    portfolio.add('sell', 'BTC', 1.5, 300, fee=3, timestamp=3)
+    portfolio.update_prices({'BTC': 400})
+
+    summary = portfolio.summary()
+    holding = summary['holdings']['BTC']
+    # Sold all of the 100 lot and half of the 200 lot.
+    assert holding['quantity'] == pytest.approx(0.5)
+    assert holding['cost_basis'] == pytest.approx(100)
+    assert holding['realized_pnl'] == pytest.approx(1.5 * 300 - 3 - 200)
+    assert holding['unrealized_pnl'] == pytest.approx(0.5 * 400 - 100)
+
+
+def test_average_cost_spreads_the_basis_over_all_units():
+    portfolio = Portfolio('average')
+    portfolio.add('buy', 'ETH', 1, 100, timestamp=1)
+    portfolio.add('buy', 'ETH', 1, 200, timestamp=2)
+    portfolio.add('sell', 'ETH', 1, 300, timestamp=3)
+
+    holding = portfolio.summary()['holdings']['ETH']
+    assert holding['cost_basis'] == pytest.approx(150)
+    assert holding['realized_pnl'] == pytest.approx(150)
+
+
+def test_selling_more_than_held_is_rejected():
+    portfolio = Portfolio()
+    portfolio.add('buy', 'BTC', 1, 100)
+    with pytest.raises(ValueError):
+        portfolio.add('sell', 'BTC', 2, 100)
+
+
+@pytest.mark.parametrize('method', ['fifo', 'average'])
+def test_bulk_import_matches_adding_one_by_one(method):
+    rows = [
+        {'timestamp': 3, 'type': 'sell', 'symbol': 'btc', 'quantity': 0.5, 'price': 300, 'fee': 1},
+        {'timestamp': 1, 'type': 'buy', 'symbol': 'BTC', 'quantity': 1, 'price': 100, 'fee': 2},
+        {'timestamp': 2, 'type': 'buy', 'symbol': 'BTC', 'quantity': 1, 'price': 250},
+        {'timestamp': 4, 'type': 'transfer_out', 'symbol': 'BTC', 'quantity': 0.25, 'fee': 0.5},
+    ]
+    imported = Portfolio(method)
+    assert imported.import_rows(rows) == len(rows)
+    added = Portfolio(method)
+    for row in sorted(rows, key=lambda row: row['timestamp']):
+        added.add(row['type'], row['symbol'].upper(), row['quantity'], row.get('price', 0),
+                  row.get('fee', 0), row['timestamp'])
+    for portfolio in (imported, added):
+        portfolio.update_prices({'BTC': 500})
+    assert imported.summary() == added.summary()
+
+
+def test_unpriced_holdings_stay_out_of_totals():
+    portfolio = Portfolio()
+    portfolio.add('buy', 'BTC', 1, 100)
+    portfolio.add('buy', 'XYZ', 10, 5)
+    portfolio.update_prices({'BTC': {'USD': 150}})
+
+    performance = portfolio.summary()['performance']
+    assert performance['cost_basis'] == pytest.approx(100)
+    assert performance['market_value'] == pytest.approx(150)
+    assert performance['unpriced'] == ['XYZ']
+    assert performance['unpriced_cost_basis'] == pytest.approx(50)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from screener import ReturnMatrix
+
+DAY = 86400
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(7)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, (6, 60)), axis=1))
+    # Gaps make the correlations pairwise-complete rather than plain.
+    closes[1, 10:14] = np.nan
+    closes[4, :25] = np.nan
+    return closes
+
+
+def assert_same_state(updated, rebuilt):
+    for name in ('sum_xy', 'sum_x', 'sum_xx', 'count'):
+        np.testing.assert_allclose(getattr(updated, name), getattr(rebuilt, name),
+                                   rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(updated.correlation(), rebuilt.correlation(),
+                               rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_advance_matches_a_full_rebuild(closes):
+    window = 30
+    matrix = ReturnMatrix(list('ABCDEF'), closes[:, :window + 1].copy(), window * DAY)
+    for day in range(window + 1, closes.shape[1]):
+        matrix.advance(closes[:, day], day * DAY)
+    rebuilt = ReturnMatrix(list('ABCDEF'), closes[:, -(window + 1):].copy(), matrix.last_day)
+    assert_same_state(matrix, rebuilt)
+    assert matrix.updates == closes.shape[1] - window - 1
+
+
+def test_replace_last_matches_a_full_rebuild(closes):
+    matrix = ReturnMatrix(list('ABCDEF'), closes[:, :-1].copy(), 0)
+    revised = closes[:, -2] * np.array([1.05, 0.9, 1.0, np.nan, 1.2, 0.99])
+    matrix.replace_last(revised)
+
+    expected = closes[:, :-1].copy()
+    expected[:, -1] = revised
+    assert_same_state(matrix, ReturnMatrix(list('ABCDEF'), expected, 0))
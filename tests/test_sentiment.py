@@ -0,0 +1,34 @@
+import pytest
+
+from sentiment import classify_lexicon, normalize_sentiment, parse_batch_response
+
+
+@pytest.mark.parametrize('headline, expected', [
+    ("Bitcoin surges past $70k", 'positive'),
+    ("Ethereum plunges after exchange hack", 'negative'),
+    ("Bitcoin does not crash", 'positive'),
+    ("SEC has not approved the ETF", 'negative'),
+    # Negation ends at a conjunction or after a few words.
+    ("No relief for Ethereum as price crashes", 'negative'),
+    ("Bitcoin fails to hold support and plunges 10%", 'negative'),
+    ("No crash, bitcoin rallies", 'positive'),
+    ("Exchange opens new office in Lisbon", 'neutral'),
+])
+def test_classify_lexicon(headline, expected):
+    assert classify_lexicon(headline) == expected
+
+
+@pytest.mark.parametrize('answer, expected', [
+    ("Positive", 'positive'),
+    ("The sentiment is bearish.", 'negative'),
+    ("not bullish", 'neutral'),
+    ("nonnegative", None),
+    ("", None),
+])
+def test_normalize_sentiment(answer, expected):
+    assert normalize_sentiment(answer) == expected
+
+
+def test_parse_batch_response_leaves_missing_lines_unset():
+    text = "1: positive\n**3.** Negative\n7: neutral"
+    assert parse_batch_response(text, 3) == ['positive', None, 'negative']
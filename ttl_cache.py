@@ -0,0 +1,255 @@
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_backends import CACHE_LOCK_TTL, default_backend, wait_for
+
+# Shared by all caches; background refreshes are short upstream fetches.
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ttl-refresh')
+
+
+class TTLCache:
+    """
+    Per-entry TTL cache with jitter, stale-while-revalidate and negative caching.
+
+    Entries live in a cache backend (see cache_backends). With a shared
+    backend, concurrent misses and refreshes of a key are coordinated across
+    processes: one worker holds the key's lock and loads it, the others wait
+    for its result instead of calling the upstream themselves.
+
+    Args:
+        ttl (float): Seconds a successful value is fresh.
+        stale_ttl (float): Extra seconds an expired value may still be served
+            while a single background refresh runs. 0 disables it.
+        negative_ttl (float): Seconds a negative result (see is_negative) is
+            cached. 0 disables negative caching.
+        jitter (float): Fraction of the TTL randomly added or removed per
+            entry so keys filled together do not all expire together.
+        maxsize (int): Maximum number of entries before LRU eviction (memory
+            backend only).
+        is_negative (callable, optional): Predicate marking failed results
+            (e.g. {} or []) that get the short negative TTL.
+        backend (optional): Cache backend; defaults to
+            cache_backends.default_backend(maxsize), chosen by CACHE_BACKEND.
+        namespace (str): Key prefix separating this cache's entries in a
+            shared backend. Defaults to 'ttl'.
+    """
+
+    def __init__(self, ttl, stale_ttl=0, negative_ttl=30, jitter=0.1, maxsize=128,
+                 is_negative=None, backend=None, namespace='ttl'):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.jitter = jitter
+        self.maxsize = maxsize
+        self.is_negative = is_negative or (lambda value: False)
+        self.backend = backend if backend is not None else default_backend(maxsize)
+        self.namespace = namespace
+        self._loading = {}  # key -> threading.Event for synchronous loads
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.shared_fills = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.backend_errors = 0
+
+    def _key(self, key):
+        return f"{self.namespace}:{key!r}"
+
+    def _backend(self, method, *args, default=None):
+        """Calls a backend method; a failing shared backend degrades to a miss."""
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            print(f"Cache backend {method} failed: {e}")
+            with self._lock:
+                self.backend_errors += 1
+            return default
+
+    def _jittered(self, ttl):
+        if not self.jitter:
+            return ttl
+        return ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _store(self, skey, value):
+        now = time.time()
+        negative = self.is_negative(value)
+        if negative:
+            if not self.negative_ttl:
+                self._backend('delete', skey)
+                return
+            expires_at = now + self._jittered(self.negative_ttl)
+            stale_until = expires_at
+        else:
+            expires_at = now + self._jittered(self.ttl)
+            stale_until = expires_at + self.stale_ttl
+        self._backend('set', skey, (value, expires_at, stale_until, negative), stale_until - now)
+
+    def _lookup(self, skey):
+        """Returns (record, state) with state in 'fresh', 'stale' or None."""
+        record = self._backend('get', skey)
+        if record is None:
+            return None, None
+        now = time.time()
+        if now < record[1]:
+            return record, 'fresh'
+        if now < record[2]:
+            return record, 'stale'
+        return None, None
+
+    def get(self, key, default=None):
+        record, state = self._lookup(self._key(key))
+        return default if record is None else record[0]
+
+    def set(self, key, value):
+        self._store(self._key(key), value)
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for key, calling loader() on a miss.
+
+        Concurrent misses for the same key share one load, within this
+        process and (through the backend's lock) across processes. An expired
+        value inside the stale window is returned immediately and refreshed
+        once in the background.
+        """
+        skey = self._key(key)
+        while True:
+            record, state = self._lookup(skey)
+            if state == 'fresh':
+                with self._lock:
+                    if record[3]:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                return record[0]
+            with self._lock:
+                if state == 'stale':
+                    self.stale_hits += 1
+                    if skey not in self._refreshing and skey not in self._loading:
+                        self._refreshing.add(skey)
+                        _refresh_executor.submit(self._refresh, skey, loader)
+                    return record[0]
+                loading = self._loading.get(skey)
+                if loading is None:
+                    self.misses += 1
+                    loading = self._loading[skey] = threading.Event()
+                    leader = True
+                else:
+                    leader = False
+
+            if not leader:
+                loading.wait()
+                continue
+
+            try:
+                return self._load(skey, loader)
+            finally:
+                with self._lock:
+                    self._loading.pop(skey, None)
+                loading.set()
+
+    def _load(self, skey, loader):
+        """Loads skey while holding its cross-process lock, or waits for the holder."""
+        while True:
+            token = self._backend('acquire', skey, CACHE_LOCK_TTL, default='')
+            if token is not None:
+                break
+            # Another process is loading this key; use its result.
+            record = wait_for(self.backend, skey, ready=lambda r: r is not None)
+            if record is not None:
+                with self._lock:
+                    self.shared_fills += 1
+                return record[0]
+        try:
+            record, state = self._lookup(skey)
+            if state == 'fresh':
+                # Filled by another process between our lookup and the lock.
+                with self._lock:
+                    self.shared_fills += 1
+                return record[0]
+            try:
+                value = loader()
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                raise
+            self._store(skey, value)
+            return value
+        finally:
+            if token:
+                self._backend('release', skey, token)
+
+    def _refresh(self, skey, loader):
+        token = self._backend('acquire', skey, CACHE_LOCK_TTL, default='')
+        if token is None:
+            # Another process is already refreshing this key.
+            with self._lock:
+                self._refreshing.discard(skey)
+            return
+        try:
+            value = loader()
+        except Exception as e:
+            print(f"Background refresh failed for {skey}: {e}")
+            with self._lock:
+                self.errors += 1
+            return
+        else:
+            with self._lock:
+                self.refreshes += 1
+            # Keep serving the stale value rather than replacing it with a failure.
+            if not self.is_negative(value) or self._lookup(skey)[0] is None:
+                self._store(skey, value)
+        finally:
+            if token:
+                self._backend('release', skey, token)
+            with self._lock:
+                self._refreshing.discard(skey)
+
+    def clear(self):
+        self._backend('clear', f"{self.namespace}:")
+
+    def stats(self):
+        size = self._backend('count', f"{self.namespace}:", default=0)
+        with self._lock:
+            return {
+                'size': size,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'shared_fills': self.shared_fills,
+                'evictions': getattr(self.backend, 'evictions', 0),
+                'refreshes': self.refreshes,
+                'errors': self.errors,
+                'backend_errors': self.backend_errors,
+            }
+
+
+def ttl_cached(ttl, **cache_kwargs):
+    """
+    Decorator caching a function's results in a TTLCache keyed by its arguments.
+
+    The cache is available as `func.cache`, e.g. for `func.cache.stats()`.
+    Its namespace defaults to the function's qualified name, so the same
+    function shares entries across processes on a shared backend.
+    """
+    def decorator(func):
+        kwargs = dict(cache_kwargs)
+        kwargs.setdefault('namespace', f"{func.__module__}.{func.__qualname__}")
+        cache = TTLCache(ttl, **kwargs)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args + tuple(sorted(kwargs.items())) if kwargs else args
+            return cache.get_or_load(key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -0,0 +1,242 @@
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+import threading
+from urllib.parse import urlsplit
+
+# Minimal RFC 6455 WebSocket client/server (text frames, ping/pong, close),
+# enough for the CryptoCompare streamer and the local replay server.
+
+_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_HEADER_BYTES = 16384
+
+
+class WebSocketClosed(ConnectionError):
+    """The peer closed the connection (or it dropped)."""
+
+
+class HandshakeError(ConnectionError):
+    """The HTTP upgrade was rejected or malformed."""
+
+
+def _accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + _GUID).encode()).digest()).decode()
+
+
+def _read_exact(sock, count):
+    data = bytearray()
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        if not chunk:
+            raise WebSocketClosed("Connection closed by peer")
+        data += chunk
+    return bytes(data)
+
+
+def _read_http_head(sock):
+    """Reads an HTTP request/response head; returns (first_line, headers)."""
+    # Byte at a time: the peer may send its first frame right behind the
+    # head, and those bytes belong to the frame reader.
+    data = bytearray()
+    while not data.endswith(b'\r\n\r\n'):
+        chunk = sock.recv(1)
+        if not chunk:
+            raise HandshakeError("Connection closed during handshake")
+        data += chunk
+        if len(data) > MAX_HEADER_BYTES:
+            raise HandshakeError("Handshake headers too large")
+    head = bytes(data[:-4])
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+def _apply_mask(payload, key):
+    if not payload:
+        return payload
+    length = len(payload)
+    repeated = (key * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(length, 'big')
+
+
+def encode_frame(opcode, payload, mask):
+    """Encodes one final frame; clients must mask, servers must not."""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack('!H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('!Q', length)
+    if not mask:
+        return bytes(header) + payload
+    key = os.urandom(4)
+    return bytes(header) + key + _apply_mask(payload, key)
+
+
+class WebSocketConnection:
+    """
+    One established WebSocket connection (either side).
+
+    Args:
+        sock (socket.socket): Connected socket after a successful handshake.
+        is_client (bool): Clients mask outgoing frames.
+    """
+
+    def __init__(self, sock, is_client):
+        self.sock = sock
+        self.is_client = is_client
+        self.closed = False
+        self._send_lock = threading.Lock()
+
+    def _send(self, opcode, payload):
+        frame = encode_frame(opcode, payload, mask=self.is_client)
+        with self._send_lock:
+            self.sock.sendall(frame)
+
+    def send(self, text):
+        self._send(OP_TEXT, text.encode('utf-8'))
+
+    def ping(self, payload=b''):
+        self._send(OP_PING, payload)
+
+    def _read_frame(self):
+        first, second = _read_exact(self.sock, 2)
+        fin = bool(first & 0x80)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', _read_exact(self.sock, 2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', _read_exact(self.sock, 8))[0]
+        key = _read_exact(self.sock, 4) if second & 0x80 else None
+        payload = _read_exact(self.sock, length) if length else b''
+        if key is not None:
+            payload = _apply_mask(payload, key)
+        return fin, opcode, payload
+
+    def recv(self):
+        """
+        Returns the next text (str) or binary (bytes) message, answering
+        pings along the way.
+
+        Raises:
+            WebSocketClosed: On a close frame or a dropped connection.
+            socket.timeout: If the socket timeout elapses with no frame.
+        """
+        fragments = []
+        message_opcode = None
+        while True:
+            fin, opcode, payload = self._read_frame()
+            if opcode == OP_PING:
+                self._send(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                self.close(reply=payload[:2])
+                raise WebSocketClosed("Close frame received")
+            if opcode != OP_CONTINUATION:
+                message_opcode = opcode
+            fragments.append(payload)
+            if fin:
+                data = b''.join(fragments)
+                return data.decode('utf-8') if message_opcode == OP_TEXT else data
+
+    def close(self, reply=b''):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._send(OP_CLOSE, reply or struct.pack('!H', 1000))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def connect(url, timeout=10, headers=None):
+    """
+    Opens a client connection to a ws:// or wss:// URL.
+
+    Args:
+        url (str): WebSocket URL, including any query string.
+        timeout (float): Connect/handshake timeout; also used as the read
+            timeout of the returned connection.
+        headers (dict, optional): Extra request headers.
+
+    Returns:
+        WebSocketConnection: The open connection.
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == 'wss'
+    if parts.scheme not in ('ws', 'wss'):
+        raise ValueError(f"Not a WebSocket URL: {url}")
+    port = parts.port or (443 if secure else 80)
+    sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+    try:
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        request = [
+            f"GET {path} HTTP/1.1",
+            f"Host: {parts.hostname}:{port}",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Key: {key}",
+            "Sec-WebSocket-Version: 13",
+        ]
+        request += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        sock.sendall(('\r\n'.join(request) + '\r\n\r\n').encode('latin-1'))
+        status, response_headers = _read_http_head(sock)
+        if ' 101 ' not in f"{status} ":
+            raise HandshakeError(f"Upgrade rejected: {status}")
+        if response_headers.get('sec-websocket-accept') != _accept_key(key):
+            raise HandshakeError("Invalid Sec-WebSocket-Accept")
+    except Exception:
+        sock.close()
+        raise
+    return WebSocketConnection(sock, is_client=True)
+
+
+def accept(sock):
+    """
+    Completes the server side of the handshake on an accepted socket.
+
+    Returns:
+        tuple: (WebSocketConnection, request_path)
+    """
+    request_line, headers = _read_http_head(sock)
+    key = headers.get('sec-websocket-key')
+    if headers.get('upgrade', '').lower() != 'websocket' or not key:
+        sock.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        raise HandshakeError(f"Not a WebSocket upgrade: {request_line}")
+    sock.sendall((
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {_accept_key(key)}\r\n\r\n"
+    ).encode('latin-1'))
+    parts = request_line.split(' ')
+    return WebSocketConnection(sock, is_client=False), parts[1] if len(parts) > 1 else '/'